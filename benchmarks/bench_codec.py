@@ -0,0 +1,108 @@
+# benchmarks/bench_codec.py
+
+import argparse
+import json
+import os
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from modules import codec  # noqa: E402
+from modules.protocol import (DecimalEncoder, encode_json,  # noqa: E402
+                              encode_legacy, decode_json, make_response)
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * bench_codec.py
+# * Benchmark de las codificaciones del protocolo: JSON indentado (respuesta
+# * legacy), JSON compacto y binario (msgpack con Decimal nativo). Mide
+# * bytes y tiempo de CPU de codificar/decodificar una respuesta 'get' de un
+# * ítem típico de CorporateData y un 'list' grande.
+# *----------------------------------------------------------------------------
+
+
+def make_item(i):
+    return {
+        'id': f"ITEM-{i:07d}",
+        'CUIT': f"30-{i:08d}-1",
+        'domicilio': f"Calle {i}",
+        'localidad': "Concepcion del Uruguay",
+        'provincia': "Entre Rios",
+        'sede': "FCyT-Central",
+        'cp': Decimal(3260 + i % 100),
+        'telefono': Decimal(3442000000 + i),
+        'saldo': Decimal(f"{i * 37 % 100000}.{i % 100:02d}"),
+        'activo': i % 7 != 0,
+    }
+
+
+def codecs():
+    return [
+        ("json indentado", encode_legacy,
+         lambda payload: json.loads(payload.decode('utf-8'))),
+        ("json compacto", encode_json, decode_json),
+        (f"binario ({codec.IMPLEMENTATION})", codec.pack, codec.unpack),
+    ]
+
+
+def measure(message, encode, decode, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        payload = encode(message)
+    encode_seconds = (time.perf_counter() - start) / repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        decode(payload)
+    decode_seconds = (time.perf_counter() - start) / repeat
+    return len(payload), encode_seconds, decode_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark de codificaciones del protocolo")
+    parser.add_argument('--items', type=int, default=5000,
+                        help="Ítems en la respuesta 'list' (default: 5000)")
+    parser.add_argument('--repeat', type=int, default=20,
+                        help='Repeticiones por medición (default: 20)')
+    parser.add_argument('--json', action='store_true',
+                        help='Salida en JSON para comparar entre ejecuciones')
+    args = parser.parse_args()
+
+    cases = [
+        ("get", make_response(make_item(1), 200, 1), args.repeat * 100),
+        (f"list x{args.items}", make_response(
+            {"ITEMS": [make_item(i) for i in range(args.items)],
+             "NEXT_CURSOR": None}, 200, 2), args.repeat),
+    ]
+
+    results = []
+    for case, message, repeat in cases:
+        baseline = None
+        for name, encode, decode in codecs():
+            size, encode_seconds, decode_seconds = measure(
+                message, encode, decode, repeat)
+            baseline = baseline or size
+            results.append({
+                "case": case, "codec": name, "bytes": size,
+                "bytes_ratio": round(size / baseline, 3),
+                "encode_ms": round(encode_seconds * 1000, 4),
+                "decode_ms": round(decode_seconds * 1000, 4),
+            })
+
+    if args.json:
+        print(json.dumps(results, indent=4, cls=DecimalEncoder))
+        return
+
+    print(f"{'caso':>12} {'codificación':>22} {'bytes':>10} {'relación':>9} "
+          f"{'codif. ms':>10} {'decodif. ms':>12}")
+    for r in results:
+        print(f"{r['case']:>12} {r['codec']:>22} {r['bytes']:>10} {r['bytes_ratio']:>9} "
+              f"{r['encode_ms']:>10} {r['decode_ms']:>12}")
+
+
+if __name__ == "__main__":
+    main()
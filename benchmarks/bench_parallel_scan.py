@@ -0,0 +1,120 @@
+# benchmarks/bench_parallel_scan.py
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from modules.data_proxy import scan_segments  # noqa: E402
+from modules.storage_memory import MemoryBackend  # noqa: E402
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * bench_parallel_scan.py
+# * Benchmark del listado completo: escaneo secuencial contra escaneo
+# * paralelo por segmentos, sobre el motor en memoria con páginas de tamaño
+# * acotado y latencia por llamada, como una tabla DynamoDB.
+# *----------------------------------------------------------------------------
+
+
+class StandInStorage(MemoryBackend):
+    """
+    Motor en memoria que imita a una tabla DynamoDB para scan(): páginas
+    de a lo sumo page_size ítems (como el límite de 1 MB) y latencia de
+    red simulada en cada llamada.
+    """
+
+    def __init__(self, item_count, page_size, latency):
+        super().__init__()
+        self.page_size = page_size
+        self.latency = latency
+        self.calls = 0
+        self.batch_put([self._make_item(i) for i in range(item_count)])
+
+    @staticmethod
+    def _make_item(i):
+        return {
+            'id': f"ITEM-{i:07d}",
+            'CUIT': f"30-{i:08d}-1",
+            'domicilio': f"Calle {i}",
+            'localidad': "Concepcion del Uruguay",
+            'provincia': "Entre Rios",
+            'sede': "FCyT-Central",
+        }
+
+    def scan(self, limit=None, start_key=None, segment=None,
+             total_segments=None):
+        self.calls += 1
+        time.sleep(self.latency)
+        return super().scan(min(limit or self.page_size, self.page_size),
+                            start_key, segment, total_segments)
+
+
+def sequential_scan(storage):
+    start_key = None
+    while True:
+        items, start_key = storage.scan(start_key=start_key)
+        yield items
+        if not start_key:
+            return
+
+
+def run(storage, segments, executor):
+    start = time.perf_counter()
+    first_page = None
+    total = 0
+    pages = sequential_scan(storage) if segments == 1 else scan_segments(
+        storage, segments, executor)
+    for page in pages:
+        if first_page is None:
+            first_page = time.perf_counter() - start
+        total += len(page)
+    return {"segments": segments, "items": total,
+            "seconds": round(time.perf_counter() - start, 4),
+            "first_page_seconds": round(first_page or 0.0, 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark de escaneo paralelo por segmentos")
+    parser.add_argument('--items', type=int, default=20000,
+                        help='Ítems en la tabla (default: 20000)')
+    parser.add_argument('--page-size', type=int, default=500,
+                        help='Ítems por página de scan, imita el límite de 1 MB (default: 500)')
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='Latencia simulada por llamada, en segundos (default: 0.02)')
+    parser.add_argument('--segments', default='1,2,4,8,16',
+                        help='Lista de segmentos a medir (default: 1,2,4,8,16)')
+    parser.add_argument('--json', action='store_true',
+                        help='Salida en JSON para comparar entre ejecuciones')
+    args = parser.parse_args()
+
+    storage = StandInStorage(args.items, args.page_size, args.latency)
+    segment_counts = [int(n) for n in args.segments.split(',')]
+    results = []
+    with ThreadPoolExecutor(max_workers=max(segment_counts)) as executor:
+        for segments in segment_counts:
+            results.append(run(storage, segments, executor))
+
+    baseline = results[0]["seconds"]
+    for result in results:
+        result["speedup"] = round(baseline / result["seconds"], 2)
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+        return
+
+    print(f"{'segmentos':>10} {'ítems':>8} {'segundos':>10} {'1ra página':>11} {'aceleración':>12}")
+    for r in results:
+        print(f"{r['segments']:>10} {r['items']:>8} {r['seconds']:>10} "
+              f"{r['first_page_seconds']:>11} {r['speedup']:>11}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,455 @@
+# benchmarks/loadgen.py
+
+import argparse
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from modules.protocol import DecimalEncoder, FramedClient  # noqa: E402
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * loadgen.py
+# * Generador de carga para singletonproxyobserver.py: N conexiones
+# * concurrentes con una mezcla configurable de get/set/list y M
+# * suscriptores. Informa throughput, percentiles de latencia por acción y
+# * la latencia de fan-out (desde el 'set' hasta que el observador recibe
+# * la notificación). Con --spawn levanta un servidor local sobre el motor
+# * de almacenamiento en memoria.
+# *----------------------------------------------------------------------------
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(__file__), '..', 'src',
+                             'singletonproxyobserver.py')
+
+PERCENTILES = (("p50", 50), ("p95", 95), ("p99", 99), ("p999", 99.9))
+
+# Campo del ítem con la hora de envío del 'set' (segundos, time.time())
+SENT_FIELD = "lg_sent"
+
+
+def parse_mix(text):
+    """
+    Convierte "get=70,set=20,list=10" en una lista de (acción, peso).
+    """
+    mix = []
+    for part in text.split(','):
+        action, _, weight = part.partition('=')
+        action = action.strip()
+        if action not in ("get", "set", "list"):
+            raise argparse.ArgumentTypeError(f"Acción desconocida en la mezcla: {action}")
+        try:
+            mix.append((action, float(weight or 1)))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Peso inválido para {action}: {weight}")
+    if not any(weight > 0 for _, weight in mix):
+        raise argparse.ArgumentTypeError("La mezcla debe tener algún peso positivo.")
+    return mix
+
+
+def parse_addresses(text):
+    """
+    Convierte "host:puerto,host:puerto" en una lista de (host, puerto).
+    """
+    addresses = []
+    for part in text.split(','):
+        host, _, port = part.strip().rpartition(':')
+        if not host or not port.isdigit():
+            raise argparse.ArgumentTypeError(f"Dirección inválida: {part} (se espera host:puerto)")
+        addresses.append((host, int(port)))
+    return addresses
+
+
+def summarize(samples):
+    """
+    Percentiles (rango más cercano), media y máximo de una lista de
+    latencias en segundos, expresados en milisegundos.
+    """
+    if not samples:
+        return {"count": 0}
+    samples = sorted(samples)
+    count = len(samples)
+    summary = {"count": count}
+    for name, percentile in PERCENTILES:
+        # Rango más cercano: el menor valor con al menos percentile % de
+        # las muestras por debajo o iguales
+        index = min(count - 1, max(0, math.ceil(percentile * count / 100) - 1))
+        summary[name] = round(samples[index] * 1000, 3)
+    summary["mean"] = round(sum(samples) / count * 1000, 3)
+    summary["max"] = round(samples[-1] * 1000, 3)
+    return summary
+
+
+def make_item(item_id, item_size):
+    return {"id": item_id, "payload": "x" * item_size}
+
+
+class Client:
+    """
+    Una conexión del generador: en modo enmarcado persistente, en modo
+    legacy una conexión nueva por solicitud (como singletonclient.py).
+    request() devuelve (estado, datos); estado es None si falló la red.
+    """
+
+    def __init__(self, host, port, protocol, codec):
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.framed = None
+        if protocol == "framed":
+            self.framed = FramedClient(host, port, timeout=30,
+                                       codecs=[codec, "json"] if codec else None)
+
+    def request(self, request):
+        if self.framed:
+            response = self.framed.request(request)
+            return response["STATUS"], response["DATA"]
+        with socket.create_connection((self.host, self.port), timeout=30) as sock:
+            sock.sendall(json.dumps(request, cls=DecimalEncoder).encode('utf-8'))
+            buffer = b""
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                buffer += chunk
+        data = json.loads(buffer.decode('utf-8'))
+        return (500 if isinstance(data, dict) and "error" in data else 200), data
+
+    def close(self):
+        if self.framed:
+            self.framed.close()
+
+
+class Subscriber(threading.Thread):
+    """
+    Observador del generador: se suscribe (modo enmarcado) y registra,
+    por cada evento 'update', cuánto tardó desde que se envió el 'set'.
+    """
+
+    def __init__(self, host, port, codec, client_uuid):
+        super().__init__(name="loadgen-subscriber", daemon=True)
+        self.client = FramedClient(host, port, timeout=None,
+                                   codecs=[codec, "json"] if codec else None)
+        response = self.client.request({"ACTION": "subscribe", "UUID": client_uuid})
+        if response["STATUS"] != 200:
+            raise ConnectionError(f"Suscripción rechazada: {response['DATA']}")
+        self.latencies = []
+        self.events = 0
+        self.recording = False
+
+    def run(self):
+        try:
+            while True:
+                message = self.client.receive()
+                if message is None:
+                    return
+                if message.get("EVENT") != "update":
+                    continue
+                received = time.time()
+                sent = (message.get("DATA") or {}).get(SENT_FIELD)
+                if sent is not None and self.recording:
+                    self.events += 1
+                    self.latencies.append(received - float(sent))
+        except OSError:
+            return
+
+    def close(self):
+        # shutdown desbloquea el recv() del hilo antes de cerrar el socket
+        try:
+            self.client.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.client.close()
+
+
+class Worker(threading.Thread):
+    """
+    Bucle cerrado de una conexión: elige una acción según la mezcla, la
+    envía, espera la respuesta y registra su latencia.
+    """
+
+    def __init__(self, index, args, mix, recording, stop):
+        super().__init__(name=f"loadgen-{index}", daemon=True)
+        self.args = args
+        self.actions = [action for action, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        self.recording = recording
+        self.stop = stop
+        self.random = random.Random(args.seed + index)
+        self.client_uuid = f"loadgen-{index}"
+        self.latencies = {action: [] for action in self.actions}
+        self.errors = 0
+        self.client = Client(args.host, args.port, args.protocol, args.codec)
+
+    def make_request(self, action):
+        item_id = f"LG-{self.random.randrange(self.args.keys):07d}"
+        if action == "get":
+            return {"ACTION": "get", "UUID": self.client_uuid, "ID": item_id}
+        if action == "set":
+            request = make_item(item_id, self.args.item_size)
+            request.update({"ACTION": "set", "UUID": self.client_uuid,
+                            SENT_FIELD: time.time()})
+            return request
+        return {"ACTION": "list", "UUID": self.client_uuid, "LIMIT": self.args.list_limit}
+
+    def run(self):
+        while not self.stop.is_set():
+            action = self.random.choices(self.actions, self.weights)[0]
+            request = self.make_request(action)
+            start = time.perf_counter()
+            try:
+                status, _ = self.client.request(request)
+            except (OSError, ConnectionError, ValueError):
+                status = None
+            elapsed = time.perf_counter() - start
+            if status is None:
+                time.sleep(0.1)
+                self._reconnect()
+            if not self.recording.is_set():
+                continue
+            if status is None or status >= 300:
+                self.errors += 1
+            else:
+                self.latencies[action].append(elapsed)
+        self.client.close()
+
+    def _reconnect(self):
+        try:
+            self.client.close()
+            self.client = Client(self.args.host, self.args.port,
+                                 self.args.protocol, self.args.codec)
+        except OSError:
+            pass
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(args):
+    """
+    Levanta singletonproxyobserver.py con el motor en memoria y espera a
+    que acepte conexiones.
+    """
+    args.host = "127.0.0.1"
+    args.port = free_port()
+    command = [sys.executable, SERVER_SCRIPT, "-p", str(args.port),
+               "--storage", "memory", "--engine", args.engine,
+               "--audit-overflow", "drop"] + args.server_args.split()
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"El servidor terminó al iniciar (código {process.returncode}).")
+        try:
+            socket.create_connection((args.host, args.port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("El servidor no aceptó conexiones a tiempo.")
+
+
+def seed_items(args):
+    """
+    Carga los ítems del espacio de claves para que los 'get' encuentren datos.
+    """
+    client = FramedClient(args.host, args.port, timeout=60)
+    try:
+        batch = []
+        for i in range(args.keys):
+            batch.append(make_item(f"LG-{i:07d}", args.item_size))
+            if len(batch) == 500 or i == args.keys - 1:
+                response = client.request({"ACTION": "mset", "UUID": "loadgen-seed",
+                                           "ITEMS": batch})
+                if response["STATUS"] not in (200, 207):
+                    raise RuntimeError(f"Error al cargar ítems: {response['DATA']}")
+                batch = []
+    finally:
+        client.close()
+
+
+def run(args, mix):
+    stop = threading.Event()
+    recording = threading.Event()
+    # Con --subscribe-to los suscriptores se reparten entre otros nodos
+    # (federación): el fan-out mide también el salto entre servidores
+    targets = args.subscribe_to or [(args.host, args.port)]
+    subscribers = [Subscriber(*targets[i % len(targets)], args.codec, f"loadgen-observer-{i}")
+                   for i in range(args.subscribers)]
+    for subscriber in subscribers:
+        subscriber.start()
+    workers = [Worker(i, args, mix, recording, stop) for i in range(args.connections)]
+    for worker in workers:
+        worker.start()
+
+    time.sleep(args.warmup)
+    recording.set()
+    for subscriber in subscribers:
+        subscriber.recording = True
+    start = time.perf_counter()
+    time.sleep(args.duration)
+    elapsed = time.perf_counter() - start
+    recording.clear()
+    stop.set()
+    for worker in workers:
+        worker.join(timeout=30)
+    # Las notificaciones en vuelo todavía cuentan para el fan-out
+    time.sleep(args.drain)
+    for subscriber in subscribers:
+        subscriber.recording = False
+        subscriber.close()
+
+    by_action = {}
+    all_latencies = []
+    for worker in workers:
+        for action, samples in worker.latencies.items():
+            by_action.setdefault(action, []).extend(samples)
+            all_latencies.extend(samples)
+    total = len(all_latencies)
+    errors = sum(worker.errors for worker in workers)
+    sets = len(by_action.get("set", []))
+    fanout = []
+    events = 0
+    for subscriber in subscribers:
+        fanout.extend(subscriber.latencies)
+        events += subscriber.events
+
+    return {
+        "config": {
+            "host": args.host, "port": args.port, "spawned": args.spawn,
+            "subscribe_to": ["%s:%s" % target for target in targets],
+            "engine": args.engine if args.spawn else None,
+            "protocol": args.protocol, "codec": args.codec,
+            "connections": args.connections, "subscribers": args.subscribers,
+            "mix": dict(mix), "keys": args.keys, "item_size": args.item_size,
+            "list_limit": args.list_limit, "duration": args.duration,
+            "warmup": args.warmup, "seed": args.seed,
+        },
+        "elapsed_seconds": round(elapsed, 3),
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": dict({"all": summarize(all_latencies)},
+                           **{action: summarize(samples) for action, samples in by_action.items()}),
+        "fanout": {
+            "subscribers": args.subscribers,
+            "events_received": events,
+            # Aproximado: cada 'set' medido notifica a cada suscriptor
+            "events_expected": sets * args.subscribers,
+            "latency_ms": summarize(fanout),
+        },
+    }
+
+
+def print_report(result):
+    config = result["config"]
+    print(f"{config['connections']} conexiones ({config['protocol']}"
+          f"{', ' + config['codec'] if config['codec'] else ''}), "
+          f"{config['subscribers']} suscriptores, {result['elapsed_seconds']} s")
+    print(f"Solicitudes: {result['requests']}  Errores: {result['errors']}  "
+          f"Throughput: {result['throughput_rps']} sol/s")
+    print(f"{'latencia ms':>12} {'cantidad':>9}" +
+          "".join(f" {name:>9}" for name, _ in PERCENTILES) + f" {'máx':>9}")
+    rows = list(result["latency_ms"].items())
+    rows.append(("fan-out", result["fanout"]["latency_ms"]))
+    for name, summary in rows:
+        if not summary["count"]:
+            continue
+        print(f"{name:>12} {summary['count']:>9}" +
+              "".join(f" {summary[p]:>9}" for p, _ in PERCENTILES) + f" {summary['max']:>9}")
+    fanout = result["fanout"]
+    if fanout["subscribers"]:
+        print(f"Notificaciones recibidas: {fanout['events_received']} "
+              f"(esperadas ~{fanout['events_expected']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generador de carga para singletonproxyobserver.py")
+    parser.add_argument('-s', '--host', default='localhost',
+                        help='Servidor (default: localhost)')
+    parser.add_argument('-p', '--port', type=int, default=8080,
+                        help='Puerto del servidor (default: 8080)')
+    parser.add_argument('--spawn', action='store_true',
+                        help='Levantar un servidor local con almacenamiento en memoria '
+                        '(ignora --host/--port)')
+    parser.add_argument('--engine', choices=['threads', 'asyncio'], default='threads',
+                        help='Motor de red del servidor levantado con --spawn (default: threads)')
+    parser.add_argument('--server-args', default='',
+                        help='Argumentos adicionales para el servidor levantado con --spawn')
+    parser.add_argument('-c', '--connections', type=int, default=16,
+                        help='Conexiones concurrentes (default: 16)')
+    parser.add_argument('-m', '--subscribers', type=int, default=0,
+                        help='Suscriptores conectados durante la prueba (default: 0)')
+    parser.add_argument('--subscribe-to', type=parse_addresses,
+                        help='Servidores "host:puerto,..." entre los que se reparten los '
+                        'suscriptores, para medir el fan-out entre nodos federados '
+                        '(default: el mismo servidor de la carga)')
+    parser.add_argument('--mix', type=parse_mix, default='get=70,set=20,list=10',
+                        help='Mezcla de acciones con pesos (default: get=70,set=20,list=10)')
+    parser.add_argument('--protocol', choices=['framed', 'legacy'], default='framed',
+                        help='Protocolo de las conexiones de carga (default: framed)')
+    parser.add_argument('--codec', choices=['json', 'msgpack'],
+                        help='Codificación a negociar en modo enmarcado (default: json)')
+    parser.add_argument('--keys', type=int, default=1000,
+                        help='Cantidad de ids distintos (default: 1000)')
+    parser.add_argument('--item-size', type=int, default=256,
+                        help='Bytes de datos por ítem (default: 256)')
+    parser.add_argument('--list-limit', type=int, default=50,
+                        help="Ítems por página de las solicitudes 'list' (default: 50)")
+    parser.add_argument('--no-seed', action='store_true',
+                        help='No cargar los ítems antes de la prueba')
+    parser.add_argument('-d', '--duration', type=float, default=10.0,
+                        help='Segundos de medición (default: 10)')
+    parser.add_argument('--warmup', type=float, default=2.0,
+                        help='Segundos de calentamiento sin medir (default: 2)')
+    parser.add_argument('--drain', type=float, default=1.0,
+                        help='Segundos de espera de notificaciones en vuelo al final (default: 1)')
+    parser.add_argument('--seed', type=int, default=1,
+                        help='Semilla de la selección de acciones e ids (default: 1)')
+    parser.add_argument('--json', action='store_true',
+                        help='Salida en JSON para comparar entre ejecuciones')
+    parser.add_argument('-o', '--output',
+                        help='(Opcional) Archivo donde guardar el resultado en JSON')
+    args = parser.parse_args()
+    if args.protocol == 'legacy' and args.codec:
+        parser.error("--codec requiere el protocolo enmarcado")
+    mix = args.mix
+
+    started_at = datetime.now().isoformat(timespec='seconds')
+    process = spawn_server(args) if args.spawn else None
+    try:
+        if not args.no_seed:
+            seed_items(args)
+        result = run(args, mix)
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=10)
+    result["started_at"] = started_at
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=4)
+    if args.json:
+        print(json.dumps(result, indent=4))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
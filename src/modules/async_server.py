@@ -0,0 +1,309 @@
+# src/modules/async_server.py
+
+import asyncio
+import collections
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.logger import get_logger
+from modules.protocol import (BaseConnection, DEFERRED, SERVER_BUSY, ProtocolError,
+                              RequestDecoder)
+
+try:
+    import resource
+except ImportError:  # Windows no tiene el módulo 'resource'
+    resource = None
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * async_server.py
+# * Motor de servidor basado en asyncio: un único event loop atiende todas
+# * las conexiones y las llamadas bloqueantes (DynamoDB) se ejecutan en un
+# * executor acotado.
+# *----------------------------------------------------------------------------
+
+log = get_logger("async_server")
+
+# Segundos máximos que un hilo del executor espera a que el cliente lea
+# (ver drain()) antes de cortar la conexión
+DRAIN_TIMEOUT = 30.0
+
+
+class AsyncClientConnection(BaseConnection, asyncio.Protocol):
+    """
+    Conexión de cliente atendida por el event loop.
+    Implementa la misma interfaz que ClientConnection, por lo que el
+    Subject puede notificarla desde cualquier hilo.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.loop = engine.loop
+        self.transport = None
+        self.addr = None
+        self.is_subscriber = False
+        self._decoder = RequestDecoder()
+        self._pending = collections.deque()
+        self._processing = False
+        self._closed = False
+        # Abierto mientras el buffer de salida está bajo la marca alta
+        self._writable = asyncio.Event()
+        self._writable.set()
+
+    @property
+    def framed(self):
+        return self._decoder.framed
+
+    @property
+    def codec(self):
+        return self._decoder.codec
+
+    # --- Callbacks de asyncio.Protocol (se ejecutan en el loop) ---
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.addr = transport.get_extra_info('peername')
+        self.engine.connections += 1
+
+    def data_received(self, data):
+        try:
+            requests = self._decoder.feed(data)
+        except (ProtocolError, json.JSONDecodeError) as e:
+            self._reject(e)
+            return
+        reply = self._decoder.take_handshake_reply()
+        if reply:
+            self.transport.write(reply)
+
+        if not self.framed and self.is_subscriber:
+            # Un suscriptor legacy solo mantiene la conexión abierta
+            return
+
+        self._pending.extend(requests)
+        if self._pending and not self._processing:
+            self._processing = True
+            self.loop.create_task(self._process_pending())
+
+    def pause_writing(self):
+        # El buffer de salida superó la marca alta: el Subject deja de
+        # enviarle y acumula en la cola acotada del suscriptor
+        self.paused = True
+        self._writable.clear()
+
+    def resume_writing(self):
+        self.paused = False
+        self._writable.set()
+        if self.on_resume is not None:
+            self.on_resume()
+
+    def connection_lost(self, exc):
+        self._closed = True
+        self._writable.set()
+        self.engine.connections -= 1
+        if self.is_subscriber:
+            self.engine.server.subject.unsubscribe(self)
+
+    # --- Procesamiento de solicitudes ---
+
+    async def _process_pending(self):
+        """
+        Atiende en orden las solicitudes pendientes de esta conexión.
+        Las acciones se ejecutan en el executor porque acceden a DynamoDB.
+        """
+        try:
+            while self._pending and not self._closed:
+                raw_request = self._pending.popleft()
+                try:
+                    data = self._decoder.decode(raw_request)
+                except ValueError:
+                    self._reply(self.invalid_request(), 400, None)
+                    if not self.framed:
+                        self.transport.close()
+                        return
+                    continue
+
+                request_id = data.get("REQID") if isinstance(
+                    data, dict) else None
+                if not self.engine.admit():
+                    # Control de admisión: no se encola más trabajo en el executor
+                    self._reply(SERVER_BUSY, 503, request_id)
+                    if not self.framed and not self.is_subscriber:
+                        self.transport.close()
+                        return
+                    continue
+                try:
+                    response_data, status_code, is_subscribe = await self.loop.run_in_executor(
+                        self.engine.executor, self.engine.server.process_request, data, self)
+                finally:
+                    self.engine.release()
+                if response_data is DEFERRED:
+                    continue  # La respuesta se envía al completarse
+                self.is_subscriber = self.is_subscriber or is_subscribe
+                self._reply(response_data, status_code, request_id)
+                if is_subscribe:
+                    self.engine.server.subject.release(self)
+
+                if not self.framed and not self.is_subscriber:
+                    # Cliente legacy: una solicitud por conexión
+                    self.transport.close()
+                    return
+        except ConnectionError as e:
+            log.info("Conexión con %s interrumpida: %s", self.addr, e)
+            self.transport.abort()
+        except Exception as e:
+            log.exception("Error inesperado procesando la solicitud de %s: %s", self.addr, e)
+            self.transport.close()
+        finally:
+            self._processing = False
+
+    def _reply(self, response_data, status_code, request_id):
+        if not self._closed:
+            self.transport.write(self.encode_response(
+                response_data, status_code, request_id))
+
+    def _reject(self, error):
+        log.warning("Error de protocolo con el cliente %s: %s", self.addr, error)
+        if self.framed is False:
+            self._reply({"error": "Invalid JSON",
+                         "message": "La solicitud no es un JSON válido."}, 400, None)
+        self.transport.close()
+
+    # --- Interfaz usada por el Subject (puede llamarse desde otros hilos) ---
+
+    def send_bytes(self, data):
+        """
+        Encola los bytes en el transporte desde cualquier hilo.
+        Lanza ConnectionError si la conexión ya se cerró.
+        """
+        if self._closed:
+            raise ConnectionError("La conexión está cerrada.")
+        self.loop.call_soon_threadsafe(self._write, data)
+
+    def _write(self, data):
+        if not self._closed:
+            self.transport.write(data)
+
+    def drain(self):
+        """
+        Desde un hilo del executor: espera a que el buffer de salida baje
+        de la marca alta (el cliente está leyendo). Corta la conexión y
+        lanza ConnectionError si no ocurre en DRAIN_TIMEOUT segundos.
+        """
+        future = asyncio.run_coroutine_threadsafe(self._drain(), self.loop)
+        try:
+            future.result(DRAIN_TIMEOUT)
+        except TimeoutError:
+            future.cancel()
+            self.abort()
+            raise ConnectionError("El cliente no lee sus respuestas.")
+
+    async def _drain(self):
+        # Se ejecuta después de los _write() encolados antes por este hilo
+        await self._writable.wait()
+        if self._closed:
+            raise ConnectionError("La conexión está cerrada.")
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.transport.close)
+
+    def abort(self):
+        self.loop.call_soon_threadsafe(self.transport.abort)
+
+
+class AsyncServer:
+    """
+    Motor de red alternativo al de un hilo por conexión.
+    Reutiliza Server.process_request para la lógica de las acciones.
+    Como en el motor de hilos, a lo sumo queue_size solicitudes esperan
+    un hilo libre del executor: las demás se responden "busy" (503).
+    """
+
+    def __init__(self, server, max_workers=32, backlog=4096, queue_size=256):
+        self.server = server
+        self.max_workers = max_workers
+        self.backlog = backlog
+        self.queue_size = queue_size
+        self.loop = None
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="dynamodb")
+        self.connections = 0
+        self.port = None
+        self._stopping = None
+        # Solo se modifican desde el event loop
+        self._inflight = 0
+        self._admitted = 0
+        self._rejected = 0
+        server.engine = self  # Para incluir estas métricas en Server.stats()
+
+    def admit(self):
+        """
+        Reserva un lugar para una solicitud. False si el executor ya tiene
+        todos sus hilos ocupados y queue_size solicitudes esperando.
+        """
+        if self._inflight >= self.max_workers + self.queue_size:
+            self._rejected += 1
+            return False
+        self._inflight += 1
+        self._admitted += 1
+        return True
+
+    def release(self):
+        self._inflight -= 1
+
+    def stats(self):
+        return {"engine": "asyncio", "workers": self.max_workers,
+                "connections": self.connections, "inflight": self._inflight,
+                "queue_capacity": self.queue_size, "submitted": self._admitted,
+                "rejected": self._rejected}
+
+    def _raise_fd_limit(self):
+        """
+        Eleva el límite blando de descriptores de archivo al máximo
+        permitido, necesario para decenas de miles de conexiones.
+        """
+        if resource is None:
+            return
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        target = hard if hard != resource.RLIM_INFINITY else 1048576
+        if soft < target:
+            try:
+                resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            except (ValueError, OSError):
+                pass
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self._raise_fd_limit()
+        listener = await self.loop.create_server(
+            lambda: AsyncClientConnection(self),
+            self.server.host, self.server.port,
+            backlog=self.backlog, reuse_address=True,
+            reuse_port=self.server.reuse_port or None)
+        self.port = listener.sockets[0].getsockname()[1]
+        self._stopping = asyncio.Event()
+        log.info("Servidor asyncio escuchando en %s:%s (executor: %d hilos, cola: %d, backlog: %d)",
+                 self.server.host, self.port, self.max_workers, self.queue_size, self.backlog)
+        async with listener:
+            await self._stopping.wait()
+
+    def stop(self):
+        """
+        Detiene el servidor desde otro hilo (start() retorna).
+        """
+        if self.loop is not None and self._stopping is not None:
+            self.loop.call_soon_threadsafe(self._stopping.set)
+
+    def start(self):
+        """
+        Inicia el event loop hasta Ctrl+C.
+        """
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            log.info("Cerrando el servidor... (Ctrl+C presionado)")
+        finally:
+            self.executor.shutdown(wait=False)
+            self.server.shutdown()
+            log.info("Servidor detenido.")
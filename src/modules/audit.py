@@ -0,0 +1,185 @@
+# src/modules/audit.py
+
+import json
+import queue
+import threading
+import time
+
+from modules.logger import get_logger
+from modules.metrics import REGISTRY
+from modules.protocol import DecimalEncoder
+from modules.storage import StorageError
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * audit.py
+# * Escritor asíncrono de la auditoría: los registros se encolan en memoria
+# * y un hilo en segundo plano los graba en CorporateLog por lotes.
+# *----------------------------------------------------------------------------
+
+log = get_logger("audit")
+
+# Políticas ante la cola llena
+OVERFLOW_BLOCK = "block"  # El solicitante espera lugar en la cola
+OVERFLOW_DROP = "drop"    # El registro se descarta (y se cuenta)
+OVERFLOW_SPILL = "spill"  # El registro se agrega a un archivo local
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP, OVERFLOW_SPILL)
+
+AUDIT_WRITE_SECONDS = REGISTRY.histogram(
+    "audit_write_seconds", "Duración de la escritura de un lote de auditoría").labels()
+
+# Registros por lote (máximo de una llamada BatchWriteItem de DynamoDB)
+BATCH_SIZE = 25
+
+
+class AuditLogWriter:
+    """
+    Desacopla la auditoría del camino de cada solicitud: record() solo
+    encola el registro y un hilo lo graba con storage.append_log en grupos
+    de hasta 25, cada flush_interval segundos o al llenarse un lote.
+    """
+
+    def __init__(self, storage, queue_size=10000, flush_interval=1.0,
+                 overflow=OVERFLOW_BLOCK, spill_path="audit_spill.jsonl"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Política de desborde desconocida: {overflow}")
+        self.storage = storage
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.spill_path = spill_path
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stats_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._written = 0
+        self._dropped = 0
+        self._spilled = 0
+        self._failed = 0
+        self._batches = 0
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, item):
+        """
+        Encola un registro de auditoría aplicando la política de desborde.
+        """
+        if self._closed:
+            self._spill([item])
+            return
+        if self.overflow == OVERFLOW_BLOCK:
+            self._queue.put(item)
+            return
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            if self.overflow == OVERFLOW_DROP:
+                with self._stats_lock:
+                    self._dropped += 1
+            else:
+                self._spill([item])
+
+    def _spill(self, items):
+        """
+        Agrega registros (uno por línea, JSON) al archivo local de desborde.
+        """
+        try:
+            with self._spill_lock, open(self.spill_path, 'a') as f:
+                for item in items:
+                    f.write(json.dumps(item, cls=DecimalEncoder) + "\n")
+            with self._stats_lock:
+                self._spilled += len(items)
+        except IOError as e:
+            log.error("Error al escribir el archivo de auditoría %s: %s", self.spill_path, e)
+            with self._stats_lock:
+                self._dropped += len(items)
+
+    def _write_batch(self, batch):
+        """
+        Escribe un lote en CorporateLog. Si el almacenamiento falla, el
+        lote se guarda en el archivo de desborde para no perderlo.
+        """
+        with AUDIT_WRITE_SECONDS.time():
+            try:
+                self.storage.append_log(batch)
+                with self._stats_lock:
+                    self._written += len(batch)
+                    self._batches += 1
+            except StorageError as e:
+                log.error("Error de almacenamiento al registrar log: %s", e.message)
+                with self._stats_lock:
+                    self._failed += len(batch)
+                self._spill(batch)
+            except Exception as e:
+                log.exception("Error inesperado al registrar log: %s", e)
+                with self._stats_lock:
+                    self._failed += len(batch)
+                self._spill(batch)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            # Juntar hasta BATCH_SIZE registros o hasta que venza el intervalo
+            while len(batch) < BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    self._queue.task_done()
+                    break
+                batch.append(item)
+            if batch:
+                self._write_batch(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self):
+        """
+        Bloquea hasta que todos los registros encolados fueron procesados.
+        """
+        self._queue.join()
+
+    def close(self):
+        """
+        Vacía la cola y detiene el hilo escritor (al apagar el servidor).
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        # Registros encolados por solicitudes concurrentes al cierre
+        pending = []
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        pending = [item for item in pending if item is not None]
+        for start in range(0, len(pending), BATCH_SIZE):
+            self._write_batch(pending[start:start + BATCH_SIZE])
+
+    def stats(self):
+        """
+        Devuelve una instantánea de la actividad del escritor.
+        """
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "overflow_policy": self.overflow,
+                "written": self._written,
+                "batches": self._batches,
+                "dropped": self._dropped,
+                "spilled": self._spilled,
+                "failed": self._failed,
+            }
@@ -0,0 +1,146 @@
+# src/modules/cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * cache.py
+# * Módulo que implementa una caché en memoria LRU con expiración opcional
+# * (TTL) y estadísticas de aciertos/fallos.
+# *----------------------------------------------------------------------------
+
+
+class LRUCache:
+    """
+    Caché thread-safe de tamaño acotado. Al llenarse descarta el elemento
+    usado menos recientemente; si se define ttl (segundos), los elementos
+    vencidos se tratan como ausentes.
+    Para cargar un valor leído del origen tras un fallo se usa reserve() y
+    fill(): si la clave se escribe o invalida durante la lectura, el valor
+    leído (quizás viejo) no se guarda.
+    copy (opcional) copia los valores al guardarlos y al devolverlos, para
+    que quien los recibe pueda modificarlos sin alterar la caché.
+    """
+
+    def __init__(self, max_size=1024, ttl=None, copy=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._copy = copy
+        self._data = OrderedDict()  # clave -> (valor, instante de vencimiento)
+        self._fills = {}  # clave -> tokens de lecturas del origen en curso
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._stale_fills = 0
+
+    def get(self, key):
+        """
+        Devuelve el valor cacheado o None si no está (o venció).
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._hits += 1
+        return self._copy(value) if self._copy else value
+
+    def put(self, key, value):
+        """
+        Agrega o reemplaza un valor, descartando el más antiguo si hace falta.
+        """
+        if self.max_size <= 0:
+            return
+        if self._copy:
+            value = self._copy(value)
+        with self._lock:
+            self._fills.pop(key, None)
+            self._store(key, value)
+
+    def _store(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self._evictions += 1
+
+    def reserve(self, key):
+        """
+        Antes de leer del origen una clave que no estaba: devuelve el token
+        para fill(). Un put() o invalidate() de la clave lo anula.
+        """
+        if self.max_size <= 0:
+            return None
+        token = object()
+        with self._lock:
+            self._fills.setdefault(key, set()).add(token)
+        return token
+
+    def fill(self, key, value, token):
+        """
+        Guarda el valor leído del origen solo si la clave no se escribió ni
+        invalidó desde reserve(). Con value None (no existe o falló la
+        lectura) solo libera el token. Devuelve True si lo guardó.
+        """
+        if token is None:
+            return False
+        if self._copy and value is not None:
+            value = self._copy(value)
+        with self._lock:
+            tokens = self._fills.get(key)
+            if tokens is None or token not in tokens:
+                if value is not None:
+                    self._stale_fills += 1
+                return False
+            tokens.discard(token)
+            if not tokens:
+                del self._fills[key]
+            if value is None:
+                return False
+            self._store(key, value)
+            return True
+
+    def invalidate(self, key):
+        """
+        Elimina una clave de la caché (si existe).
+        """
+        with self._lock:
+            self._data.pop(key, None)
+            self._fills.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._fills.clear()
+
+    def stats(self):
+        """
+        Devuelve una instantánea de las estadísticas de la caché.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "stale_fills": self._stale_fills,
+            }
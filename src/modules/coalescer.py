@@ -0,0 +1,151 @@
+# src/modules/coalescer.py
+
+import collections
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from modules.logger import get_logger
+from modules.metrics import REGISTRY
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * coalescer.py
+# * Combinación de escrituras (write-behind) para ids muy actualizados: las
+# * actualizaciones de un mismo id dentro de una ventana de tiempo se
+# * graban con una sola escritura, una fila de auditoría y una notificación.
+# *----------------------------------------------------------------------------
+
+log = get_logger("coalescer")
+
+COALESCED = REGISTRY.counter(
+    "writes_coalesced_total", "Solicitudes 'set' absorbidas por una escritura combinada").labels()
+
+
+class _PendingWrite:
+    """
+    Escritura de un id que acumula actualizaciones hasta que vence la
+    ventana, con un Future por solicitud. done se activa cuando la
+    escritura se confirmó (o falló).
+    """
+
+    __slots__ = ("item_id", "requests", "futures", "previous", "done")
+
+    def __init__(self, item_id, previous):
+        self.item_id = item_id
+        self.requests = []  # (ítem, client_uuid, session_id), en orden de llegada
+        self.futures = []
+        self.previous = previous  # Escritura anterior del mismo id, aún en curso
+        self.done = threading.Event()
+
+
+class WriteCoalescer:
+    """
+    submit() agrega la actualización a la escritura pendiente de su id (la
+    última gana: 'set' reemplaza el ítem completo) y devuelve un Future,
+    sin bloquear al hilo que atiende la solicitud. Un hilo propio vence
+    las ventanas de window segundos y pasa cada escritura a un pool que la
+    ejecuta con write(item, client_uuid, session_id, absorbed) (la última
+    solicitud, y en absorbed las anteriores, para auditarlas), después de
+    que termine la escritura anterior del mismo id (se conserva el orden
+    de llegada). El Future de la primera solicitud recibe el resultado de
+    write(); el resto, el mismo resultado sin la versión anterior y con
+    changed=False, así la escritura se notifica una sola vez.
+    """
+
+    def __init__(self, write, window=0.05, workers=4):
+        self._write = write
+        self.window = window
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._pending = {}   # id -> _PendingWrite que acepta actualizaciones
+        self._inflight = {}  # id -> última _PendingWrite que salió de la ventana
+        self._due = collections.deque()  # (vencimiento, _PendingWrite), en orden
+        self._closed = False
+        self._writes = 0
+        self._merged = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix="coalesce")
+        self._thread = threading.Thread(target=self._flush_loop, name="coalescer",
+                                        daemon=True)
+        self._thread.start()
+
+    def submit(self, item_id, item, client_uuid, session_id):
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("El combinador de escrituras está cerrado.")
+            pending = self._pending.get(item_id)
+            if pending is None:
+                pending = _PendingWrite(item_id, self._inflight.get(item_id))
+                self._pending[item_id] = pending
+                # La ventana es fija: los vencimientos quedan en orden
+                self._due.append((time.monotonic() + self.window, pending))
+                self._cond.notify()
+            else:
+                COALESCED.inc()
+            pending.requests.append((item, client_uuid, session_id))
+            pending.futures.append(future)
+        return future
+
+    def _flush_loop(self):
+        with self._lock:
+            while True:
+                while not self._due and not self._closed:
+                    self._cond.wait()
+                if not self._due:
+                    return
+                deadline, pending = self._due[0]
+                delay = deadline - time.monotonic()
+                if delay > 0 and not self._closed:
+                    self._cond.wait(delay)
+                    continue
+                self._due.popleft()
+                del self._pending[pending.item_id]
+                self._inflight[pending.item_id] = pending
+                self._writes += 1
+                self._merged += len(pending.futures) - 1
+                self._executor.submit(self._run, pending)
+
+    def _run(self, pending):
+        try:
+            if pending.previous is not None:
+                pending.previous.done.wait()
+            item, client_uuid, session_id = pending.requests[-1]
+            result = self._write(item, client_uuid, session_id, pending.requests[:-1])
+        except Exception as e:
+            log.exception("Error en una escritura combinada de '%s'", pending.item_id)
+            result = ({"error": "DB Error", "message": str(e)}, 500, None, False)
+        # Las solicitudes (y sus notificaciones) se completan antes de
+        # liberar la escritura siguiente del mismo id
+        response_data, status_code, _, _ = result
+        pending.futures[0].set_result(result)
+        for future in pending.futures[1:]:
+            future.set_result((response_data, status_code, None, False))
+        pending.previous = None
+        with self._lock:
+            if self._inflight.get(pending.item_id) is pending:
+                del self._inflight[pending.item_id]
+        pending.done.set()
+
+    def close(self):
+        """
+        Graba ya las escrituras pendientes y espera a que terminen.
+        """
+        with self._lock:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "window_ms": round(self.window * 1000, 3),
+                "pending_ids": len(self._pending),
+                "inflight_ids": len(self._inflight),
+                "writes": self._writes,
+                "merged_requests": self._merged,
+            }
@@ -0,0 +1,354 @@
+# src/modules/codec.py
+
+import struct
+from decimal import Decimal
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * codec.py
+# * Codificación binaria compacta de los mensajes del modo enmarcado:
+# * formato MessagePack con un tipo extendido para Decimal, de modo que los
+# * números de DynamoDB viajan sin pasar por texto JSON ni por float.
+# * Si está instalado el paquete 'msgpack' se usa su implementación en C
+# * (mismo formato); si no, la implementación en Python de este módulo.
+# *----------------------------------------------------------------------------
+
+try:
+    import msgpack
+except ImportError:  # Dependencia opcional
+    msgpack = None
+
+# Tipo extendido de MessagePack para Decimal: el payload es str(valor) en ASCII
+EXT_DECIMAL = 1
+
+IMPLEMENTATION = "msgpack (C)" if msgpack is not None else "python"
+
+_UINT8 = struct.Struct("!B")
+_UINT16 = struct.Struct("!H")
+_UINT32 = struct.Struct("!I")
+_UINT64 = struct.Struct("!Q")
+_INT8 = struct.Struct("!b")
+_INT16 = struct.Struct("!h")
+_INT32 = struct.Struct("!i")
+_INT64 = struct.Struct("!q")
+_FLOAT32 = struct.Struct("!f")
+_FLOAT64 = struct.Struct("!d")
+
+
+class CodecError(ValueError):
+    """
+    Payload binario inválido (truncado, tipo desconocido, etc.).
+    """
+
+
+def decimalize(obj):
+    """
+    Convierte recursivamente los float a Decimal (DynamoDB no acepta
+    float) y deja intactos los Decimal ya existentes. Equivale a
+    json.loads(json.dumps(obj), parse_float=Decimal) pero admite Decimal.
+    Lanza TypeError con tipos que JSON tampoco admite.
+    """
+    if isinstance(obj, dict):
+        return {key: decimalize(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [decimalize(value) for value in obj]
+    if isinstance(obj, float):
+        return Decimal(repr(obj))
+    if obj is None or isinstance(obj, (str, int, Decimal)):
+        return obj
+    raise TypeError(
+        f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# --- Codificación ---
+
+def _pack_int(obj, out):
+    if 0 <= obj < 0x80:
+        out.append(obj)
+    elif -32 <= obj < 0:
+        out.append(obj & 0xff)
+    elif obj >= 0:
+        if obj <= 0xff:
+            out.append(0xcc)
+            out += _UINT8.pack(obj)
+        elif obj <= 0xffff:
+            out.append(0xcd)
+            out += _UINT16.pack(obj)
+        elif obj <= 0xffffffff:
+            out.append(0xce)
+            out += _UINT32.pack(obj)
+        elif obj <= 0xffffffffffffffff:
+            out.append(0xcf)
+            out += _UINT64.pack(obj)
+        else:
+            _pack_decimal(Decimal(obj), out)  # DynamoDB admite 38 dígitos
+    elif obj >= -0x80:
+        out.append(0xd0)
+        out += _INT8.pack(obj)
+    elif obj >= -0x8000:
+        out.append(0xd1)
+        out += _INT16.pack(obj)
+    elif obj >= -0x80000000:
+        out.append(0xd2)
+        out += _INT32.pack(obj)
+    elif obj >= -0x8000000000000000:
+        out.append(0xd3)
+        out += _INT64.pack(obj)
+    else:
+        _pack_decimal(Decimal(obj), out)
+
+
+def _pack_str(obj, out):
+    data = obj.encode('utf-8')
+    n = len(data)
+    if n < 32:
+        out.append(0xa0 | n)
+    elif n <= 0xff:
+        out.append(0xd9)
+        out += _UINT8.pack(n)
+    elif n <= 0xffff:
+        out.append(0xda)
+        out += _UINT16.pack(n)
+    else:
+        out.append(0xdb)
+        out += _UINT32.pack(n)
+    out += data
+
+
+def _pack_decimal(obj, out):
+    data = str(obj).encode('ascii')
+    n = len(data)
+    if n <= 0xff:
+        out.append(0xc7)
+        out += _UINT8.pack(n)
+    else:
+        out.append(0xc8)
+        out += _UINT16.pack(n)
+    out.append(EXT_DECIMAL)
+    out += data
+
+
+def _pack(obj, out):
+    kind = type(obj)
+    if kind is str:
+        _pack_str(obj, out)
+    elif obj is None:
+        out.append(0xc0)
+    elif obj is True:
+        out.append(0xc3)
+    elif obj is False:
+        out.append(0xc2)
+    elif kind is int:
+        _pack_int(obj, out)
+    elif kind is Decimal:
+        _pack_decimal(obj, out)
+    elif kind is float:
+        out.append(0xcb)
+        out += _FLOAT64.pack(obj)
+    elif isinstance(obj, dict):
+        n = len(obj)
+        if n < 16:
+            out.append(0x80 | n)
+        elif n <= 0xffff:
+            out.append(0xde)
+            out += _UINT16.pack(n)
+        else:
+            out.append(0xdf)
+            out += _UINT32.pack(n)
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    elif isinstance(obj, (list, tuple)):
+        n = len(obj)
+        if n < 16:
+            out.append(0x90 | n)
+        elif n <= 0xffff:
+            out.append(0xdc)
+            out += _UINT16.pack(n)
+        else:
+            out.append(0xdd)
+            out += _UINT32.pack(n)
+        for value in obj:
+            _pack(value, out)
+    elif isinstance(obj, (bytes, bytearray)):
+        n = len(obj)
+        if n <= 0xff:
+            out.append(0xc4)
+            out += _UINT8.pack(n)
+        elif n <= 0xffff:
+            out.append(0xc5)
+            out += _UINT16.pack(n)
+        else:
+            out.append(0xc6)
+            out += _UINT32.pack(n)
+        out += obj
+    elif isinstance(obj, int):
+        _pack_int(int(obj), out)
+    elif isinstance(obj, str):
+        _pack_str(str(obj), out)
+    else:
+        raise TypeError(
+            f"Object of type {type(obj).__name__} is not serializable")
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return msgpack.ExtType(EXT_DECIMAL, str(obj).encode('ascii'))
+    if isinstance(obj, int):  # Enteros fuera del rango de 64 bits
+        return msgpack.ExtType(EXT_DECIMAL, str(obj).encode('ascii'))
+    raise TypeError(
+        f"Object of type {type(obj).__name__} is not serializable")
+
+
+def pack(message):
+    """
+    Serializa un mensaje (dicts, listas, str, números, Decimal, bool,
+    None) en formato binario.
+    """
+    if msgpack is not None:
+        return msgpack.packb(message, default=_default, use_bin_type=True)
+    out = bytearray()
+    _pack(message, out)
+    return bytes(out)
+
+
+# --- Decodificación ---
+
+class _Reader:
+    """
+    Decodificador recursivo sobre un buffer completo (un frame).
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def take(self, n):
+        end = self.pos + n
+        if end > len(self.data):
+            raise CodecError("Payload binario truncado.")
+        chunk = self.data[self.pos:end]
+        self.pos = end
+        return chunk
+
+    def unpack(self, fmt):
+        end = self.pos + fmt.size
+        if end > len(self.data):
+            raise CodecError("Payload binario truncado.")
+        value = fmt.unpack_from(self.data, self.pos)[0]
+        self.pos = end
+        return value
+
+    def read(self):
+        if self.pos >= len(self.data):
+            raise CodecError("Payload binario truncado.")
+        b = self.data[self.pos]
+        self.pos += 1
+        if b <= 0x7f:
+            return b
+        if b >= 0xe0:
+            return b - 0x100
+        if b >= 0xa0 and b <= 0xbf:
+            return self._str(b & 0x1f)
+        if b <= 0x8f:
+            return self._map(b & 0x0f)
+        if b <= 0x9f:
+            return self._array(b & 0x0f)
+        handler = _HANDLERS.get(b)
+        if handler is None:
+            raise CodecError(f"Byte de tipo inválido: 0x{b:02x}")
+        return handler(self)
+
+    def _str(self, n):
+        end = self.pos + n
+        if end > len(self.data):
+            raise CodecError("Payload binario truncado.")
+        try:
+            value = self.data[self.pos:end].decode('utf-8')
+        except UnicodeDecodeError as e:
+            raise CodecError(f"Cadena UTF-8 inválida: {e}")
+        self.pos = end
+        return value
+
+    def _array(self, n):
+        return [self.read() for _ in range(n)]
+
+    def _map(self, n):
+        result = {}
+        for _ in range(n):
+            key = self.read()
+            try:
+                result[key] = self.read()
+            except TypeError:
+                raise CodecError("Clave de mapa no válida.")
+        return result
+
+    def _ext(self, n):
+        ext_type = self.unpack(_INT8)
+        return _decode_ext(ext_type, self.take(n))
+
+
+# Decodificación de los tipos que no son "fix" (byte de tipo -> función)
+_HANDLERS = {
+    0xc0: lambda r: None,
+    0xc2: lambda r: False,
+    0xc3: lambda r: True,
+    0xcc: lambda r: r.unpack(_UINT8),
+    0xcd: lambda r: r.unpack(_UINT16),
+    0xce: lambda r: r.unpack(_UINT32),
+    0xcf: lambda r: r.unpack(_UINT64),
+    0xd0: lambda r: r.unpack(_INT8),
+    0xd1: lambda r: r.unpack(_INT16),
+    0xd2: lambda r: r.unpack(_INT32),
+    0xd3: lambda r: r.unpack(_INT64),
+    0xca: lambda r: r.unpack(_FLOAT32),
+    0xcb: lambda r: r.unpack(_FLOAT64),
+    0xd9: lambda r: r._str(r.unpack(_UINT8)),
+    0xda: lambda r: r._str(r.unpack(_UINT16)),
+    0xdb: lambda r: r._str(r.unpack(_UINT32)),
+    0xc4: lambda r: r.take(r.unpack(_UINT8)),
+    0xc5: lambda r: r.take(r.unpack(_UINT16)),
+    0xc6: lambda r: r.take(r.unpack(_UINT32)),
+    0xdc: lambda r: r._array(r.unpack(_UINT16)),
+    0xdd: lambda r: r._array(r.unpack(_UINT32)),
+    0xde: lambda r: r._map(r.unpack(_UINT16)),
+    0xdf: lambda r: r._map(r.unpack(_UINT32)),
+    0xd4: lambda r: r._ext(1),  # fixext 1/2/4/8/16
+    0xd5: lambda r: r._ext(2),
+    0xd6: lambda r: r._ext(4),
+    0xd7: lambda r: r._ext(8),
+    0xd8: lambda r: r._ext(16),
+    0xc7: lambda r: r._ext(r.unpack(_UINT8)),
+    0xc8: lambda r: r._ext(r.unpack(_UINT16)),
+    0xc9: lambda r: r._ext(r.unpack(_UINT32)),
+}
+
+
+def _decode_ext(ext_type, data):
+    if ext_type != EXT_DECIMAL:
+        raise CodecError(f"Tipo extendido desconocido: {ext_type}")
+    try:
+        return Decimal(data.decode('ascii'))
+    except (UnicodeDecodeError, ArithmeticError):
+        raise CodecError("Decimal inválido en el payload binario.")
+
+
+def unpack(payload):
+    """
+    Decodifica un payload binario completo. Lanza CodecError si es inválido.
+    """
+    if msgpack is not None:
+        try:
+            return msgpack.unpackb(payload, raw=False, strict_map_key=False,
+                                   ext_hook=_decode_ext)
+        except CodecError:
+            raise
+        except Exception as e:
+            raise CodecError(f"Payload binario inválido: {e}")
+    reader = _Reader(payload)
+    message = reader.read()
+    if reader.pos != len(payload):
+        raise CodecError("Bytes sobrantes al final del payload binario.")
+    return message
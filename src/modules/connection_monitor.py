@@ -0,0 +1,92 @@
+# src/modules/connection_monitor.py
+
+import selectors
+import socket
+import threading
+
+from modules.logger import get_logger
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * connection_monitor.py
+# * Vigila las conexiones inactivas (nuevas, persistentes o suscriptores)
+# * con un único hilo y un selector, y las entrega al pool de trabajo
+# * cuando tienen datos para leer.
+# *----------------------------------------------------------------------------
+
+log = get_logger("connection_monitor")
+
+
+class ConnectionMonitor:
+    """
+    Mantiene "estacionadas" las conexiones sin solicitudes pendientes, de
+    modo que un cliente inactivo no ocupe un hilo del pool.
+    Cuando una conexión tiene datos, se llama a on_ready(connection); si
+    devuelve False (pool lleno), se llama a on_rejected(connection).
+    """
+
+    def __init__(self, on_ready, on_rejected):
+        self._on_ready = on_ready
+        self._on_rejected = on_rejected
+        self._selector = selectors.DefaultSelector()
+        self._incoming = []
+        self._lock = threading.Lock()
+        # Par de sockets para despertar al selector desde otros hilos
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._thread = threading.Thread(
+            target=self._run, name="connection-monitor", daemon=True)
+        self._thread.start()
+
+    def park(self, connection):
+        """
+        Registra una conexión para esperar datos. Thread-safe.
+        """
+        with self._lock:
+            self._incoming.append(connection)
+        try:
+            self._wake_w.send(b"\0")
+        except BlockingIOError:
+            pass  # Ya hay un aviso pendiente
+
+    def parked_count(self):
+        """
+        Cantidad de conexiones esperando datos.
+        """
+        return len(self._selector.get_map()) - 1
+
+    def _register_incoming(self):
+        with self._lock:
+            incoming, self._incoming = self._incoming, []
+        for connection in incoming:
+            try:
+                self._selector.register(
+                    connection.sock, selectors.EVENT_READ, connection)
+            except (ValueError, KeyError, OSError):
+                # Socket cerrado o ya registrado
+                connection.close()
+
+    def _run(self):
+        while True:
+            for key, _ in self._selector.select():
+                if key.data is None:
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    self._register_incoming()
+                    continue
+
+                connection = key.data
+                self._selector.unregister(key.fileobj)
+                try:
+                    if not self._on_ready(connection):
+                        self._on_rejected(connection)
+                except Exception as e:
+                    log.exception("Error inesperado en el monitor de conexiones: %s", e)
+                    connection.close()
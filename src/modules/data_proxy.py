@@ -1,15 +1,31 @@
 # src/modules/data_proxy.py
 
 import sys
+import bisect
+import hashlib
 import uuid
+import base64
+import binascii
+import queue
+import random
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from decimal import Decimal
-import botocore
-from botocore.exceptions import ClientError
 import json
 
-# Importamos nuestro módulo Singleton
-from modules.db_singleton import DatabaseSingleton
+from modules.storage import (StorageError, ConditionFailed, InstrumentedBackend,
+                             create_backend, normalize, project, version_of, matches_conditions,
+                             BACKEND_DYNAMODB, VERSION_FIELD, QUERY_EQ, QUERY_PREFIX)
+from modules.cache import LRUCache
+from modules.logger import get_logger, payloads_enabled
+from modules.metrics import REGISTRY
+from modules.audit import AuditLogWriter
+from modules.coalescer import WriteCoalescer
+from modules.secondary_index import SecondaryIndex
+from modules import codec
+from modules.codec import decimalize
 
 # *----------------------------------------------------------------------------
 # * UADER-FCyT
@@ -17,9 +33,257 @@ from modules.db_singleton import DatabaseSingleton
 # *
 # * data_proxy.py
 # * Módulo que implementa el patrón Proxy para el acceso a datos.
-# * Abstrae el acceso a DynamoDB y gestiona la auditoría.
+# * Abstrae el acceso al almacenamiento (DynamoDB, memoria o SQLite, ver
+# * modules.storage) y gestiona la auditoría.
 # *----------------------------------------------------------------------------
 
+log = get_logger("data_proxy")
+
+# Tamaño de página por defecto y máximo de la acción 'list' paginada
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Máximo de segmentos de un escaneo paralelo
+MAX_SCAN_SEGMENTS = 64
+
+# Reintentos de claves/ítems no procesados y máximo de ítems por solicitud
+BATCH_MAX_RETRIES = 8
+BATCH_BACKOFF_BASE = 0.05
+MAX_BULK_ITEMS = 1000
+
+# Campos que no forman parte del contenido de un ítem al compararlo: los
+# de control del protocolo y la versión
+NON_CONTENT_FIELDS = frozenset(("ACTION", "UUID", "REQID", VERSION_FIELD))
+
+# Segundos de validez de un ítem en la caché de lectura: acota cuánto
+# tiempo se sirve un ítem que otro escritor (otro nodo, la tabla
+# directamente) cambió sin pasar por este proceso
+DEFAULT_CACHE_TTL = 30.0
+
+# Reintentos de una escritura sin versión del cliente que pierde la
+# condición contra otro escritor
+WRITE_CONFLICT_RETRIES = 3
+
+WRITES = REGISTRY.counter(
+    "item_writes_total", "Escrituras de ítems por resultado", ("result",))
+WRITES_APPLIED = WRITES.labels("written")
+WRITES_UNCHANGED = WRITES.labels("unchanged")
+WRITES_CONFLICT = WRITES.labels("conflict")
+
+QUERIES = REGISTRY.counter(
+    "queries_total", "Consultas 'query' por forma de resolverlas", ("source",))
+QUERIES_INDEX = QUERIES.labels("index")
+QUERIES_STORAGE = QUERIES.labels("storage")
+
+
+def backoff_delay(attempt):
+    """
+    Espera exponencial con jitter para el reintento número attempt.
+    """
+    return random.uniform(0, BATCH_BACKOFF_BASE * (2 ** attempt))
+
+
+def chunked(sequence, size):
+    """
+    Divide una secuencia en listas de a lo sumo size elementos (None =
+    sin límite, una sola lista).
+    """
+    if size is None:
+        return [list(sequence)] if sequence else []
+    return [sequence[i:i + size] for i in range(0, len(sequence), size)]
+
+
+def _canonical(value):
+    """
+    Forma comparable de un valor ya normalizado: cada número y cada texto
+    llevan su tipo, así el número 1 y el texto "1" no se confunden.
+    """
+    if isinstance(value, dict):
+        return {key: _canonical(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    if isinstance(value, Decimal):
+        return "n:" + str(value.normalize())  # 1.0 y 1 son el mismo número
+    if isinstance(value, str):
+        return "s:" + value
+    return value
+
+
+def content_hash(item):
+    """
+    Resumen del contenido de un ítem, independiente del orden de las claves
+    y de la representación de los números, sin los NON_CONTENT_FIELDS.
+    """
+    content = {key: _canonical(value) for key, value in normalize(item).items()
+               if key not in NON_CONTENT_FIELDS}
+    raw = json.dumps(content, sort_keys=True, separators=(',', ':'),
+                     ensure_ascii=False)
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).digest()
+
+
+def parse_limit(limit):
+    """
+    Tamaño de página de 'list'/'query' (DEFAULT_PAGE_SIZE si no se indica,
+    a lo sumo MAX_PAGE_SIZE). Lanza ValueError si no es un entero positivo.
+    """
+    try:
+        limit = DEFAULT_PAGE_SIZE if limit is None else int(limit)
+    except (TypeError, ValueError):
+        raise ValueError(limit)
+    if limit <= 0:
+        raise ValueError(limit)
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def parse_conditions(where):
+    """
+    Convierte el 'WHERE' de una consulta ({"provincia": "Entre Rios",
+    "CUIT": {"PREFIX": "30-"}}) en condiciones (atributo, operador, valor).
+    Lanza ValueError si no es válido.
+    """
+    if not isinstance(where, dict) or not where:
+        raise ValueError("'WHERE' debe ser un objeto con al menos una condición.")
+    conditions = []
+    for attribute, value in where.items():
+        if isinstance(value, dict):
+            prefix = value.get("PREFIX")
+            if set(value) != {"PREFIX"} or not isinstance(prefix, str) or not prefix:
+                raise ValueError(f"Condición inválida para '{attribute}': se espera "
+                                 "un valor o {\"PREFIX\": texto}.")
+            conditions.append((attribute, QUERY_PREFIX, prefix))
+        elif value is None or isinstance(value, list):
+            raise ValueError(f"Condición inválida para '{attribute}'.")
+        else:
+            conditions.append((attribute, QUERY_EQ, normalize(value)))
+    return conditions
+
+
+def parse_fields(fields):
+    """
+    Valida el 'FIELDS' de una lectura: una lista de atributos (la
+    proyección) o None para los ítems completos. Lanza ValueError si no
+    es válido.
+    """
+    if fields is None:
+        return None
+    if not isinstance(fields, list) or \
+            not all(isinstance(field, str) and field for field in fields):
+        raise ValueError(fields)
+    return fields or None
+
+
+def encode_cursor(last_evaluated_key):
+    """
+    Convierte la última clave de un scan (LastEvaluatedKey) en un cursor
+    opaco (base64). Se codifica con modules.codec, que conserva los
+    Decimal: una clave numérica de un GSI vuelve como número y no como
+    texto.
+    """
+    raw = codec.pack(last_evaluated_key)
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    Recupera el ExclusiveStartKey a partir de un cursor opaco.
+    Lanza ValueError si el cursor no es válido.
+    """
+    try:
+        key = codec.unpack(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (AttributeError, UnicodeError, ValueError, binascii.Error) as e:
+        raise ValueError(f"Cursor inválido: {e}")
+    if not isinstance(key, dict) or 'id' not in key:
+        raise ValueError("Cursor inválido: falta la clave 'id'.")
+    return key
+
+
+def _invalid_id(item_id):
+    """
+    Devuelve el error a responder si item_id no es un ID válido (un texto
+    no vacío), o None si lo es. Se valida antes de usarlo como clave de
+    la caché, que no admite claves no hashables como listas.
+    """
+    if isinstance(item_id, str) and item_id:
+        return None
+    return {"error": "Invalid ID", "message": "'ID' debe ser un texto no vacío."}
+
+
+def _clone_item(value):
+    """
+    Copia profunda de un ítem (dicts, listas y conjuntos anidados) para la
+    caché; los valores escalares son inmutables y se comparten.
+    """
+    if isinstance(value, dict):
+        return {key: _clone_item(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_clone_item(item) for item in value]
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+def _completed(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def scan_segments(storage, total_segments, executor, fields=None):
+    """
+    Escaneo paralelo: divide la tabla en total_segments segmentos
+    (Segment/TotalSegments de DynamoDB o su equivalente en los motores
+    locales) y los recorre al mismo tiempo en
+    el executor. Es un generador que entrega cada página de ítems apenas
+    llega, en el orden en que terminan los segmentos. Con fields, solo
+    esos atributos de cada ítem.
+    La cola de páginas es acotada: si el consumidor es lento los segmentos
+    esperan, y si abandona el generador los segmentos se cancelan.
+    """
+    pages = queue.Queue(maxsize=2 * total_segments)
+    cancelled = threading.Event()
+    done = object()  # Marca de fin de un segmento
+
+    def put(page):
+        while not cancelled.is_set():
+            try:
+                pages.put(page, timeout=0.5)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def scan_segment(segment):
+        start_key = None
+        try:
+            while True:
+                items, start_key = storage.scan(
+                    start_key=start_key, segment=segment,
+                    total_segments=total_segments, fields=fields)
+                if not put(items):
+                    return
+                if not start_key:
+                    break
+        except Exception as e:
+            put(e)
+        finally:
+            put(done)
+
+    for segment in range(total_segments):
+        executor.submit(scan_segment, segment)
+
+    remaining = total_segments
+    try:
+        while remaining:
+            page = pages.get()
+            if page is done:
+                remaining -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield page
+    finally:
+        cancelled.set()
+
 
 class DataProxy:
     """
@@ -28,113 +292,664 @@ class DataProxy:
     la auditoría de las operaciones.
     """
 
-    def __init__(self):
+    def __init__(self, cache_size=1024, cache_ttl=DEFAULT_CACHE_TTL, scan_segments=1,
+                 scan_workers=8, audit_queue_size=10000, audit_flush_interval=1.0,
+                 audit_overflow="block", audit_spill_path="audit_spill.jsonl",
+                 storage=None, write_state_size=100000, write_coalesce=0,
+                 query_index=None):
         """
-        Inicializa el Proxy obteniendo la instancia única del Singleton
-        y las tablas de base de datos.
+        Inicializa el Proxy sobre un motor de almacenamiento.
+        storage: instancia de modules.storage.StorageBackend (por defecto
+        DynamoDB, con la instancia única del DatabaseSingleton).
+        cache_size: cantidad máxima de ítems en la caché de lectura (0 = sin caché).
+        cache_ttl: segundos de validez de un ítem cacheado (None o 0 = sin vencimiento).
+        scan_segments: segmentos por defecto del listado completo (1 = secuencial).
+        scan_workers: hilos del pool que recorre los segmentos en paralelo.
+        audit_*: cola, intervalo de escritura, política de desborde
+        ('block', 'drop' o 'spill') y archivo local del escritor de auditoría.
+        write_state_size: ids cuyo resumen de contenido y versión se
+        recuerdan para descartar escrituras sin cambios.
+        write_coalesce: ventana en segundos para combinar las escrituras
+        de un mismo id (0 = cada 'set' se escribe por separado).
+        query_index: atributos del índice secundario en memoria de 'query'
+        (se carga en segundo plano recorriendo la tabla; None = sin índice).
         """
+        self.cache = LRUCache(max_size=cache_size, ttl=cache_ttl, copy=_clone_item)
+        # id -> (content_hash, versión) de la última escritura conocida
+        self._write_state = LRUCache(max_size=write_state_size)
+        self.coalescer = WriteCoalescer(self._write_item, write_coalesce) \
+            if write_coalesce > 0 else None
+        self.scan_segments = scan_segments
+        self.scan_executor = ThreadPoolExecutor(
+            max_workers=scan_workers, thread_name_prefix="scan")
         try:
-            self.db_instance = DatabaseSingleton()
-            self.table_data = self.db_instance.get_corporate_data_table()
-            self.table_log = self.db_instance.get_corporate_log_table()
-            print("DataProxy inicializado y listo.")
+            self.storage = InstrumentedBackend(
+                storage or create_backend(BACKEND_DYNAMODB))
+            self.audit = AuditLogWriter(
+                self.storage, queue_size=audit_queue_size,
+                flush_interval=audit_flush_interval, overflow=audit_overflow,
+                spill_path=audit_spill_path)
+            self.index = SecondaryIndex(query_index) if query_index else None
+            if self.index is not None:
+                threading.Thread(target=self._load_index, name="index-loader",
+                                 daemon=True).start()
+            log.info("DataProxy inicializado y listo.")
         except Exception as e:
-            print(
-                f"Error fatal al inicializar DataProxy: {e}", file=sys.stderr)
+            log.error("Error fatal al inicializar DataProxy: %s", e)
             sys.exit(1)
 
     def _log_action(self, client_uuid, session_id, action, details=""):
         """
         Método privado para registrar una acción en la tabla CorporateLog.
+        El registro se encola y lo escribe el AuditLogWriter en segundo
+        plano, por lo que no agrega latencia a la operación.
         """
-        try:
-            now = datetime.now()
-            ts = now.strftime("%Y-%m-%d %H:%M:%S")
-            log_id = str(uuid.uuid4())  # ID único para la entrada de log
-
-            item_to_log = {
-                'id': log_id,
-                'CPUid': str(client_uuid),
-                'sessionid': str(session_id),
-                'timestamp': ts,
-                'action': action,
-                'details': details
-            }
+        now = datetime.now()
+        ts = now.strftime("%Y-%m-%d %H:%M:%S")
+        log_id = str(uuid.uuid4())  # ID único para la entrada de log
 
-            self.table_log.put_item(Item=item_to_log)
-            print(
-                f"AUDITORÍA: Acción '{action}' registrada para CPUid {client_uuid}.")
+        item_to_log = {
+            'id': log_id,
+            'CPUid': str(client_uuid),
+            'sessionid': str(session_id),
+            'timestamp': ts,
+            'action': action,
+            'details': details
+        }
 
-        except ClientError as e:
-            print(
-                f"Error de Boto3 al registrar log: {e.response['Error']['Message']}", file=sys.stderr)
-        except Exception as e:
-            print(f"Error inesperado al registrar log: {e}", file=sys.stderr)
+        self.audit.record(item_to_log)
+        log.debug("AUDITORÍA: Acción '%s' encolada para CPUid %s.", action, client_uuid)
 
-    def get_item(self, item_id, client_uuid, session_id):
+    def get_item(self, item_id, client_uuid, session_id, fields=None):
         """
-        Obtiene un ítem específico de la tabla CorporateData.
+        Obtiene un ítem específico de la tabla CorporateData (con fields,
+        solo esos atributos).
         """
+        error = _invalid_id(item_id)
+        if error:
+            return error, 400
+        try:
+            fields = parse_fields(fields)
+        except ValueError:
+            return {"error": "Invalid Fields", "message": "'FIELDS' debe ser una lista de atributos."}, 400
+
         self._log_action(client_uuid, session_id, "get",
                          f"ID solicitado: {item_id}")
 
-        try:
-            response = self.table_data.get_item(
-                Key={'id': item_id}
-            )
-            if 'Item' in response:
-                return response['Item'], 200
-            else:
-                return {"error": "Missing ID", "message": f"No se encontró el ítem con id '{item_id}'"}, 404
+        # Lectura a través de la caché: solo se consulta el almacenamiento si falla
+        cached_item = self.cache.get(item_id)
+        if cached_item is not None:
+            return project(cached_item, fields), 200
 
-        except ClientError as e:
-            return {"error": "DB Error", "message": e.response['Error']['Message']}, 500
+        # La caché guarda solo ítems completos, y no los que se escribieron
+        # mientras se leían (el valor leído podría ser el anterior)
+        token = self.cache.reserve(item_id) if fields is None else None
+        item = None
+        try:
+            item = self.storage.get_item(item_id, fields)
+        except StorageError as e:
+            return {"error": "DB Error", "message": e.message}, 500
+        finally:
+            self.cache.fill(item_id, item, token)
+        if item is not None:
+            return item, 200
+        return {"error": "Missing ID", "message": f"No se encontró el ítem con id '{item_id}'"}, 404
 
     def set_item(self, item_data, client_uuid, session_id):
         """
         Crea o actualiza un ítem en la tabla CorporateData.
-        Convierte automáticamente floats de JSON a Decimal para DynamoDB.
+        Convierte automáticamente floats de JSON a Decimal (como DynamoDB).
+        """
+        response_data, status_code, _, _ = self.set_item_with_previous(
+            item_data, client_uuid, session_id)
+        return response_data, status_code
+
+    def _write_state_of(self, item_id, fresh=False):
+        """
+        (content_hash, versión) del ítem almacenado, de la última escritura
+        conocida, de la caché de lectura o, si no, leyéndolo. (None, 0) si
+        no existe. Con fresh se lee siempre del almacenamiento: lo conocido
+        puede estar viejo si escribe otro proceso sobre la misma tabla.
+        """
+        state = None if fresh else self._write_state.get(item_id)
+        if state is not None:
+            return state
+        item = None if fresh else self.cache.get(item_id)
+        if item is None:
+            item = self.storage.get_item(item_id)
+        state = (content_hash(item), version_of(item)) if item is not None else (None, 0)
+        self._write_state.put(item_id, state)
+        return state
+
+    def _forget(self, item_id):
+        self._write_state.invalidate(item_id)
+        self.cache.invalidate(item_id)
+
+    def apply_remote_writes(self, items):
+        """
+        Ítems que escribió otro proceso (modo multiproceso o federación):
+        se descarta lo cacheado, así la próxima lectura o escritura va al
+        almacenamiento, y se actualiza el índice secundario.
+        """
+        for item in items:
+            self._forget(item.get('id'))
+        if self.index is not None:
+            self.index.update(items)
+
+    def set_item_with_previous(self, item_data, client_uuid, session_id):
+        """
+        Igual que set_item, pero devuelve además la versión anterior del
+        ítem (None si no existía), que el motor entrega al escribir (en
+        DynamoDB con ReturnValues='ALL_OLD', sin costo de lectura adicional), y si
+        el ítem cambió. Se usa para notificar solo los cambios.
+        Con la combinación de escrituras activada (write_coalesce), las
+        actualizaciones del mismo id dentro de la ventana se graban juntas
+        y solo una de ellas devuelve changed=True. Las que traen
+        '_version' no se combinan.
+        Bloquea hasta que se confirma la escritura (ver submit_set_item).
+        """
+        return self.submit_set_item(item_data, client_uuid, session_id).result()
+
+    def submit_set_item(self, item_data, client_uuid, session_id):
+        """
+        Como set_item_with_previous, pero devuelve un Future con su
+        resultado. Con la combinación de escrituras el Future se completa
+        al vencer la ventana, sin ocupar al hilo que llama mientras tanto;
+        si no, ya está completo.
         """
+        error = _invalid_id(item_data.get('id'))
+        if error:
+            return _completed((error, 400, None, False))
+        if self.coalescer is None or VERSION_FIELD in item_data:
+            return _completed(self._write_item(item_data, client_uuid, session_id))
+        try:
+            decimalize(item_data)
+        except TypeError as e:
+            return _completed(({"error": "Data Error", "message": f"Error de tipo de dato. ¿Campos vacíos? Detalle: {e}"}, 400, None, False))
+        return self.coalescer.submit(item_data.get('id'), item_data,
+                                     client_uuid, session_id)
+
+    @staticmethod
+    def _set_details(item_data):
+        # El contenido del ítem solo se audita con --log-payloads
+        if payloads_enabled():
+            return f"Datos a modificar: {item_data}"
+        return f"ID a modificar: {item_data.get('id')}"
+
+    def _write_item(self, item_data, client_uuid, session_id, absorbed=()):
+        """
+        Escritura de un ítem. Si el contenido es igual al almacenado no se
+        escribe nada. Si no, la escritura es condicional a la versión
+        ('_version') leída: con '_version' del cliente, un conflicto
+        responde 409; sin ella, se relee la versión y se reintenta.
+        absorbed: (ítem, client_uuid, session_id) de las solicitudes
+        anteriores que combina esta escritura; cada una se audita con su
+        propio cliente y sesión.
+        """
+        item_id = item_data.get('id')
         try:
             # Convertir floats a Decimal recursivamente
-            item_data_decimal = json.loads(
-                json.dumps(item_data), parse_float=Decimal)
+            item_data_decimal = decimalize(item_data)
+            client_version = item_data_decimal.pop(VERSION_FIELD, None)
+            if client_version is not None:
+                if isinstance(client_version, bool) or \
+                        not isinstance(client_version, (int, Decimal)) or \
+                        client_version != int(client_version) or client_version < 0:
+                    return {"error": "Invalid Version",
+                            "message": f"'{VERSION_FIELD}' debe ser un entero no negativo."}, 400, None, False
+                client_version = int(client_version)
+            digest = content_hash(item_data_decimal)
 
             # Log ANTES de la operación
-            self._log_action(client_uuid, session_id, "set",
-                             f"Datos a modificar: {item_data}")
+            for item, uuid_absorbed, session_absorbed in absorbed:
+                self._log_action(uuid_absorbed, session_absorbed, "set",
+                                 self._set_details(item) + " (combinada con una posterior)")
+            details = self._set_details(item_data)
+            if absorbed:
+                details += f" ({len(absorbed) + 1} solicitudes combinadas)"
+            self._log_action(client_uuid, session_id, "set", details)
 
-            response = self.table_data.put_item(
-                Item=item_data_decimal
-            )
+            for attempt in range(WRITE_CONFLICT_RETRIES + 1):
+                stored_digest, version = self._write_state_of(item_id)
+                if digest == stored_digest or \
+                        (client_version is not None and client_version != version):
+                    # Un 409 o un "sin cambios" no pasan por la escritura
+                    # condicional: se confirman con el ítem almacenado
+                    stored_digest, version = self._write_state_of(item_id, fresh=True)
+                if client_version is not None and client_version != version:
+                    WRITES_CONFLICT.inc()
+                    return self._conflict(item_id, version), 409, None, False
+                if digest == stored_digest:
+                    # Sin cambios: ni escritura ni notificación
+                    WRITES_UNCHANGED.inc()
+                    return dict(item_data_decimal, **{VERSION_FIELD: version}), 200, None, False
 
-            status_code = response['ResponseMetadata']['HTTPStatusCode']
-            if status_code == 200:
-                return item_data, 200  # Devuelve el ítem insertado
-            else:
-                return {"error": "Set Failed", "message": "La operación put_item no retornó 200"}, status_code
+                item_data_decimal[VERSION_FIELD] = version + 1
+                try:
+                    previous = self.storage.put_item(item_data_decimal,
+                                                     expected_version=version)
+                    break
+                except ConditionFailed:
+                    # Otro escritor se adelantó: la versión conocida quedó vieja
+                    self._forget(item_id)
+                    if client_version is not None or attempt == WRITE_CONFLICT_RETRIES:
+                        WRITES_CONFLICT.inc()
+                        return self._conflict(item_id), 409, None, False
+
+            WRITES_APPLIED.inc()
+            self._write_state.put(item_id, (digest, version + 1))
+            if self.index is not None:
+                self.index.update([item_data_decimal])
+            # El ítem escrito pasa a ser la versión cacheada
+            self.cache.put(item_id, item_data_decimal)
+            # Devuelve el ítem insertado, con su nueva versión
+            return item_data_decimal, 200, previous, True
 
-        except ClientError as e:
-            return {"error": "DB Error", "message": e.response['Error']['Message']}, 500
+        except StorageError as e:
+            # Estado desconocido en el almacenamiento: la próxima lectura va a la tabla
+            self._forget(item_id)
+            return {"error": "DB Error", "message": e.message}, 500, None, False
         except TypeError as e:
-            return {"error": "Data Error", "message": f"Error de tipo de dato. ¿Campos vacíos? Detalle: {e}"}, 400
+            return {"error": "Data Error", "message": f"Error de tipo de dato. ¿Campos vacíos? Detalle: {e}"}, 400, None, False
         except Exception as e:
-            return {"error": "Data Error", "message": str(e)}, 400
+            return {"error": "Data Error", "message": str(e)}, 400, None, False
+
+    @staticmethod
+    def _conflict(item_id, version=None):
+        response = {"error": "Version Conflict",
+                    "message": f"El ítem '{item_id}' fue modificado por otro escritor."}
+        if version is not None:
+            response[VERSION_FIELD] = version
+        return response
+
+    def _fetch_items(self, item_ids, fields=None):
+        """
+        Lee ítems por id: de la caché lo que pueda y el resto en bloques con
+        BatchGetItem, reintentando los no procesados. Devuelve (dict id ->
+        ítem, ids no procesados). Los leídos se guardan en la caché salvo
+        que se hayan escrito durante la lectura o se pidan solo algunos
+        atributos (fields). Lanza StorageError.
+        """
+        found = {}
+        to_fetch = []
+        for item_id in item_ids:
+            cached_item = self.cache.get(item_id)
+            if cached_item is not None:
+                found[item_id] = project(cached_item, fields)
+            else:
+                to_fetch.append(item_id)
+
+        tokens = {item_id: self.cache.reserve(item_id)
+                  for item_id in to_fetch} if fields is None else {}
+        fetched = {}
+        try:
+            fetched, unprocessed = self._batch_get(to_fetch, fields)
+        finally:
+            for item_id, token in tokens.items():
+                self.cache.fill(item_id, fetched.get(item_id), token)
+        found.update(fetched)
+        return found, unprocessed
+
+    def _batch_get(self, item_ids, fields=None):
+        """
+        Lee ítems del almacenamiento en bloques con BatchGetItem,
+        reintentando los no procesados. Devuelve (dict id -> ítem, ids no
+        procesados). Lanza StorageError.
+        """
+        found = {}
+        unprocessed = []
+        for chunk in chunked(item_ids, self.storage.batch_get_limit):
+            pending = chunk
+            for attempt in range(BATCH_MAX_RETRIES + 1):
+                items, pending = self.storage.batch_get(pending, fields)
+                for item in items:
+                    found[item['id']] = item
+                if not pending:
+                    break
+                if attempt < BATCH_MAX_RETRIES:
+                    time.sleep(backoff_delay(attempt))
+            unprocessed.extend(pending)
+        return found, unprocessed
+
+    def get_items(self, item_ids, client_uuid, session_id, fields=None):
+        """
+        Lectura masiva (acción 'mget') con BatchGetItem.
+        Sirve desde la caché lo que pueda, pide el resto en bloques del
+        tamaño que admite el motor (100 claves en DynamoDB) y reintenta las
+        claves no procesadas con espera exponencial. Con fields, solo esos
+        atributos de cada ítem.
+        """
+        if not isinstance(item_ids, list) or not item_ids or \
+                not all(isinstance(item_id, str) and item_id for item_id in item_ids):
+            return {"error": "Missing IDS", "message": "La acción 'mget' requiere una lista 'IDS' de ids."}, 400
+        if len(item_ids) > MAX_BULK_ITEMS:
+            return {"error": "Too Many IDS", "message": f"Máximo {MAX_BULK_ITEMS} ids por solicitud."}, 400
+        try:
+            fields = parse_fields(fields)
+        except ValueError:
+            return {"error": "Invalid Fields", "message": "'FIELDS' debe ser una lista de atributos."}, 400
 
-    def list_items(self, client_uuid, session_id):
+        unique_ids = list(dict.fromkeys(item_ids))  # DynamoDB no admite claves repetidas
+        self._log_action(client_uuid, session_id, "mget",
+                         f"IDs solicitados: {len(unique_ids)}")
+
+        try:
+            found, unprocessed = self._fetch_items(unique_ids, fields)
+        except StorageError as e:
+            return {"error": "DB Error", "message": e.message}, 500
+
+        response_data = {
+            "ITEMS": [found[item_id] for item_id in unique_ids if item_id in found],
+            "MISSING": [item_id for item_id in unique_ids
+                        if item_id not in found and item_id not in unprocessed]
+        }
+        if unprocessed:
+            # El motor siguió limitando la lectura: el cliente puede reintentar
+            response_data["UNPROCESSED"] = unprocessed
+            return response_data, 207
+        return response_data, 200
+
+    def set_items(self, items, client_uuid, session_id):
+        """
+        Escritura masiva (acción 'mset') con BatchWriteItem.
+        Escribe en bloques del tamaño que admite el motor (25 ítems en
+        DynamoDB) y reintenta los no procesados con espera exponencial. Devuelve los ítems efectivamente escritos en
+        'ITEMS' y, si quedaron, los ids no escritos en 'UNPROCESSED'.
+        Antes se leen los ítems almacenados (BatchGetItem): los iguales no
+        se escriben (sus ids van en 'UNCHANGED') y los demás se graban con
+        la versión siguiente a la leída. BatchWriteItem no admite
+        condiciones: el '_version' del cliente se ignora y la versión
+        avanza sin verificar.
+        """
+        if not isinstance(items, list) or not items or \
+                not all(isinstance(item, dict) and not _invalid_id(item.get('id')) for item in items):
+            return {"error": "Missing ITEMS",
+                    "message": "La acción 'mset' requiere una lista 'ITEMS' de objetos con 'id'."}, 400
+        if len(items) > MAX_BULK_ITEMS:
+            return {"error": "Too Many ITEMS", "message": f"Máximo {MAX_BULK_ITEMS} ítems por solicitud."}, 400
+
+        try:
+            # Un mismo id repetido en el lote: gana la última versión
+            by_id = {item['id']: item for item in items}
+            items_decimal = decimalize(list(by_id.values()))
+        except (TypeError, ValueError) as e:
+            return {"error": "Data Error", "message": f"Error de tipo de dato. Detalle: {e}"}, 400
+
+        self._log_action(client_uuid, session_id, "mset",
+                         f"IDs a modificar: {list(by_id)}")
+
+        unprocessed = set()
+        try:
+            # Estado almacenado de cada id (no el conocido, que puede estar viejo)
+            stored, unread = self._batch_get(list(by_id))
+            for item_id in unread:
+                stored[item_id] = self.storage.get_item(item_id)
+
+            to_write = []
+            digests = {}
+            unchanged = []
+            for item in items_decimal:
+                item.pop(VERSION_FIELD, None)
+                digest = content_hash(item)
+                current = stored.get(item['id'])
+                if current is not None and content_hash(current) == digest:
+                    self._write_state.put(item['id'], (digest, version_of(current)))
+                    unchanged.append(item['id'])
+                    continue
+                item[VERSION_FIELD] = version_of(current) + 1
+                digests[item['id']] = digest
+                to_write.append(item)
+            WRITES_UNCHANGED.inc(len(unchanged))
+
+            for chunk in chunked(to_write, self.storage.batch_write_limit):
+                pending = chunk
+                for attempt in range(BATCH_MAX_RETRIES + 1):
+                    pending = self.storage.batch_put(pending)
+                    if not pending:
+                        break
+                    if attempt < BATCH_MAX_RETRIES:
+                        time.sleep(backoff_delay(attempt))
+                unprocessed.update(item['id'] for item in pending)
+
+        except StorageError as e:
+            # Parte del lote pudo escribirse: las próximas lecturas van a la tabla
+            for item_id in by_id:
+                self._forget(item_id)
+            return {"error": "DB Error", "message": e.message}, 500
+
+        written = []
+        for item in to_write:
+            if item['id'] not in unprocessed:
+                self._write_state.put(item['id'], (digests[item['id']], version_of(item)))
+                self.cache.put(item['id'], item)
+                written.append(item)
+            else:
+                self._forget(item['id'])
+        WRITES_APPLIED.inc(len(written))
+        if self.index is not None:
+            self.index.update(written)
+
+        response_data = {"ITEMS": written}
+        if unchanged:
+            response_data["UNCHANGED"] = unchanged
+        if unprocessed:
+            response_data["UNPROCESSED"] = sorted(unprocessed)
+            return response_data, 207
+        return response_data, 200
+
+    def list_items(self, client_uuid, session_id, limit=None, cursor=None,
+                   segments=None, fields=None):
         """
-        Obtiene TODOS los ítems de la tabla CorporateData.
+        Obtiene ítems de la tabla CorporateData (con fields, solo esos
+        atributos de cada uno).
+        Sin limit ni cursor devuelve TODOS los ítems (recorriendo todas las
+        páginas del scan, en paralelo si segments > 1). Con paginación
+        devuelve un dict con la página ('ITEMS') y el cursor opaco para
+        pedir la siguiente ('NEXT_CURSOR', None al llegar al final).
         """
+        try:
+            fields = parse_fields(fields)
+        except ValueError:
+            return {"error": "Invalid Fields", "message": "'FIELDS' debe ser una lista de atributos."}, 400
+
+        if limit is None and cursor is None:
+            try:
+                items = []
+                for page in self.iter_items(client_uuid, session_id, segments, fields):
+                    items.extend(page)
+                return items, 200
+            except ValueError as e:
+                return {"error": "Invalid Segments", "message": str(e)}, 400
+            except StorageError as e:
+                return {"error": "DB Error", "message": e.message}, 500
+
+        if segments is not None:
+            return {"error": "Invalid Segments",
+                    "message": "'SEGMENTS' no puede combinarse con 'LIMIT'/'CURSOR'."}, 400
+
+        try:
+            limit = parse_limit(limit)
+        except ValueError:
+            return {"error": "Invalid Limit", "message": "'LIMIT' debe ser un entero positivo."}, 400
+
+        start_key = None
+        if cursor:
+            try:
+                start_key = decode_cursor(cursor)
+            except ValueError:
+                return {"error": "Invalid Cursor", "message": "El 'CURSOR' recibido no es válido."}, 400
+
         self._log_action(client_uuid, session_id, "list",
-                         "Solicitud de listado completo")
+                         f"Solicitud de página (LIMIT: {limit})")
+
+        try:
+            items, next_key = self.storage.scan(limit=limit, start_key=start_key,
+                                                fields=fields)
+            return {
+                "ITEMS": items,
+                "NEXT_CURSOR": encode_cursor(next_key) if next_key else None
+            }, 200
+
+        except StorageError as e:
+            return {"error": "DB Error", "message": e.message}, 500
+
+    def query_items(self, where, client_uuid, session_id, fields=None,
+                    limit=None, cursor=None):
+        """
+        Acción 'query': ítems que cumplen todas las condiciones de 'WHERE'
+        (igualdad o prefijo por atributo), paginados como 'list' y con solo
+        los campos de 'FIELDS' si se indican. Con el índice secundario en
+        memoria cargado y alguna condición sobre un atributo indexado se
+        leen solo los candidatos; si no, la consulta se delega al motor
+        (Query sobre un GSI o scan con FilterExpression en DynamoDB).
+        """
+        try:
+            conditions = parse_conditions(where)
+        except ValueError as e:
+            return {"error": "Invalid Query", "message": str(e)}, 400
+        try:
+            fields = parse_fields(fields)
+        except ValueError:
+            return {"error": "Invalid Fields", "message": "'FIELDS' debe ser una lista de atributos."}, 400
+        try:
+            limit = parse_limit(limit)
+        except ValueError:
+            return {"error": "Invalid Limit", "message": "'LIMIT' debe ser un entero positivo."}, 400
+        start_key = None
+        if cursor:
+            try:
+                start_key = decode_cursor(cursor)
+            except ValueError:
+                return {"error": "Invalid Cursor", "message": "El 'CURSOR' recibido no es válido."}, 400
+
+        self._log_action(client_uuid, session_id, "query",
+                         f"Atributos consultados: {sorted(where)}")
 
+        # Un cursor del índice ('_index') solo sigue por el índice, y viceversa
+        candidates = None
+        if self.index is not None and (start_key is None or start_key.get('_index')):
+            candidates = self.index.lookup(conditions)
         try:
-            response = self.table_data.scan()
+            if candidates is not None:
+                QUERIES_INDEX.inc()
+                ids = sorted(candidates)
+                if start_key:
+                    ids = ids[bisect.bisect_right(ids, start_key['id']):]
+                page_ids = ids[:limit]
+                # Se leen también los atributos de las condiciones, para verificarlas
+                found, unprocessed = self._fetch_items(page_ids, fields and list(dict.fromkeys(
+                    fields + [attribute for attribute, _, _ in conditions])))
+                # El índice puede tener entradas viejas: se verifica cada ítem
+                items = [found[item_id] for item_id in page_ids if item_id in found and
+                         matches_conditions(found[item_id], conditions)]
+                next_key = {'id': page_ids[-1], '_index': True} if len(ids) > limit else None
+            else:
+                QUERIES_STORAGE.inc()
+                if start_key:
+                    start_key.pop('_index', None)
+                items, next_key = self.storage.query(conditions, limit=limit, start_key=start_key,
+                                                     fields=fields)
+                unprocessed = []
+        except StorageError as e:
+            return {"error": "DB Error", "message": e.message}, 500
 
-            if 'Items' in response:
-                return response['Items'], 200
+        response_data = {
+            "ITEMS": [project(item, fields) for item in items],
+            "NEXT_CURSOR": encode_cursor(next_key) if next_key else None
+        }
+        if unprocessed:
+            response_data["UNPROCESSED"] = unprocessed
+            return response_data, 207
+        return response_data, 200
+
+    def _load_index(self):
+        """
+        Carga inicial del índice secundario (en un hilo aparte).
+        """
+        try:
+            if self.scan_segments > 1:
+                pages = scan_segments(self.storage, self.scan_segments, self.scan_executor)
             else:
-                return {"error": "Scan Failed", "message": "La operación scan no devolvió ítems"}, 500
+                pages = self._scan_pages()
+            self.index.load(pages)
+        except StorageError as e:
+            log.error("No se pudo cargar el índice secundario: %s. "
+                      "Las consultas usarán el almacenamiento.", e.message)
+
+    def _scan_pages(self, fields=None):
+        start_key = None
+        while True:
+            items, start_key = self.storage.scan(start_key=start_key, fields=fields)
+            yield items
+            if not start_key:
+                return
 
-        except ClientError as e:
-            return {"error": "DB Error", "message": e.response['Error']['Message']}, 500
+    def iter_items(self, client_uuid, session_id, segments=None, fields=None):
+        """
+        Recorre la tabla completa entregando las páginas a medida que
+        llegan (para transmitirlas al cliente sin esperar el final), con
+        solo los atributos de fields si se indican.
+        Lanza ValueError si segments no es válido y StorageError si falla
+        el almacenamiento.
+        """
+        try:
+            segments = self.scan_segments if segments is None else int(
+                segments)
+        except (TypeError, ValueError):
+            raise ValueError("'SEGMENTS' debe ser un entero positivo.")
+        if not 1 <= segments <= MAX_SCAN_SEGMENTS:
+            raise ValueError(
+                f"'SEGMENTS' debe estar entre 1 y {MAX_SCAN_SEGMENTS}.")
+
+        self._log_action(client_uuid, session_id, "list",
+                         f"Solicitud de listado completo (segmentos: {segments})")
+
+        if segments > 1:
+            yield from scan_segments(self.storage, segments, self.scan_executor, fields)
+            return
+        yield from self._scan_pages(fields)
+
+    def close(self):
+        """
+        Libera los recursos del Proxy: graba las escrituras combinadas y la
+        auditoría pendientes y cierra el almacenamiento.
+        """
+        if self.coalescer is not None:
+            self.coalescer.close()
+        self.audit.close()
+        self.scan_executor.shutdown(wait=False)
+        self.storage.close()
+
+    def audit_stats(self):
+        """
+        Estadísticas del escritor de auditoría (cola, lotes, descartes).
+        """
+        return self.audit.stats()
+
+    def storage_stats(self):
+        """
+        Estadísticas del motor de almacenamiento.
+        """
+        return self.storage.stats()
+
+    def write_stats(self):
+        """
+        Estado conocido de las escrituras (para descartar las que no
+        cambian) y, si está activada, la combinación de escrituras.
+        """
+        stats = self._write_state.stats()
+        if self.coalescer is not None:
+            stats["coalescing"] = self.coalescer.stats()
+        return stats
+
+    def index_stats(self):
+        """
+        Estado del índice secundario de 'query' (None si no hay índice).
+        """
+        return self.index.stats() if self.index is not None else None
+
+    def cache_stats(self):
+        """
+        Estadísticas de la caché de lectura (aciertos, fallos, tamaño).
+        """
+        return self.cache.stats()
@@ -2,7 +2,13 @@
 
 import boto3
 import botocore
+import botocore.config
+import botocore.session
 import sys
+import threading
+import weakref
+
+from modules.logger import get_logger
 
 # *----------------------------------------------------------------------------
 # * UADER-FCyT
@@ -13,61 +19,210 @@ import sys
 # * base de datos DynamoDB.
 # *----------------------------------------------------------------------------
 
+log = get_logger("db_singleton")
+
+# Modos de acceso a DynamoDB desde varios hilos
+CLIENTS_PER_THREAD = "thread"  # Un recurso boto3 (y su pool HTTP) por hilo
+CLIENTS_SHARED = "shared"      # Un único recurso compartido (pool más grande)
+CLIENT_MODES = (CLIENTS_PER_THREAD, CLIENTS_SHARED)
+
+# Opciones de conexión por defecto (ver DatabaseSingleton)
+DEFAULT_OPTIONS = {
+    "clients": CLIENTS_PER_THREAD,
+    "max_pool_connections": 50,
+    "connect_timeout": 2.0,
+    "read_timeout": 10.0,
+    "max_attempts": 5,
+}
+
+
+class PerThread:
+    """
+    Envoltorio que delega en un objeto distinto por hilo, creado con
+    factory() la primera vez que cada hilo lo usa. Los recursos de boto3
+    no son thread-safe: así cada hilo trabaja con el suyo sin cambiar el
+    código que los usa (tabla.get_item(...), recurso.batch_get_item(...)).
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._local = threading.local()
+
+    def current(self):
+        obj = getattr(self._local, "obj", None)
+        if obj is None:
+            obj = self._local.obj = self._factory()
+        return obj
+
+    def __getattr__(self, name):
+        return getattr(self.current(), name)
+
 
 class DatabaseSingleton:
     """
     Implementa el patrón Singleton para gestionar una única conexión
     y acceso a las tablas de DynamoDB en toda la aplicación.
+
+    Las opciones (solo se aplican en la primera creación) ajustan el
+    cliente de botocore: 'clients' ('thread' o 'shared'),
+    'max_pool_connections', 'connect_timeout', 'read_timeout' y
+    'max_attempts' (reintentos en modo adaptativo); siempre con TCP
+    keep-alive.
     """
 
     _instance = None
 
-    def __new__(cls):
+    def __new__(cls, options=None):
         """
         Sobrescribe el método __new__ para controlar la creación de instancias.
         """
         if cls._instance is None:
-            print("Creando nueva instancia de DatabaseSingleton...")
+            log.info("Creando nueva instancia de DatabaseSingleton...")
             cls._instance = super(DatabaseSingleton, cls).__new__(cls)
             cls._instance._initialized = False
         else:
-            print("Usando instancia existente de DatabaseSingleton...")
+            log.debug("Usando instancia existente de DatabaseSingleton...")
 
         return cls._instance
 
-    def __init__(self):
+    def __init__(self, options=None):
         """
         Inicializador. Se ejecuta solo una vez gracias a la bandera _initialized.
         """
         if self._initialized:
             return
 
-        print("Inicializando conexión a DynamoDB...")
+        log.info("Inicializando conexión a DynamoDB...")
         try:
-            self.dynamodb = boto3.resource('dynamodb')
-
-            # Cargar las tablas
-            self.table_corporate_data = self.dynamodb.Table('CorporateData')
-            self.table_corporate_log = self.dynamodb.Table('CorporateLog')
+            self.options = dict(DEFAULT_OPTIONS, **(options or {}))
+            if self.options["clients"] not in CLIENT_MODES:
+                raise ValueError(
+                    f"Modo de clientes desconocido: {self.options['clients']}")
+            self.config = botocore.config.Config(
+                max_pool_connections=self.options["max_pool_connections"],
+                connect_timeout=self.options["connect_timeout"],
+                read_timeout=self.options["read_timeout"],
+                tcp_keepalive=True,
+                retries={"mode": "adaptive",
+                         "max_attempts": self.options["max_attempts"]})
+            # Los modelos de servicio se cargan una vez y se comparten entre
+            # las sesiones de cada hilo (crear una sesión desde cero es caro)
+            self._loader = botocore.session.get_session().get_component('data_loader')
+            self._stats_lock = threading.Lock()
+            # Clientes vivos (el de un hilo terminado se libera con él)
+            self._clients = weakref.WeakSet()
+            self._calls = 0
+            self._errors = 0
+            self._retries = 0
+            self._in_flight = 0
+            self._max_in_flight = 0
+
+            if self.options["clients"] == CLIENTS_PER_THREAD:
+                self.dynamodb = PerThread(self._new_resource)
+                self.table_corporate_data = PerThread(
+                    lambda: self.dynamodb.current().Table('CorporateData'))
+                self.table_corporate_log = PerThread(
+                    lambda: self.dynamodb.current().Table('CorporateLog'))
+            else:
+                self.dynamodb = self._new_resource()
+                # Cargar las tablas
+                self.table_corporate_data = self.dynamodb.Table('CorporateData')
+                self.table_corporate_log = self.dynamodb.Table('CorporateLog')
 
             # Forzar una conexión para verificar credenciales
             self.table_corporate_data.load()
             self.table_corporate_log.load()
 
-            print("Tablas 'CorporateData' y 'CorporateLog' cargadas exitosamente.")
+            log.info("Tablas 'CorporateData' y 'CorporateLog' cargadas exitosamente.")
 
             self._initialized = True
 
         except botocore.exceptions.ClientError as e:
-            print(
-                f"Error de Boto3 al conectar o cargar tablas: {e.response['Error']['Message']}", file=sys.stderr)
-            print("Verifique sus credenciales de AWS (aws configure) y la existencia de las tablas.", file=sys.stderr)
+            log.error("Error de Boto3 al conectar o cargar tablas: %s", e.response['Error']['Message'])
+            log.error("Verifique sus credenciales de AWS (aws configure) y la existencia de las tablas.")
             sys.exit(1)
         except Exception as e:
-            print(
-                f"Error inesperado en DatabaseSingleton: {e}", file=sys.stderr)
+            log.error("Error inesperado en DatabaseSingleton: %s", e)
             sys.exit(1)
 
+    def _new_resource(self):
+        """
+        Crea un recurso DynamoDB con su propia sesión (las sesiones de
+        boto3 tampoco son thread-safe) y lo instrumenta para las métricas.
+        """
+        core = botocore.session.get_session()
+        core.register_component('data_loader', self._loader)
+        resource = boto3.session.Session(botocore_session=core).resource(
+            'dynamodb', config=self.config)
+        events = resource.meta.client.meta.events
+        events.register('before-call.dynamodb', self._before_call)
+        events.register('after-call.dynamodb', self._after_call)
+        events.register('after-call-error.dynamodb', self._after_call_error)
+        with self._stats_lock:
+            self._clients.add(resource.meta.client)
+        return resource
+
+    def _before_call(self, **kwargs):
+        with self._stats_lock:
+            self._calls += 1
+            self._in_flight += 1
+            self._max_in_flight = max(self._max_in_flight, self._in_flight)
+
+    def _after_call(self, http_response=None, parsed=None, **kwargs):
+        retries = (parsed or {}).get('ResponseMetadata', {}).get('RetryAttempts', 0)
+        with self._stats_lock:
+            self._in_flight -= 1
+            self._retries += retries
+            if http_response is not None and http_response.status_code >= 300:
+                self._errors += 1
+
+    def _after_call_error(self, **kwargs):
+        with self._stats_lock:
+            self._in_flight -= 1
+            self._errors += 1
+
+    @staticmethod
+    def _created_connections(client):
+        """
+        Conexiones HTTP creadas por el pool de un cliente (urllib3). Si
+        supera al tamaño del pool, hubo conexiones abiertas y descartadas
+        por falta de lugar: conviene aumentar max_pool_connections.
+        """
+        try:
+            manager = client._endpoint.http_session._manager
+            return sum(pool.num_connections for pool in manager.pools._container.values())
+        except AttributeError:
+            return 0
+
+    def stats(self):
+        """
+        Uso de la conexión a DynamoDB: clientes creados, llamadas en curso
+        (y el máximo simultáneo), conexiones HTTP creadas, reintentos y
+        errores.
+        """
+        with self._stats_lock:
+            clients = list(self._clients)
+            stats = {
+                "clients_mode": self.options["clients"],
+                "clients": len(clients),
+                "max_pool_connections": self.options["max_pool_connections"],
+                "calls": self._calls,
+                "in_flight": self._in_flight,
+                "max_in_flight": self._max_in_flight,
+                "retries": self._retries,
+                "errors": self._errors,
+            }
+        stats["http_connections_created"] = sum(
+            self._created_connections(client) for client in clients)
+        stats["pool_capacity"] = len(clients) * self.options["max_pool_connections"]
+        return stats
+
+    def get_resource(self):
+        """
+        Devuelve el recurso DynamoDB (para operaciones por lotes entre tablas).
+        """
+        return self.dynamodb
+
     def get_corporate_data_table(self):
         """
         Devuelve el objeto de la tabla 'CorporateData'.
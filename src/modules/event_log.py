@@ -0,0 +1,219 @@
+# src/modules/event_log.py
+
+import collections
+import itertools
+import os
+import threading
+import uuid
+
+from modules import codec
+from modules.logger import get_logger
+from modules.protocol import FRAME_HEADER
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * event_log.py
+# * Registro de los últimos eventos publicados por el Subject, con número
+# * de secuencia, para repetírselos a un observador que se reconecta.
+# * Cada registro tiene un id de secuencia ("STREAM"): un SEQ solo tiene
+# * sentido junto con el id del registro que lo asignó.
+# *----------------------------------------------------------------------------
+
+log = get_logger("event_log")
+
+
+class EventLog:
+    """
+    Buffer circular con los últimos capacity eventos, cada uno con un
+    número de secuencia ("SEQ") creciente. Si se indica path, los eventos
+    también se agregan a un archivo local (registros binarios con prefijo
+    de longitud, ver modules.codec) para conservar la secuencia y la
+    repetición tras reiniciar el servidor.
+    stream identifica la secuencia ("<name>/<aleatorio>", name es el id
+    del nodo o worker): es nuevo en cada registro (otro worker, otro nodo
+    o un reinicio sin archivo) y se conserva en el encabezado del
+    archivo. Un archivo con la secuencia de otro nodo empieza una nueva.
+    append() y since() no son thread-safe: el Subject los usa bajo su
+    propio candado. append() solo asigna el SEQ y encola el evento; un
+    hilo propio lo graba en el archivo (en lotes, con un flush por lote),
+    así la escritura a disco no demora a quien notifica.
+    """
+
+    def __init__(self, capacity=10000, path=None, name=None):
+        self.capacity = capacity
+        self.path = path
+        self.name = name
+        self.last_seq = 0
+        self.stream = None
+        self._events = collections.deque(maxlen=max(capacity, 0))
+        self._file = None
+        self._file_records = 0
+        # Eventos aún no grabados, para el hilo escritor
+        self._pending = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._writer = None
+        if path:
+            self._load()
+        if self.stream is not None and name and not self.stream.startswith(name + "/"):
+            log.warning("EventLog: %s tiene la secuencia %s de otro nodo; se inicia una nueva.",
+                        path, self.stream)
+            self.stream = None
+        if self.stream is None:
+            # Sin archivo, o un archivo sin encabezado o de otro nodo: secuencia nueva
+            self.stream = f"{name}/{uuid.uuid4().hex[:12]}" if name else uuid.uuid4().hex[:16]
+            if path:
+                self._compact()
+        if path:
+            self._file = open(path, 'ab')
+            self._writer = threading.Thread(target=self._write_loop,
+                                            name="event-log-writer", daemon=True)
+            self._writer.start()
+
+    def _load(self):
+        """
+        Recupera los eventos del archivo. Un último registro incompleto
+        (corte durante la escritura) se descarta.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        offset = 0
+        while offset + FRAME_HEADER.size <= len(data):
+            (length,) = FRAME_HEADER.unpack_from(data, offset)
+            end = offset + FRAME_HEADER.size + length
+            if end > len(data):
+                break
+            try:
+                event = codec.unpack(data[offset + FRAME_HEADER.size:end])
+            except codec.CodecError:
+                break
+            if "SEQ" not in event:
+                # Encabezado con el id de la secuencia
+                self.stream = event.get("STREAM")
+                offset = end
+                continue
+            self._events.append(event)
+            self.last_seq = event["SEQ"]
+            self._file_records += 1
+            offset = end
+        if offset < len(data):
+            log.warning("EventLog: se descartaron %d bytes incompletos al final de %s",
+                        len(data) - offset, self.path)
+            if self.stream is not None:
+                self._compact()
+        log.info("EventLog: %d evento(s) recuperado(s) de %s (secuencia %s, última %d).",
+                 len(self._events), self.path, self.stream, self.last_seq)
+
+    def _compact(self, events=None):
+        """
+        Reescribe el archivo con el encabezado y solo los eventos del buffer
+        (o events, una copia tomada por el hilo escritor).
+        """
+        events = self._events if events is None else events
+        if self._file:
+            self._file.close()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self._record({"STREAM": self.stream}))
+            for event in events:
+                f.write(self._record(event))
+        os.replace(tmp_path, self.path)
+        self._file_records = len(events)
+        if self._file:
+            self._file = open(self.path, 'ab')
+
+    @staticmethod
+    def _record(event):
+        payload = codec.pack(event)
+        return FRAME_HEADER.pack(len(payload)) + payload
+
+    def append(self, message):
+        """
+        Asigna el próximo número de secuencia a un evento y lo registra.
+        Devuelve el evento con su "SEQ".
+        """
+        self.last_seq += 1
+        event = dict(message, SEQ=self.last_seq)
+        with self._cond:
+            self._events.append(event)
+            if self._writer is not None:
+                self._pending.append(event)
+                self._cond.notify()
+        return event
+
+    def _write_loop(self):
+        """
+        Hilo escritor: graba los eventos encolados por append() en lotes.
+        """
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, []
+                # El archivo crece sin límite: se compacta al duplicar el
+                # buffer, con una copia que ya incluye el lote
+                compact = self._file_records + len(batch) > 2 * max(self.capacity, 1)
+                events = list(self._events) if compact else None
+            try:
+                if compact:
+                    self._compact(events)
+                    continue
+                records = []
+                for event in batch:
+                    try:
+                        records.append(self._record(event))
+                    except TypeError as e:
+                        log.error("EventLog: evento %d no serializable: %s", event["SEQ"], e)
+                self._file.write(b"".join(records))
+                self._file.flush()
+                self._file_records += len(records)
+            except IOError as e:
+                log.error("EventLog: error al escribir %s: %s", self.path, e)
+
+    def since(self, seq, stream=None):
+        """
+        Eventos posteriores a seq, en orden. Devuelve None si ya no están
+        todos en el buffer o seq es de otra secuencia (stream distinto: otro
+        worker, otro nodo o un servidor reiniciado sin archivo): el cliente
+        debe resincronizar.
+        """
+        if stream != self.stream or seq > self.last_seq:
+            return None
+        if seq == self.last_seq:
+            return []
+        if not self._events or seq < self._events[0]["SEQ"] - 1:
+            return None
+        start = seq - self._events[0]["SEQ"] + 1
+        return list(itertools.islice(self._events, start, None))
+
+    def close(self):
+        """
+        Graba los eventos pendientes y cierra el archivo.
+        """
+        if self._writer is not None:
+            with self._cond:
+                self._closed = True
+                self._cond.notify()
+            self._writer.join()
+            self._writer = None
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def stats(self):
+        return {
+            "stream": self.stream,
+            "last_seq": self.last_seq,
+            "buffered": len(self._events),
+            "unwritten": len(self._pending),
+            "capacity": self.capacity,
+            "oldest_seq": self._events[0]["SEQ"] if self._events else None,
+            "path": self.path,
+        }
@@ -0,0 +1,328 @@
+# src/modules/federation.py
+
+import collections
+import socket
+import threading
+import uuid
+
+from modules import codec
+from modules.logger import get_logger
+from modules.metrics import REGISTRY
+from modules.protocol import FrameDecoder, ProtocolError, encode_frame
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * federation.py
+# * Federación de nodos: cada servidor reenvía sus eventos de escritura a
+# * los nodos pares por conexiones TCP persistentes, para que los
+# * suscriptores de cualquier nodo reciban las escrituras de todos. Los
+# * eventos llevan origen y secuencia, y los repetidos se descartan.
+# *----------------------------------------------------------------------------
+
+log = get_logger("federation")
+
+PEER_EVENTS = REGISTRY.counter(
+    "peer_events_total", "Eventos de federación por dirección y resultado", ("result",))
+EVENTS_SENT = PEER_EVENTS.labels("sent")
+EVENTS_RECEIVED = PEER_EVENTS.labels("received")
+EVENTS_DUPLICATE = PEER_EVENTS.labels("duplicate")
+EVENTS_DROPPED = PEER_EVENTS.labels("dropped")
+
+RECV_SIZE = 65536
+
+# Espera entre intentos de conexión a un par (se duplica hasta el máximo)
+RECONNECT_DELAY = 0.5
+MAX_RECONNECT_DELAY = 10.0
+CONNECT_TIMEOUT = 5.0
+
+
+def parse_peers(text):
+    """
+    "host:puerto,host:puerto" -> [(host, puerto), ...]. Lanza ValueError
+    si alguna dirección no es válida.
+    """
+    peers = []
+    for entry in text.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        host, separator, port = entry.rpartition(':')
+        if not separator or not host or not port.isdigit():
+            raise ValueError(f"Par inválido '{entry}' (se espera host:puerto)")
+        peers.append((host, int(port)))
+    return peers
+
+
+class PeerLink(threading.Thread):
+    """
+    Conexión saliente a un par. Los eventos esperan en una cola acotada
+    (al llenarse se descarta el más antiguo) hasta que el par confirma su
+    secuencia ("ACK"); un hilo los envía y, si la conexión se corta,
+    reconecta con espera creciente y reenvía los no confirmados. El par
+    descarta los que ya había recibido.
+    """
+
+    def __init__(self, address, origin, max_pending=10000):
+        super().__init__(name=f"peer-{address[0]}:{address[1]}", daemon=True)
+        self.address = address
+        self.origin = origin
+        self._pending = collections.deque()  # (secuencia, frame) sin confirmar
+        self._sent = 0  # Cuántos de _pending ya se enviaron por esta conexión
+        self._max_pending = max_pending
+        self._cond = threading.Condition()
+        self._closed = False
+        self._broken = False
+        self._sock = None
+        self.connected = False
+        self.connects = 0
+
+    def send(self, seq, frame):
+        with self._cond:
+            if len(self._pending) >= self._max_pending:
+                self._pending.popleft()
+                self._sent = max(self._sent - 1, 0)
+                EVENTS_DROPPED.inc()
+            self._pending.append((seq, frame))
+            self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def _connect(self):
+        delay = RECONNECT_DELAY
+        while not self._closed:
+            try:
+                sock = socket.create_connection(self.address, timeout=CONNECT_TIMEOUT)
+                sock.settimeout(None)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                sock.sendall(encode_frame(codec.pack({"PEER": self.origin})))
+            except OSError as e:
+                log.debug("Par %s:%s no disponible: %s", self.address[0], self.address[1], e)
+                with self._cond:
+                    self._cond.wait(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+                continue
+            with self._cond:
+                self._sock = sock
+                self._sent = 0  # Se reenvía todo lo no confirmado
+                self._broken = False
+            self.connected = True
+            self.connects += 1
+            threading.Thread(target=self._read_acks, args=(sock,),
+                             name=f"{self.name}-ack", daemon=True).start()
+            log.info("Conectado al par %s:%s", *self.address)
+            return True
+        return False
+
+    def _read_acks(self, sock):
+        decoder = FrameDecoder()
+        try:
+            while True:
+                data = sock.recv(RECV_SIZE)
+                if not data:
+                    break
+                acked = max((codec.unpack(payload).get("ACK", 0)
+                             for payload in decoder.feed(data)), default=0)
+                with self._cond:
+                    while self._pending and self._pending[0][0] <= acked:
+                        self._pending.popleft()
+                        self._sent = max(self._sent - 1, 0)
+        except (OSError, ProtocolError, codec.CodecError):
+            pass
+        with self._cond:
+            if self._sock is sock:
+                self._broken = True
+                self._cond.notify_all()
+
+    def run(self):
+        while self._connect():
+            while True:
+                with self._cond:
+                    while self._sent >= len(self._pending) and not self._closed \
+                            and not self._broken:
+                        self._cond.wait()
+                    if self._closed:
+                        return
+                    if self._broken:
+                        error = "conexión cerrada por el par"
+                        break
+                    _, frame = self._pending[self._sent]
+                    self._sent += 1
+                try:
+                    self._sock.sendall(frame)
+                except OSError as e:
+                    error = e
+                    break
+                EVENTS_SENT.inc()
+            log.warning("Se perdió la conexión con el par %s:%s: %s",
+                        self.address[0], self.address[1], error)
+            self.connected = False
+            self._sock.close()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._sock.close()
+
+
+class PeerRelay:
+    """
+    Extremo de federación de un nodo. publish() numera el evento con la
+    secuencia de este nodo y lo encola para cada par; un puerto propio
+    recibe los eventos de los pares y entrega a on_event los que no son
+    repetidos (por origen y secuencia). Los eventos recibidos no se
+    reenvían: cada nodo debe listar a todos los demás (malla completa).
+    El origen ("<nodo>/<arranque>") incluye un id de arranque, así la
+    secuencia de un nodo reiniciado no se confunde con la anterior; lo
+    recordado para descartar repetidos es uno por nodo (su último
+    arranque), no uno por arranque.
+    """
+
+    def __init__(self, node_id, peers, host, port, on_event, reuse_port=False,
+                 max_pending=10000):
+        self.node_id = node_id
+        self.origin = f"{node_id}/{uuid.uuid4().hex[:8]}"
+        self.on_event = on_event
+        self._links = [PeerLink(address, self.origin, max_pending) for address in peers]
+        self._seq = 0
+        self._seq_lock = threading.Lock()
+        self._last_seq = {}  # nodo -> (arranque, última secuencia entregada)
+        self._dedup_lock = threading.Lock()
+        self._inbound = set()
+        self._inbound_lock = threading.Lock()
+        self._closed = False
+
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self._listener.bind((host, port))
+        self._listener.listen(64)
+        self.port = self._listener.getsockname()[1]
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, name="peer-accept",
+                         daemon=True).start()
+        for link in self._links:
+            link.start()
+        log.info("Federación: nodo %s escuchando pares en el puerto %s; pares: %s",
+                 self.origin, self.port,
+                 ", ".join("%s:%s" % link.address for link in self._links) or "ninguno")
+
+    def publish(self, event, data, previous=None):
+        """
+        Reenvía a los pares un evento originado en este nodo.
+        """
+        if not self._links:
+            return
+        # Se encola con el candado tomado: los pares reciben las secuencias en orden
+        with self._seq_lock:
+            self._seq += 1
+            frame = encode_frame(codec.pack({"ORIGIN": self.origin, "SEQ": self._seq,
+                                             "EVENT": event, "DATA": data,
+                                             "PREVIOUS": previous}))
+            for link in self._links:
+                link.send(self._seq, frame)
+
+    def _accept_loop(self):
+        while not self._closed:
+            try:
+                sock, addr = self._listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._read_loop, args=(sock, addr),
+                             name=f"peer-in-{addr[0]}:{addr[1]}", daemon=True).start()
+
+    def _is_new(self, origin, seq):
+        node, _, boot = str(origin).rpartition("/")
+        with self._dedup_lock:
+            last = self._last_seq.get(node)
+            if last is not None and last[0] == boot and seq <= last[1]:
+                return False
+            # Un arranque nuevo del nodo reemplaza al anterior
+            self._last_seq[node] = (boot, seq)
+            return True
+
+    def _read_loop(self, sock, addr):
+        with self._inbound_lock:
+            self._inbound.add(sock)
+        decoder = FrameDecoder()
+        peer = None
+        try:
+            while True:
+                data = sock.recv(RECV_SIZE)
+                if not data:
+                    break
+                acks = {}
+                for payload in decoder.feed(data):
+                    message = codec.unpack(payload)
+                    if peer is None:
+                        peer = message.get("PEER")
+                        if not peer:
+                            raise ProtocolError("Falta el saludo 'PEER'.")
+                        log.info("Par %s conectado desde %s:%s", peer, *addr[:2])
+                        continue
+                    acks["ACK"] = message.get("SEQ", 0)
+                    if not self._is_new(message.get("ORIGIN"), message.get("SEQ", 0)):
+                        EVENTS_DUPLICATE.inc()
+                        continue
+                    EVENTS_RECEIVED.inc()
+                    try:
+                        self.on_event(message)
+                    except Exception:
+                        log.exception("Error procesando un evento del par %s", peer)
+                if acks:
+                    # Una confirmación por lectura, con la última secuencia recibida
+                    sock.sendall(encode_frame(codec.pack(acks)))
+        except (OSError, ProtocolError, codec.CodecError) as e:
+            if not self._closed:
+                log.warning("Conexión del par %s interrumpida: %s", peer or addr, e)
+        finally:
+            with self._inbound_lock:
+                self._inbound.discard(sock)
+            sock.close()
+            if peer is not None and not self._closed:
+                log.info("Par %s desconectado.", peer)
+
+    def stats(self):
+        with self._inbound_lock:
+            inbound = len(self._inbound)
+        with self._dedup_lock:
+            nodes = len(self._last_seq)
+        return {
+            "origin": self.origin,
+            "published": self._seq,
+            "inbound_peers": inbound,
+            "known_nodes": nodes,
+            "peers": {"%s:%s" % link.address: {"connected": link.connected,
+                                               "connects": link.connects,
+                                               "pending": link.pending()}
+                      for link in self._links},
+        }
+
+    def close(self):
+        self._closed = True
+        try:
+            # Despierta al hilo bloqueado en accept() (close() solo no lo hace)
+            self._listener.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._listener.close()
+        for link in self._links:
+            link.close()
+        with self._inbound_lock:
+            inbound = list(self._inbound)
+        for sock in inbound:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
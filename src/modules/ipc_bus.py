@@ -0,0 +1,261 @@
+# src/modules/ipc_bus.py
+
+import collections
+import os
+import socket
+import threading
+
+from modules import codec
+from modules.logger import get_logger
+from modules.protocol import FrameDecoder, ProtocolError, encode_frame
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * ipc_bus.py
+# * Bus de eventos entre los procesos del servidor (modo pre-fork): un
+# * socket Unix local en el proceso maestro retransmite a cada worker los
+# * eventos que publican los demás. Los mensajes usan los mismos frames
+# * (longitud + payload binario de modules.codec) que el protocolo.
+# *----------------------------------------------------------------------------
+
+log = get_logger("ipc_bus")
+
+RECV_SIZE = 65536
+
+# Frames pendientes por worker antes de considerarlo trabado
+MAX_PEER_QUEUE = 10000
+
+
+class _Peer:
+    """
+    Worker conectado al bus. Los frames a enviarle esperan en una cola
+    acotada que vacía un hilo propio, para que un worker que no lee no
+    frene el reenvío a los demás.
+    """
+    __slots__ = ("sock", "name", "_queue", "_cond", "_closed")
+
+    def __init__(self, sock, name):
+        self.sock = sock
+        self.name = name
+        self._queue = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def offer(self, frame, max_queue):
+        """
+        Encola un frame. Devuelve False si la cola está llena.
+        """
+        with self._cond:
+            if self._closed:
+                return True
+            if len(self._queue) >= max_queue:
+                return False
+            self._queue.append(frame)
+            self._cond.notify()
+            return True
+
+    def pending(self):
+        with self._cond:
+            return len(self._queue)
+
+    def write_loop(self, on_error):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                frames = list(self._queue)
+                self._queue.clear()
+            try:
+                self.sock.sendall(b"".join(frames))
+            except OSError:
+                on_error(self)
+                return
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._queue.clear()
+            self._cond.notify_all()
+        try:
+            # Despierta a los hilos bloqueados en recv() o sendall()
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class BusHub:
+    """
+    Extremo del proceso maestro: acepta la conexión de cada worker y
+    reenvía cada frame recibido a todos los demás, sin decodificarlo.
+    Un worker con max_queue frames sin enviar se desconecta (y termina,
+    para que el maestro lo reinicie) en lugar de perder eventos.
+    """
+
+    def __init__(self, path, max_queue=MAX_PEER_QUEUE):
+        self.path = path
+        self.max_queue = max_queue
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if os.path.exists(path):
+            os.unlink(path)
+        self._sock.bind(path)
+        self._sock.listen(64)
+        self._peers = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._relayed = 0
+        self._accepted = 0
+        self._disconnected_slow = 0
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, name="ipc-bus-accept",
+                         daemon=True).start()
+
+    def _accept_loop(self):
+        while not self._closed:
+            try:
+                sock, _ = self._sock.accept()
+            except OSError:
+                return
+            with self._lock:
+                self._accepted += 1
+                peer = _Peer(sock, f"peer-{self._accepted}")
+                self._peers.append(peer)
+            threading.Thread(target=self._relay_loop, args=(peer,),
+                             name=f"ipc-bus-{peer.name}", daemon=True).start()
+            threading.Thread(target=peer.write_loop, args=(self._remove,),
+                             name=f"ipc-bus-{peer.name}-writer", daemon=True).start()
+
+    def _relay_loop(self, peer):
+        decoder = FrameDecoder()
+        try:
+            while True:
+                data = peer.sock.recv(RECV_SIZE)
+                if not data:
+                    break
+                for payload in decoder.feed(data):
+                    self._relay(peer, encode_frame(payload))
+        except (OSError, ProtocolError) as e:
+            if not self._closed:
+                log.warning("Conexión del bus %s interrumpida: %s", peer.name, e)
+        finally:
+            self._remove(peer)
+
+    def _relay(self, sender, frame):
+        with self._lock:
+            peers = [peer for peer in self._peers if peer is not sender]
+            self._relayed += 1
+        for peer in peers:
+            if not peer.offer(frame, self.max_queue):
+                log.warning("El worker %s del bus no lee sus eventos (%d pendientes). "
+                            "Desconectándolo.", peer.name, self.max_queue)
+                with self._lock:
+                    self._disconnected_slow += 1
+                self._remove(peer)
+
+    def _remove(self, peer):
+        with self._lock:
+            if peer not in self._peers:
+                return
+            self._peers.remove(peer)
+        peer.close()
+
+    def stats(self):
+        with self._lock:
+            peers = list(self._peers)
+            stats = {"peers": len(peers), "relayed": self._relayed,
+                     "disconnected_slow": self._disconnected_slow}
+        stats["pending"] = sum(peer.pending() for peer in peers)
+        return stats
+
+    def close(self):
+        self._closed = True
+        try:
+            # Despierta al hilo bloqueado en accept() (close() solo no lo hace)
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+        with self._lock:
+            peers, self._peers = self._peers, []
+        for peer in peers:
+            peer.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class BusClient:
+    """
+    Extremo de un worker: publish() envía un mensaje al resto de los
+    procesos y un hilo entrega los mensajes recibidos a on_message. Si el
+    bus se cierra (terminó el maestro) se llama a on_close.
+    """
+
+    def __init__(self, path, on_message, on_close=None):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(path)
+        self._on_message = on_message
+        self._on_close = on_close
+        self._send_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self._published = 0
+        self._received = 0
+        self._errors = 0
+        self._thread = threading.Thread(target=self._read_loop, name="ipc-bus",
+                                        daemon=True)
+        self._thread.start()
+
+    def publish(self, message):
+        frame = encode_frame(codec.pack(message))
+        try:
+            with self._send_lock:
+                self._sock.sendall(frame)
+        except OSError as e:
+            with self._stats_lock:
+                self._errors += 1
+            log.warning("No se pudo publicar en el bus: %s", e)
+            return
+        with self._stats_lock:
+            self._published += 1
+
+    def _read_loop(self):
+        decoder = FrameDecoder()
+        try:
+            while True:
+                data = self._sock.recv(RECV_SIZE)
+                if not data:
+                    break
+                for payload in decoder.feed(data):
+                    with self._stats_lock:
+                        self._received += 1
+                    try:
+                        self._on_message(codec.unpack(payload))
+                    except Exception:
+                        log.exception("Error procesando un mensaje del bus")
+        except (OSError, ProtocolError) as e:
+            if not self._closed:
+                log.error("Error leyendo el bus: %s", e)
+        if not self._closed:
+            log.error("El bus entre procesos se cerró.")
+            if self._on_close is not None:
+                self._on_close()
+
+    def stats(self):
+        with self._stats_lock:
+            return {"published": self._published, "received": self._received,
+                    "errors": self._errors}
+
+    def close(self):
+        self._closed = True
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
@@ -0,0 +1,206 @@
+# src/modules/logger.py
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+
+from modules.metrics import REGISTRY
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * logger.py
+# * Registro (logging) del servidor: niveles, formato diferido (los
+# * argumentos se formatean solo si el registro pasa el nivel y el
+# * muestreo) y escritura en un hilo aparte a través de una cola, para
+# * que las solicitudes no
+# * compitan por stdout. Las líneas DEBUG (una o más por solicitud) se
+# * muestrean y el contenido de las solicitudes no se registra por defecto.
+# *----------------------------------------------------------------------------
+
+ROOT = "tpfi"
+
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+FORMATS = ("text", "json")
+
+# Atributos propios de LogRecord: el resto son campos pasados con extra=
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+LOG_DROPPED = REGISTRY.counter(
+    "log_records_dropped_total", "Registros descartados con la cola de logging llena").labels()
+
+_state = {"listener": None, "payloads": False}
+
+
+def get_logger(name):
+    """
+    Logger de un componente del servidor (ej. get_logger("observer")).
+    """
+    return logging.getLogger(f"{ROOT}.{name}")
+
+
+class _Redacted:
+    """
+    Resumen de un payload que reemplaza al contenido cuando el registro de
+    payloads está desactivado. Se formatea solo si la línea se escribe.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        if isinstance(self.value, dict):
+            return f"<{len(self.value)} campo(s) omitido(s)>"
+        if isinstance(self.value, (list, tuple)):
+            return f"<{len(self.value)} elemento(s) omitido(s)>"
+        return "<omitido>"
+
+
+def payload(value):
+    """
+    Argumento para registrar el contenido de una solicitud o un ítem: el
+    valor mismo si se habilitó --log-payloads, si no un resumen.
+    """
+    return value if _state["payloads"] else _Redacted(value)
+
+
+def payloads_enabled():
+    return _state["payloads"]
+
+
+class TextFormatter(logging.Formatter):
+    """
+    "fecha nivel logger: mensaje clave=valor ..." con los campos de extra=.
+    """
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = [f"{key}={value}" for key, value in vars(record).items()
+                  if key not in _RECORD_FIELDS]
+        return " ".join([line] + fields) if fields else line
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Un objeto JSON por línea, con los campos de extra= como claves.
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Deja pasar solo una fracción rate de los registros DEBUG; los de
+    nivel INFO o superior pasan siempre.
+    """
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or self.rate >= 1.0 or random.random() < self.rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Encola el registro y lo descarta, contándolo, si la cola está llena.
+    Como QueueHandler.prepare, arma el mensaje y el texto de la excepción
+    al encolar: los argumentos pueden cambiar (o la traza retener objetos)
+    antes de que el hilo que escribe lo formatee. Fecha, nivel y campos de
+    extra= los agrega el formateador de ese hilo.
+    """
+
+    _exc_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or \
+                self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc()
+
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener que al detenerse espera lugar para el aviso de fin: con
+    la cola llena put_nowait fallaría y el hilo no se detendría.
+    """
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+def configure(level="INFO", fmt="text", path=None, queue_size=10000,
+              debug_sample=1.0, payloads=False):
+    """
+    Configura el logging del servidor: los registros de los loggers "tpfi.*"
+    pasan por una cola acotada y un hilo los escribe en stdout (o en path).
+    Se puede llamar de nuevo para cambiar la configuración.
+    """
+    shutdown()
+    _state["payloads"] = payloads
+
+    target = logging.FileHandler(path, encoding="utf-8") if path else \
+        logging.StreamHandler(sys.stdout)
+    target.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(SamplingFilter(debug_sample))
+
+    root = logging.getLogger(ROOT)
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+    root.propagate = False
+
+    listener = DrainingQueueListener(handler.queue, target)
+    listener.start()
+    _state["listener"] = listener
+
+
+def shutdown():
+    """
+    Escribe los registros pendientes y detiene el hilo de escritura.
+    """
+    listener, _state["listener"] = _state["listener"], None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+atexit.register(shutdown)
@@ -0,0 +1,316 @@
+# src/modules/metrics.py
+
+import bisect
+import logging
+import functools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * metrics.py
+# * Contadores e histogramas de latencia de los caminos críticos del
+# * servidor. Se consultan con la acción 'stats' y, opcionalmente, en
+# * formato de texto de Prometheus por un puerto HTTP aparte.
+# *----------------------------------------------------------------------------
+
+# Límites superiores de los buckets de latencia, en segundos (100 µs a 10 s)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Cuantiles aproximados (a partir de los buckets) que informa 'stats'
+QUANTILES = (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+
+PREFIX = "tpfi_"
+
+
+class Counter:
+    """
+    Contador monótono. inc() cuesta un candado sin contención.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Histogram:
+    """
+    Histograma de buckets fijos: observe() es una búsqueda binaria y un
+    incremento, sin guardar las muestras.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.buckets) + 1)  # El último es +Inf
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def time(self):
+        """
+        Context manager que observa la duración del bloque.
+        """
+        return _Timer(self)
+
+    def timed(self, function):
+        """
+        Decorador que observa la duración de cada llamada a function.
+        """
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.observe(time.perf_counter() - start)
+        return wrapper
+
+    def _state(self):
+        with self._lock:
+            return list(self._counts), self._sum, self._count
+
+    def quantile(self, q, counts=None, count=None):
+        """
+        Cuantil aproximado por interpolación lineal dentro del bucket.
+        """
+        if counts is None:
+            counts, _, count = self._state()
+        if not count:
+            return None
+        rank = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    return lower  # Por encima del último límite
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+    def snapshot(self):
+        counts, total, count = self._state()
+        summary = {"count": count,
+                   "mean_ms": round(total / count * 1000, 3) if count else None}
+        for name, q in QUANTILES:
+            value = self.quantile(q, counts, count)
+            summary[name + "_ms"] = round(value * 1000, 3) if value is not None else None
+        return summary
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Family:
+    """
+    Métrica con etiquetas: un Counter o Histogram por combinación de
+    valores, creado en el primer uso.
+    """
+
+    def __init__(self, name, help_text, kind, labelnames, factory):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._factory())
+        return child
+
+    def children(self):
+        with self._lock:
+            return list(self._children.items())
+
+
+class Registry:
+    """
+    Conjunto de métricas del proceso. Además de contadores e histogramas
+    admite "fuentes": funciones que devuelven un dict de valores (ej. los
+    stats() ya existentes del pool o del Subject) y se exportan como gauges
+    al consultar.
+    """
+
+    def __init__(self):
+        self._families = {}
+        self._sources = {}
+        self._lock = threading.Lock()
+
+    def _family(self, name, help_text, kind, labelnames, factory):
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = Family(name, help_text, kind, labelnames, factory)
+                self._families[name] = family
+            return family
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._family(name, help_text, "counter", labelnames, Counter)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._family(name, help_text, "histogram", labelnames,
+                            lambda: Histogram(buckets))
+
+    def add_source(self, name, function):
+        """
+        Registra una fuente de gauges (reemplaza la anterior del mismo nombre).
+        """
+        with self._lock:
+            self._sources[name] = function
+
+    def _read_sources(self):
+        with self._lock:
+            sources = list(self._sources.items())
+        values = {}
+        for name, function in sources:
+            try:
+                values[name] = function()
+            except Exception as e:
+                values[name] = {"error": str(e)}
+        return values
+
+    def snapshot(self):
+        """
+        Resumen para la acción 'stats': contadores y cuantiles aproximados
+        de los histogramas (en "metrics") y los valores de cada fuente.
+        """
+        with self._lock:
+            families = list(self._families.values())
+        metrics = {}
+        for family in families:
+            entries = {}
+            for values, child in family.children():
+                entries[",".join(values) or "total"] = child.snapshot()
+            metrics[family.name] = entries
+        return dict(self._read_sources(), metrics=metrics)
+
+    def render_prometheus(self):
+        """
+        Todas las métricas en el formato de texto de Prometheus (0.0.4).
+        """
+        with self._lock:
+            families = list(self._families.values())
+        lines = []
+        for family in families:
+            name = PREFIX + family.name
+            lines.append(f"# HELP {name} {family.help}")
+            lines.append(f"# TYPE {name} {family.kind}")
+            for values, child in family.children():
+                labels = list(zip(family.labelnames, values))
+                if family.kind == "counter":
+                    lines.append(f"{name}{_labels(labels)} {child.value}")
+                    continue
+                counts, total, count = child._state()
+                cumulative = 0
+                for bound, bucket_count in zip(child.buckets + ("+Inf",), counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_labels(labels + [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {total}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+        for source, values in self._read_sources().items():
+            for key, value in _flatten(values):
+                name = f"{PREFIX}{source}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    inner = ",".join('%s="%s"' % (key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                     for key, value in pairs)
+    return "{" + inner + "}"
+
+
+def _flatten(values, prefix=""):
+    """
+    Valores numéricos de un dict anidado como pares (nombre_con_guiones_bajos, valor).
+    """
+    for key, value in values.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, name + "_")
+        elif isinstance(value, bool):
+            yield name, int(value)
+        elif isinstance(value, (int, float)):
+            yield name, value
+
+
+# Registro único del proceso
+REGISTRY = Registry()
+
+
+class MetricsHTTPServer:
+    """
+    Servidor HTTP mínimo que expone GET /metrics en un hilo aparte.
+    """
+
+    def __init__(self, host, port, registry=REGISTRY):
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry_ref.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # Sin una línea por cada consulta
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(
+            target=self.httpd.serve_forever, name="metrics-http", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        logging.getLogger("tpfi.metrics").info(
+            "Métricas en http://%s:%s/metrics", self.httpd.server_address[0], self.port)
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -1,9 +1,16 @@
 # src/modules/observer.py
 
+import collections
+import queue
 import threading
-import json
 import socket  # <-- LÍNEA AGREGADA
 
+from modules.codec import decimalize
+from modules.event_log import EventLog
+from modules.logger import get_logger
+from modules.metrics import REGISTRY
+from modules.storage import version_of
+
 # *----------------------------------------------------------------------------
 # * UADER-FCyT
 # * Ingeniería de Software II
@@ -13,74 +20,624 @@ import socket  # <-- LÍNEA AGREGADA
 # * a los clientes suscriptos.
 # *----------------------------------------------------------------------------
 
+log = get_logger("observer")
+
+# Políticas ante un suscriptor lento (su cola de salida está llena)
+POLICY_DROP_OLDEST = "drop_oldest"  # Se descarta la notificación más antigua
+POLICY_DISCONNECT = "disconnect"    # Se desconecta al suscriptor
+POLICY_COALESCE = "coalesce"        # Se reemplaza la pendiente del mismo id
+SLOW_CONSUMER_POLICIES = (POLICY_DROP_OLDEST,
+                          POLICY_DISCONNECT, POLICY_COALESCE)
+
+# Modos de notificación de un suscriptor
+MODE_FULL = "full"    # Evento 'update' con el ítem completo
+MODE_DELTA = "delta"  # Evento 'delta' con solo los campos modificados
+NOTIFICATION_MODES = (MODE_FULL, MODE_DELTA)
+
+NOTIFY_SECONDS = REGISTRY.histogram(
+    "notify_seconds", "Duración de notify (registro, filtrado, codificación y encolado)",
+    ("event",))
+SEND_SECONDS = REGISTRY.histogram(
+    "subscriber_send_seconds", "Duración de un envío a un suscriptor").labels()
+EVENTS_SENT = REGISTRY.counter(
+    "subscriber_events_total", "Notificaciones enviadas a suscriptores").labels()
+
+
+def diff_items(previous, current):
+    """
+    Diferencia a nivel de campo entre dos versiones de un ítem.
+    Devuelve (changed, removed): los campos nuevos o modificados con su
+    valor actual y la lista de campos eliminados. Los números se comparan
+    como Decimal para que 3260 y Decimal('3260') sean iguales.
+    """
+    normalized = decimalize(current)
+    changed = {field: current[field] for field, value in normalized.items()
+               if field not in previous or previous[field] != value}
+    removed = [field for field in previous if field not in normalized]
+    return changed, removed
+
+
+class SubscriptionFilter:
+    """
+    Criterios opcionales de una suscripción: ids exactos, prefijos de id y
+    filtros de igualdad sobre atributos (ej. sede, provincia).
+    Un ítem coincide si su id está en IDS o empieza con algún prefijo
+    (cuando se indicó alguno) y además cumple TODOS los filtros.
+    """
+
+    def __init__(self, ids=(), prefixes=(), attributes=None):
+        self.ids = frozenset(ids)
+        self.prefixes = tuple(prefixes)
+        # atributo -> conjunto de valores aceptados (como texto)
+        self.attributes = {attr: frozenset(values)
+                           for attr, values in (attributes or {}).items()}
+
+    @classmethod
+    def from_request(cls, data):
+        """
+        Construye el filtro a partir de la solicitud 'subscribe'
+        (campos IDS, PREFIXES y FILTER). Lanza ValueError si es inválido.
+        """
+        ids = data.get("IDS") or []
+        prefixes = data.get("PREFIXES") or []
+        raw_filter = data.get("FILTER") or {}
+        if not isinstance(ids, list) or not all(isinstance(i, str) and i for i in ids):
+            raise ValueError("'IDS' debe ser una lista de ids.")
+        if not isinstance(prefixes, list) or not all(isinstance(p, str) and p for p in prefixes):
+            raise ValueError("'PREFIXES' debe ser una lista de prefijos no vacíos.")
+        if not isinstance(raw_filter, dict):
+            raise ValueError("'FILTER' debe ser un objeto atributo -> valor.")
+        attributes = {}
+        for attr, value in raw_filter.items():
+            values = value if isinstance(value, list) else [value]
+            if not values or any(isinstance(v, (dict, list)) for v in values):
+                raise ValueError(
+                    f"El filtro de '{attr}' debe ser un valor o una lista de valores.")
+            attributes[attr] = [str(v) for v in values]
+        return cls(ids, prefixes, attributes)
+
+    def is_empty(self):
+        return not (self.ids or self.prefixes or self.attributes)
+
+    def matches(self, item):
+        if not isinstance(item, dict):
+            return self.is_empty()
+        if self.ids or self.prefixes:
+            item_id = str(item.get("id", ""))
+            if item_id not in self.ids and not item_id.startswith(self.prefixes):
+                return False
+        for attr, values in self.attributes.items():
+            if attr not in item or str(item[attr]) not in values:
+                return False
+        return True
+
+
+class SubscriberIndex:
+    """
+    Registro de suscripciones indexado por clave, para que una
+    notificación solo evalúe a los suscriptores que pueden interesarse:
+    por id exacto, por prefijo de id, por un par (atributo, valor) o,
+    sin criterios, a todos los ítems. No es thread-safe: lo protege el
+    candado del Subject.
+    """
+
+    def __init__(self):
+        self._all = set()
+        self._by_id = {}
+        self._by_prefix = {}
+        self._prefix_lengths = {}  # longitud -> cantidad de prefijos
+        self._by_attribute = {}    # (atributo, valor) -> suscripciones
+        self._attribute_names = {}  # atributo -> cantidad de entradas
+
+    def _index_keys(self, subscription):
+        """
+        Claves bajo las que se indexa una suscripción. Los filtros por
+        atributo solo se indexan si no hay ids ni prefijos (más selectivos).
+        """
+        criteria = subscription.filter
+        if criteria.ids or criteria.prefixes:
+            return ([("id", i) for i in criteria.ids] +
+                    [("prefix", p) for p in criteria.prefixes])
+        if criteria.attributes:
+            attr = min(criteria.attributes,
+                       key=lambda a: len(criteria.attributes[a]))
+            return [("attr", (attr, value)) for value in criteria.attributes[attr]]
+        return [("all", None)]
+
+    def add(self, subscription):
+        for kind, key in self._index_keys(subscription):
+            if kind == "all":
+                self._all.add(subscription)
+            elif kind == "id":
+                self._by_id.setdefault(key, set()).add(subscription)
+            elif kind == "prefix":
+                if self._insert(self._by_prefix, key, subscription):
+                    self._increment(self._prefix_lengths, len(key))
+            elif self._insert(self._by_attribute, key, subscription):
+                self._increment(self._attribute_names, key[0])
+
+    def remove(self, subscription):
+        for kind, key in self._index_keys(subscription):
+            if kind == "all":
+                self._all.discard(subscription)
+            elif kind == "id":
+                self._discard(self._by_id, key, subscription)
+            elif kind == "prefix":
+                if self._discard(self._by_prefix, key, subscription):
+                    self._decrement(self._prefix_lengths, len(key))
+            elif self._discard(self._by_attribute, key, subscription):
+                self._decrement(self._attribute_names, key[0])
+
+    @staticmethod
+    def _insert(index, key, subscription):
+        """
+        Agrega la suscripción al balde; devuelve True si el balde es nuevo.
+        """
+        bucket = index.setdefault(key, set())
+        is_new = not bucket
+        bucket.add(subscription)
+        return is_new
+
+    @staticmethod
+    def _discard(index, key, subscription):
+        """
+        Quita la suscripción del balde; devuelve True si el balde quedó
+        vacío (y se eliminó).
+        """
+        bucket = index.get(key)
+        if bucket is None:
+            return False
+        bucket.discard(subscription)
+        if bucket:
+            return False
+        del index[key]
+        return True
+
+    @staticmethod
+    def _increment(counts, name):
+        counts[name] = counts.get(name, 0) + 1
+
+    @staticmethod
+    def _decrement(counts, name):
+        counts[name] -= 1
+        if not counts[name]:
+            del counts[name]
+
+    def candidates(self, item):
+        """
+        Suscripciones que PUEDEN coincidir con el ítem (luego se verifica
+        el filtro completo de cada una).
+        """
+        found = set(self._all)
+        if not isinstance(item, dict):
+            return found
+        item_id = str(item.get("id", ""))
+        found.update(self._by_id.get(item_id, ()))
+        for length in self._prefix_lengths:
+            found.update(self._by_prefix.get(item_id[:length], ()))
+        for attr in self._attribute_names:
+            if attr in item:
+                found.update(self._by_attribute.get(
+                    (attr, str(item[attr])), ()))
+        return found
+
+
+class SlowConsumer(Exception):
+    """
+    La cola de salida de un suscriptor se llenó con la política 'disconnect'.
+    """
+
+
+class Subscription:
+    """
+    Estado de un suscriptor: su conexión y su cola de salida acotada con
+    las notificaciones ya serializadas que aún no se le enviaron.
+    """
+
+    def __init__(self, connection, client_uuid, max_queue, policy,
+                 subscription_filter=None, mode=MODE_FULL):
+        self.connection = connection
+        self.client_uuid = client_uuid
+        self.filter = subscription_filter or SubscriptionFilter()
+        self.mode = mode
+        self.max_queue = max_queue
+        self.policy = policy
+        self.scheduled = False  # True mientras está en la cola de envío
+        # Retenida hasta que se envía la respuesta al 'subscribe' (release)
+        self.held = True
+        self.active = True
+        self.dropped = 0
+        self.coalesced = 0
+        self._entries = collections.deque()  # [clave, payload]
+        self._by_key = {}
+        self._lock = threading.Lock()
+
+    def offer(self, payload, key=None):
+        """
+        Agrega una notificación a la cola aplicando la política de
+        suscriptor lento. Devuelve True si hay que programar su envío.
+        Lanza SlowConsumer con la política 'disconnect'.
+        """
+        with self._lock:
+            if self.policy == POLICY_COALESCE and key is not None and key in self._by_key:
+                # Solo interesa la última versión del ítem
+                self._by_key[key][1] = payload
+                self.coalesced += 1
+                return False
+
+            if len(self._entries) >= self.max_queue:
+                if self.policy == POLICY_DISCONNECT:
+                    raise SlowConsumer()
+                oldest_key, _ = self._entries.popleft()
+                if oldest_key is not None:
+                    self._by_key.pop(oldest_key, None)
+                self.dropped += 1
+
+            entry = [key, payload]
+            self._entries.append(entry)
+            if self.policy == POLICY_COALESCE and key is not None:
+                self._by_key[key] = entry
+
+            if self.scheduled or self.held or self.connection.paused:
+                return False
+            self.scheduled = True
+            return True
+
+    def take(self):
+        """
+        Retira todas las notificaciones pendientes. Si no hay nada que
+        enviar (o la conexión está pausada) libera la marca de programada.
+        """
+        with self._lock:
+            if not self._entries or self.held or self.connection.paused or not self.active:
+                self.scheduled = False
+                return []
+            payloads = [payload for _, payload in self._entries]
+            self._entries.clear()
+            self._by_key.clear()
+            return payloads
+
+    def resume(self, release=False):
+        """
+        Programa el envío si la conexión se reanudó (o se liberó, con
+        release=True) con datos pendientes.
+        Devuelve True si hay que encolarla para envío.
+        """
+        with self._lock:
+            if release:
+                self.held = False
+            if self.scheduled or self.held or not self._entries or not self.active:
+                return False
+            self.scheduled = True
+            return True
+
+    def depth(self):
+        return len(self._entries)
+
 
 class Subject:
     """
     Implementa el patrón Observer (lado Sujeto).
     Mantiene una lista de observadores (clientes) y les notifica
     sobre eventos, como actualizaciones de datos.
+
+    La notificación se serializa una sola vez y se deja en la cola de
+    salida de cada suscriptor; un grupo chico de hilos de envío las vacía
+    de forma independiente, por lo que un suscriptor lento no demora el
+    'set' que originó el evento ni al resto de los suscriptores.
+
+    Cada evento lleva un número de secuencia ("SEQ") del registro de este
+    proceso (identificado por "STREAM") y los últimos replay_capacity se
+    conservan (opcionalmente también en replay_path) para repetírselos a
+    un observador que se reconecta con 'SINCE' y 'STREAM'.
     """
 
-    def __init__(self):
-        # Lista de observadores (sockets de clientes)
-        self._observers = []
-        # Un candado (Lock) para hacer la lista thread-safe
+    def __init__(self, max_queue=1000, policy=POLICY_DROP_OLDEST,
+                 send_timeout=5.0, fanout_workers=4, replay_capacity=10000,
+                 replay_path=None, replay_name=None):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Política de suscriptor lento desconocida: {policy}")
+        # Observadores: conexión -> Subscription
+        self._observers = {}
+        # Índice por id / prefijo / atributo para filtrar sin recorrer todos
+        self._index = SubscriberIndex()
+        # Eventos recientes con su número de secuencia
+        # (replay_name, el id del nodo o worker, encabeza el id de la secuencia)
+        self._log = EventLog(replay_capacity, replay_path, replay_name)
+        # Un candado (Lock) para hacer el registro thread-safe
         self._lock = threading.Lock()
-        print("Subject (Observer) inicializado.")
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self._ready = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._disconnected_slow = 0
+        self._send_errors = 0
+        # Descartes de suscriptores que ya se fueron
+        self._dropped_gone = 0
+        self._coalesced_gone = 0
+        for i in range(fanout_workers):
+            threading.Thread(target=self._sender_loop,
+                             name=f"fanout-{i}", daemon=True).start()
+        log.info("Subject (Observer) inicializado.")
+
+    def subscribe(self, connection, client_uuid, subscription_filter=None,
+                  mode=MODE_FULL, since=None, stream=None):
+        """
+        Agrega un observador (ClientConnection) a la lista.
+        subscription_filter (opcional) limita las notificaciones a ciertos
+        ids, prefijos o valores de atributos. mode elige entre el ítem
+        completo ('full') o solo los cambios ('delta'). Suscribirse de
+        nuevo con la misma conexión reemplaza filtro y modo.
+
+        since (opcional) es la última secuencia que recibió el cliente y
+        stream el id de la secuencia a la que pertenece: se le repiten los
+        eventos posteriores que coinciden con su filtro, o se le indica que
+        resincronice si ya no están en el buffer o la secuencia es otra
+        (ej. se reconectó a otro worker o a otro nodo).
+        Las notificaciones quedan retenidas hasta llamar a release(), luego
+        de enviar la respuesta al 'subscribe'.
+        Devuelve {"SEQ": última secuencia, "STREAM": id de la secuencia,
+        "REPLAYED": n, "RESYNC": bool}.
+        """
+        if mode not in NOTIFICATION_MODES:
+            raise ValueError(f"Modo de notificación desconocido: {mode}")
+        with self._lock:
+            subscription = self._observers.get(connection)
+            is_new = subscription is None
+            if is_new:
+                subscription = Subscription(
+                    connection, client_uuid, self.max_queue, self.policy,
+                    subscription_filter, mode)
+                self._observers[connection] = subscription
+            else:
+                self._index.remove(subscription)
+                subscription.filter = subscription_filter or SubscriptionFilter()
+                subscription.mode = mode
+                subscription.held = True
+            self._index.add(subscription)
+            total = len(self._observers)
+
+            # Repetición bajo el candado: ningún evento nuevo puede quedar
+            # en la cola antes que los repetidos
+            replay = self._replay(subscription, since, stream)
+            info = {"SEQ": self._log.last_seq,
+                    "STREAM": self._log.stream,
+                    "REPLAYED": len(replay or ()),
+                    "RESYNC": since is not None and replay is None}
+            for message in replay or ():
+                try:
+                    subscription.offer(connection.encode_event(message))
+                except SlowConsumer:
+                    info["RESYNC"] = True
+                    break
+        if is_new:
+            connection.set_send_timeout(self.send_timeout)
+            connection.on_resume = lambda: self._resume(subscription)
+        log.info("OBSERVER: Nuevo suscriptor registrado (UUID: %s). Total: %d", client_uuid, total)
+        if info["REPLAYED"] or info["RESYNC"]:
+            log.info("OBSERVER: Repetición desde SEQ %d: %d evento(s), resincronizar: %s",
+                     since, info['REPLAYED'], info['RESYNC'])
+        return info
+
+    def _replay(self, subscription, since, stream=None):
+        """
+        Eventos del buffer posteriores a since que coinciden con el filtro
+        del suscriptor (en modo 'delta' se repiten como 'update' completos).
+        None si el cliente debe resincronizar.
+        """
+        if since is None:
+            return []
+        events = self._log.since(since, stream)
+        if events is None:
+            return None
+        replay = []
+        for event in events:
+            if event["EVENT"] == "batch_update":
+                positions = [i for i, item in enumerate(event["DATA"])
+                             if subscription.filter.matches(item)]
+                if positions:
+                    matched = dict(event, DATA=[event["DATA"][i] for i in positions])
+                    if "VERSIONS" in event:
+                        matched["VERSIONS"] = [event["VERSIONS"][i] for i in positions]
+                    replay.append(matched)
+            elif subscription.filter.matches(event["DATA"]):
+                replay.append(event)
+        if len(replay) > self.max_queue:
+            return None  # No entra en su cola: mejor un listado completo
+        return replay
 
-    def subscribe(self, client_socket, client_uuid):
+    def release(self, connection):
         """
-        Agrega un observador a la lista.
+        Habilita el envío de notificaciones a un suscriptor (una vez que
+        recibió la respuesta a su 'subscribe').
         """
         with self._lock:
-            if client_socket not in self._observers:
-                self._observers.append(client_socket)
-                print(
-                    f"OBSERVER: Nuevo suscriptor registrado (UUID: {client_uuid}). Total: {len(self._observers)}")
+            subscription = self._observers.get(connection)
+        if subscription is not None and subscription.resume(release=True):
+            self._ready.put(subscription)
+
+    def last_seq(self):
+        with self._lock:
+            return self._log.last_seq
 
-    def unsubscribe(self, client_socket):
+    def unsubscribe(self, connection):
         """
         Elimina un observador de la lista (ej. si se desconecta).
         """
         with self._lock:
-            if client_socket in self._observers:
-                try:
-                    # Intenta removerlo si aún existe
-                    self._observers.remove(client_socket)
-                    print(
-                        f"OBSERVER: Suscriptor desconectado. Total: {len(self._observers)}")
-                except ValueError:
-                    # Es posible que otro hilo ya lo haya quitado, no hay problema
-                    pass
+            subscription = self._observers.pop(connection, None)
+            if subscription is not None:
+                self._index.remove(subscription)
+            total = len(self._observers)
+        if subscription is not None:
+            subscription.active = False
+            with self._stats_lock:
+                self._dropped_gone += subscription.dropped
+                self._coalesced_gone += subscription.coalesced
+            log.info("OBSERVER: Suscriptor desconectado. Total: %d", total)
 
-    def notify(self, data, encoder_class):
+    @NOTIFY_SECONDS.labels("update").timed
+    def notify(self, data, encoder_class=None, previous=None):
         """
-        Notifica a TODOS los observadores enviando los datos.
+        Notifica a los observadores cuyo filtro coincide con el ítem.
+        VERSION es la versión almacenada del ítem ('_version'), que avanza
+        de a uno con cada escritura: un salto le indica al suscriptor que
+        se perdió una. Los suscriptores
+        'delta' reciben solo los campos que cambiaron respecto de previous
+        (la versión anterior); si no se conoce, reciben el ítem completo.
+        (encoder_class se conserva por compatibilidad).
         """
+        key = data.get("id") if isinstance(data, dict) else None
+        version = version_of(data) if isinstance(data, dict) else 0
         with self._lock:
-            if not self._observers:
-                return  # No hay nadie a quien notificar
-
-            print(
-                f"OBSERVER: Notificando a {len(self._observers)} suscriptor(es)...")
-
-            # Crear el mensaje de notificación
-            notification_message = {
+            # Crear el mensaje de notificación (con su número de secuencia)
+            full_message = self._log.append({
                 "EVENT": "update",
+                "VERSION": version,
                 "DATA": data
+            })
+            subscriptions = [subscription for subscription in self._index.candidates(data)
+                             if subscription.filter.matches(data)]
+        if not subscriptions:
+            return  # No hay nadie a quien notificar
+
+        full = [s for s in subscriptions if s.mode == MODE_FULL or previous is None]
+        delta = [s for s in subscriptions if s.mode == MODE_DELTA and previous is not None]
+
+        # Los eventos 'update' de un mismo id pueden fusionarse en la cola;
+        # los 'delta' no, porque cada uno depende del anterior.
+        self._broadcast(full_message, full, key)
+        if delta:
+            changed, removed = diff_items(previous, data)
+            if not changed and not removed:
+                return
+            delta_message = {
+                "EVENT": "delta",
+                "SEQ": full_message["SEQ"],
+                "ID": key,
+                "VERSION": version,
+                "CHANGED": changed
             }
-            message_json = json.dumps(
-                notification_message, cls=encoder_class, indent=4)
-            message_bytes = message_json.encode('utf-8')
+            if removed:
+                delta_message["REMOVED"] = removed
+            self._broadcast(delta_message, delta)
 
-            # Hacemos una copia de la lista para iterar
-            # en caso de que necesitemos eliminar sockets fallidos
-            for observer_socket in list(self._observers):
-                try:
-                    observer_socket.sendall(message_bytes)
-                except socket.error as e:  # <-- Ahora 'socket' está definido
-                    # El socket está roto o cerrado
-                    print(
-                        f"OBSERVER: Error enviando a un suscriptor ({e}). Eliminándolo.")
-                    # Usamos 'observer_socket' para desuscribir
-                    self.unsubscribe(observer_socket)
+    @NOTIFY_SECONDS.labels("batch_update").timed
+    def notify_batch(self, items):
+        """
+        Notifica una escritura masiva como UN único evento por suscriptor,
+        con solo los ítems que coinciden con su filtro. Los suscriptores
+        que reciben el mismo subconjunto comparten la serialización.
+        VERSIONS trae la versión almacenada de cada ítem (en el orden de DATA).
+        """
+        groups = {}  # índices de los ítems -> suscripciones
+        versions = [version_of(item) if isinstance(item, dict) else 0 for item in items]
+        with self._lock:
+            seq = self._log.append({"EVENT": "batch_update", "DATA": items,
+                                    "VERSIONS": versions})["SEQ"]
+            matched = {}
+            for position, item in enumerate(items):
+                for subscription in self._index.candidates(item):
+                    if subscription.filter.matches(item):
+                        matched.setdefault(subscription, []).append(position)
+        for subscription, positions in matched.items():
+            groups.setdefault(tuple(positions), []).append(subscription)
+        for positions, subscriptions in groups.items():
+            self._broadcast({"EVENT": "batch_update", "SEQ": seq,
+                             "DATA": [items[i] for i in positions],
+                             "VERSIONS": [versions[i] for i in positions]},
+                            subscriptions)
+
+    def _broadcast(self, notification_message, subscriptions, key=None):
+        if not subscriptions:
+            return
+
+        log.debug("OBSERVER: Notificando a %d suscriptor(es)...", len(subscriptions))
+
+        # Se serializa una sola vez por formato (legacy/enmarcado, codificación)
+        encoded = {}
+
+        for subscription in subscriptions:
+            observer = subscription.connection
+            wire_format = observer.wire_format
+            if wire_format not in encoded:
+                encoded[wire_format] = observer.encode_event(
+                    notification_message)
+            try:
+                if subscription.offer(encoded[wire_format], key):
+                    self._ready.put(subscription)
+            except SlowConsumer:
+                log.warning("OBSERVER: Suscriptor lento (UUID: %s). Desconectándolo.",
+                            subscription.client_uuid)
+                with self._stats_lock:
+                    self._disconnected_slow += 1
+                self._drop(subscription)
+
+    def _resume(self, subscription):
+        if subscription.resume():
+            self._ready.put(subscription)
+
+    def _drop(self, subscription):
+        """
+        Quita al suscriptor y corta su conexión. El servidor detecta el
+        cierre y libera el resto de los recursos.
+        """
+        self.unsubscribe(subscription.connection)
+        subscription.connection.abort()
+
+    def _sender_loop(self):
+        """
+        Hilo de envío: vacía las colas de los suscriptores programados.
+        """
+        while True:
+            subscription = self._ready.get()
+            payloads = subscription.take()
+            if not payloads:
+                continue
+            try:
+                with SEND_SECONDS.time():
+                    subscription.connection.send_bytes(b"".join(payloads))
+                EVENTS_SENT.inc(len(payloads))
+            except socket.error as e:  # <-- Ahora 'socket' está definido
+                # El socket está roto, cerrado o no aceptó datos a tiempo
+                log.info("OBSERVER: Error enviando a un suscriptor (%s). Eliminándolo.", e)
+                with self._stats_lock:
+                    self._send_errors += 1
+                self._drop(subscription)
+                continue
+            # Volver a la cola por si llegaron más notificaciones mientras
+            # se enviaba (take() libera la marca si no hay nada)
+            self._ready.put(subscription)
+
+    def close(self):
+        """
+        Cierra el archivo de eventos (al apagar el servidor).
+        """
+        with self._lock:
+            self._log.close()
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._observers)
+
+    def stats(self):
+        """
+        Métricas del fan-out: suscriptores, notificaciones en cola y
+        descartes por política de suscriptor lento.
+        """
+        with self._lock:
+            subscriptions = list(self._observers.values())
+            replay = self._log.stats()
+        with self._stats_lock:
+            return {
+                "subscribers": len(subscriptions),
+                "queued": sum(s.depth() for s in subscriptions),
+                "max_queue_depth": max((s.depth() for s in subscriptions), default=0),
+                "policy": self.policy,
+                "dropped": sum(s.dropped for s in subscriptions) + self._dropped_gone,
+                "coalesced": sum(s.coalesced for s in subscriptions) + self._coalesced_gone,
+                "disconnected_slow": self._disconnected_slow,
+                "send_errors": self._send_errors,
+                "replay": replay,
+            }
@@ -0,0 +1,128 @@
+# src/modules/prefork.py
+
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import time
+
+from modules.ipc_bus import BusHub
+from modules.logger import get_logger
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * prefork.py
+# * Modo multiproceso: el proceso maestro levanta N workers (cada uno con su
+# * propio intérprete y GIL) que comparten el puerto con SO_REUSEPORT, los
+# * une con el bus de eventos (modules.ipc_bus) y reinicia los que terminan.
+# *----------------------------------------------------------------------------
+
+log = get_logger("prefork")
+
+# Espera antes de reiniciar un worker, que se duplica si vuelve a terminar
+# antes de STABLE_SECONDS (hasta MAX_RESTART_DELAY)
+RESTART_DELAY = 1.0
+MAX_RESTART_DELAY = 30.0
+STABLE_SECONDS = 10.0
+STOP_TIMEOUT = 10.0
+
+
+def per_worker_path(path, worker_id):
+    """
+    Archivo propio de un worker: "eventos.log" -> "eventos.2.log".
+    """
+    if not path:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{worker_id}{ext}"
+
+
+class _Slot:
+    __slots__ = ("worker_id", "process", "started_at", "delay", "restart_at")
+
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.process = None
+        self.started_at = 0.0
+        self.delay = RESTART_DELAY
+        self.restart_at = None
+
+
+class Supervisor:
+    """
+    Proceso maestro. command(worker_id, bus_path) devuelve la línea de
+    comandos de un worker (el mismo servidor con el id y la ruta del bus).
+    run() bloquea hasta Ctrl+C o SIGTERM y detiene a los workers.
+    """
+
+    def __init__(self, command, processes):
+        self.command = command
+        self.processes = processes
+        self._dir = tempfile.mkdtemp(prefix="tpfi-bus-")
+        self.bus_path = os.path.join(self._dir, "bus.sock")
+        self.hub = BusHub(self.bus_path)
+        self._slots = [_Slot(worker_id) for worker_id in range(processes)]
+        self._restarts = 0
+
+    def _spawn(self, slot):
+        slot.process = subprocess.Popen(self.command(slot.worker_id, self.bus_path))
+        slot.started_at = time.monotonic()
+        slot.restart_at = None
+        log.info("Worker %d iniciado (pid %d).", slot.worker_id, slot.process.pid)
+
+    def _check(self, slot, now):
+        if slot.restart_at is not None:
+            if now >= slot.restart_at:
+                self._restarts += 1
+                self._spawn(slot)
+            return
+        code = slot.process.poll()
+        if code is None:
+            return
+        # Un worker que cae enseguida espera cada vez más antes de volver
+        if now - slot.started_at < STABLE_SECONDS:
+            slot.delay = min(slot.delay * 2, MAX_RESTART_DELAY)
+        else:
+            slot.delay = RESTART_DELAY
+        slot.restart_at = now + slot.delay
+        log.warning("Worker %d (pid %d) terminó con código %s; se reinicia en %.1f s.",
+                    slot.worker_id, slot.process.pid, code, slot.delay)
+
+    def run(self):
+        previous_handler = signal.signal(signal.SIGTERM, signal.default_int_handler)
+        self.hub.start()
+        log.info("Maestro (pid %d) con %d workers; bus en %s",
+                 os.getpid(), self.processes, self.bus_path)
+        try:
+            for slot in self._slots:
+                self._spawn(slot)
+            while True:
+                time.sleep(0.5)
+                now = time.monotonic()
+                for slot in self._slots:
+                    self._check(slot, now)
+        except KeyboardInterrupt:
+            log.info("Deteniendo workers...")
+        finally:
+            self.stop()
+            signal.signal(signal.SIGTERM, previous_handler)
+
+    def stop(self):
+        running = [slot.process for slot in self._slots
+                   if slot.process is not None and slot.process.poll() is None]
+        for process in running:
+            process.terminate()
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for process in running:
+            try:
+                process.wait(max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                log.warning("Worker pid %d no terminó a tiempo; se fuerza.", process.pid)
+                process.kill()
+                process.wait()
+        log.info("Bus: %s; reinicios: %d", self.hub.stats(), self._restarts)
+        self.hub.close()
+        shutil.rmtree(self._dir, ignore_errors=True)
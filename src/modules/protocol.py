@@ -0,0 +1,675 @@
+# src/modules/protocol.py
+
+import collections
+import json
+import socket
+import struct
+import threading
+from decimal import Decimal
+
+from modules import codec
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * protocol.py
+# * Módulo que implementa el protocolo de transporte entre clientes y
+# * servidor: modo "legacy" (un JSON por conexión) y modo "enmarcado"
+# * (frames con prefijo de longitud sobre una conexión persistente).
+# *----------------------------------------------------------------------------
+
+# Preámbulo que envía un cliente enmarcado al abrir la conexión.
+# Un cliente legacy siempre empieza con '{', por lo que no hay ambigüedad.
+# El cliente puede ofrecer codificaciones en la misma línea, en orden de
+# preferencia ("TPFI/1 codecs=msgpack,json\n"); el servidor contesta con
+# la elegida ("TPFI/1 codec=msgpack\n"). Sin oferta no hay respuesta y
+# se usa JSON.
+PREAMBLE = b"TPFI/1\n"
+MAX_PREAMBLE_SIZE = 256
+
+# Cabecera de cada frame: longitud del payload (uint32, big-endian)
+FRAME_HEADER = struct.Struct("!I")
+
+# Tamaño máximo aceptado para un frame o una solicitud legacy (16 MiB)
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+RECV_SIZE = 65536
+
+
+class ProtocolError(Exception):
+    """
+    Error de protocolo: frame demasiado grande, preámbulo inválido, etc.
+    """
+
+
+class DecimalEncoder(json.JSONEncoder):
+    """
+    Clase auxiliar para convertir Decimal a string en JSON.
+    """
+
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return str(obj)
+        return super(DecimalEncoder, self).default(obj)
+
+
+def encode_frame(payload):
+    """
+    Antepone la cabecera de longitud a un payload (bytes).
+    """
+    if len(payload) > MAX_FRAME_SIZE:
+        raise ProtocolError(f"Frame de {len(payload)} bytes excede el máximo.")
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def encode_json_frame(message):
+    """
+    Serializa un mensaje como JSON compacto y lo enmarca.
+    """
+    return encode_frame(encode_json(message))
+
+
+def encode_json(message):
+    """
+    Serializa un mensaje como JSON compacto (sin indentación ni espacios).
+    """
+    return json.dumps(message, cls=DecimalEncoder,
+                      separators=(',', ':')).encode('utf-8')
+
+
+def encode_legacy(message):
+    """
+    Serializa un mensaje para un cliente legacy (JSON indentado, sin marco).
+    """
+    return json.dumps(message, cls=DecimalEncoder, indent=4).encode('utf-8')
+
+
+def decode_json(payload):
+    return json.loads(payload.decode('utf-8'))
+
+
+# Codificación de los payloads del modo enmarcado
+Codec = collections.namedtuple("Codec", "name encode decode")
+JSON_CODEC = Codec("json", encode_json, decode_json)
+BINARY_CODEC = Codec("msgpack", codec.pack, codec.unpack)
+CODECS = {c.name: c for c in (JSON_CODEC, BINARY_CODEC)}
+
+
+def negotiate_codec(offered):
+    """
+    Elige la primera codificación ofrecida por el cliente que el servidor
+    soporta; JSON si no hay ninguna en común.
+    """
+    for name in offered:
+        if name in CODECS:
+            return CODECS[name]
+    return JSON_CODEC
+
+
+def make_preamble(codecs=None):
+    """
+    Preámbulo del cliente, opcionalmente con la lista de codificaciones.
+    """
+    if not codecs:
+        return PREAMBLE
+    return PREAMBLE[:-1] + b" codecs=" + ",".join(codecs).encode('ascii') + b"\n"
+
+
+# Resultado de una solicitud cuya respuesta no se envía al terminar de
+# procesarla sino más tarde, desde otro hilo (ej. un 'set' combinado)
+DEFERRED = object()
+
+# Respuesta (503) del control de admisión de ambos motores
+SERVER_BUSY = {"error": "Server Busy",
+               "message": "El servidor está saturado. Reintente más tarde."}
+
+
+def make_response(response_data, status_code, request_id=None, more=False):
+    """
+    Construye el sobre de respuesta del modo enmarcado.
+    more=True indica una respuesta parcial: seguirán más frames con el
+    mismo REQID hasta uno sin la marca "MORE".
+    """
+    response = {"REQID": request_id,
+                "STATUS": status_code, "DATA": response_data}
+    if more:
+        response["MORE"] = True
+    return response
+
+
+class FrameDecoder:
+    """
+    Decodificador incremental de frames con prefijo de longitud.
+    Acepta bytes en trozos arbitrarios y devuelve los payloads completos.
+    """
+
+    def __init__(self, max_frame_size=MAX_FRAME_SIZE):
+        self._buffer = bytearray()
+        self._max_frame_size = max_frame_size
+
+    def feed(self, data):
+        """
+        Agrega bytes al buffer y devuelve la lista de payloads completos.
+        """
+        self._buffer += data
+        frames = []
+        header_size = FRAME_HEADER.size
+        offset = 0
+        while len(self._buffer) - offset >= header_size:
+            (length,) = FRAME_HEADER.unpack_from(self._buffer, offset)
+            if length > self._max_frame_size:
+                raise ProtocolError(
+                    f"Frame de {length} bytes excede el máximo permitido.")
+            end = offset + header_size + length
+            if len(self._buffer) < end:
+                break
+            frames.append(bytes(self._buffer[offset + header_size:end]))
+            offset = end
+        if offset:
+            del self._buffer[:offset]
+        return frames
+
+    def pending(self):
+        """
+        Cantidad de bytes recibidos que aún no forman un frame completo.
+        """
+        return len(self._buffer)
+
+
+class JsonStreamDecoder:
+    """
+    Decodificador incremental para el modo legacy: separa documentos JSON
+    concatenados (con o sin espacios entre ellos) que llegan en trozos.
+    """
+
+    def __init__(self, max_size=MAX_FRAME_SIZE):
+        self._buffer = ""
+        self._pending = b""
+        self._decoder = json.JSONDecoder()
+        self._max_size = max_size
+
+    def feed(self, data):
+        """
+        Agrega bytes y devuelve la lista de objetos JSON completos.
+        Lanza json.JSONDecodeError si el contenido no puede ser JSON.
+        """
+        data = self._pending + data
+        try:
+            self._buffer += data.decode('utf-8')
+            self._pending = b""
+        except UnicodeDecodeError as e:
+            # Un carácter multibyte quedó partido entre dos trozos
+            self._buffer += data[:e.start].decode('utf-8')
+            self._pending = data[e.start:]
+
+        documents = []
+        while True:
+            text = self._buffer.lstrip()
+            if not text:
+                self._buffer = ""
+                break
+            try:
+                obj, end = self._decoder.raw_decode(text)
+            except json.JSONDecodeError:
+                if _is_truncated(text):
+                    # Documento incompleto: esperar más datos
+                    self._buffer = text
+                    if len(text) > self._max_size:
+                        raise ProtocolError(
+                            "Documento JSON excede el máximo permitido.")
+                    break
+                raise
+            documents.append(obj)
+            self._buffer = text[end:]
+        return documents
+
+    def pending(self):
+        """
+        Cantidad de caracteres recibidos que aún no forman un documento.
+        """
+        return len(self._buffer) + len(self._pending)
+
+
+def _is_truncated(text):
+    """
+    Indica si el texto es el comienzo de un documento JSON todavía
+    incompleto (string o llaves/corchetes sin cerrar).
+    """
+    depth = 0
+    in_string = False
+    escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in '{[':
+            depth += 1
+        elif ch in '}]':
+            depth -= 1
+    return in_string or depth > 0
+
+
+class RequestDecoder:
+    """
+    Decodificador de solicitudes del lado servidor, independiente del
+    transporte. Detecta el modo (legacy o enmarcado) con los primeros
+    bytes y luego separa las solicitudes que llegan en trozos arbitrarios.
+    """
+
+    def __init__(self):
+        self.framed = None  # None hasta recibir los primeros bytes
+        self.codec = JSON_CODEC
+        self._decoder = None
+        self._head = b""
+        self._handshake_reply = None
+
+    def _detect_mode(self, data):
+        """
+        Decide el modo a partir de los primeros bytes recibidos.
+        Devuelve los bytes restantes luego del preámbulo (si lo hay).
+        """
+        if data[:1] == PREAMBLE[:1]:
+            end = data.find(b"\n")
+            if end < 0:
+                if len(data) > MAX_PREAMBLE_SIZE:
+                    raise ProtocolError("Preámbulo de protocolo inválido.")
+                return None  # Faltan bytes del preámbulo
+            line = data[:end].split(b" ")
+            if line[0] != PREAMBLE[:-1] or len(line) > 2:
+                raise ProtocolError("Preámbulo de protocolo inválido.")
+            if len(line) == 2:
+                if not line[1].startswith(b"codecs="):
+                    raise ProtocolError("Preámbulo de protocolo inválido.")
+                offered = line[1][len(b"codecs="):].decode('ascii', 'replace')
+                self.codec = negotiate_codec(offered.split(","))
+                self._handshake_reply = PREAMBLE[:-1] + \
+                    b" codec=" + self.codec.name.encode('ascii') + b"\n"
+            self.framed = True
+            self._decoder = FrameDecoder()
+            return data[end + 1:]
+        self.framed = False
+        self._decoder = JsonStreamDecoder()
+        return data
+
+    def feed(self, chunk):
+        """
+        Agrega bytes y devuelve las solicitudes completas, sin decodificar
+        en modo enmarcado (ver decode()) y ya decodificadas en modo legacy.
+        """
+        if self.framed is None:
+            self._head += chunk
+            chunk = self._detect_mode(self._head)
+            if chunk is None:
+                return []
+            self._head = b""
+        return self._decoder.feed(chunk)
+
+    def take_handshake_reply(self):
+        """
+        Respuesta al preámbulo con la codificación elegida, que debe
+        enviarse antes que cualquier otra (una sola vez; None si no hay).
+        """
+        reply, self._handshake_reply = self._handshake_reply, None
+        return reply
+
+    def decode(self, request):
+        """
+        Decodifica una solicitud devuelta por feed().
+        Lanza ValueError (json.JSONDecodeError, codec.CodecError) si el
+        payload es inválido; en modo enmarcado no rompe el marco.
+        """
+        if self.framed:
+            return self.codec.decode(request)
+        return request
+
+
+class BaseConnection:
+    """
+    Comportamiento común de una conexión de cliente del lado servidor:
+    serialización de respuestas y notificaciones según el modo.
+    Las subclases implementan send_bytes() y close().
+    """
+
+    framed = None
+    codec = JSON_CODEC
+    is_subscriber = False
+    # Control de flujo para el fan-out del Subject: mientras paused es True
+    # no se le envían notificaciones; al reanudarse se llama a on_resume()
+    paused = False
+    on_resume = None
+
+    def encode_response(self, response_data, status_code, request_id=None,
+                        more=False):
+        """
+        Serializa una respuesta según el modo de la conexión.
+        """
+        if self.framed:
+            return encode_frame(self.codec.encode(
+                make_response(response_data, status_code, request_id, more)))
+        return encode_legacy(response_data)
+
+    def encode_event(self, message):
+        """
+        Serializa una notificación según el modo de la conexión. Siempre
+        en JSON compacto: las notificaciones se envían a muchos clientes.
+        """
+        if self.framed:
+            return encode_frame(self.codec.encode(message))
+        return encode_json(message)
+
+    @property
+    def wire_format(self):
+        """
+        Clave que identifica cómo se serializa un evento para esta conexión
+        (para codificarlo una sola vez por formato).
+        """
+        return self.framed, self.codec.name
+
+    def invalid_request(self):
+        """
+        Respuesta para una solicitud que no se pudo decodificar.
+        """
+        if self.codec is JSON_CODEC:
+            return {"error": "Invalid JSON",
+                    "message": "La solicitud no es un JSON válido."}
+        return {"error": "Invalid Payload",
+                "message": f"La solicitud no es un mensaje {self.codec.name} válido."}
+
+    def send_bytes(self, data):
+        raise NotImplementedError
+
+    def send_response(self, response_data, status_code, request_id=None,
+                      more=False):
+        self.send_bytes(self.encode_response(
+            response_data, status_code, request_id, more))
+
+    def send_event(self, message):
+        self.send_bytes(self.encode_event(message))
+
+    def drain(self):
+        """
+        Bloquea hasta que el cliente absorba lo enviado (para no acumular
+        una respuesta larga en memoria). Con sockets bloqueantes send_bytes
+        ya espera, por lo que no hace nada.
+        """
+
+    def set_send_timeout(self, timeout):
+        """
+        Tiempo máximo para entregar un envío antes de considerar al
+        cliente como caído (solo en sockets bloqueantes).
+        """
+
+    def send_within(self, data, timeout):
+        """
+        Como send_bytes, pero sin esperar al cliente más de timeout
+        segundos (solo en sockets bloqueantes).
+        """
+        self.send_bytes(data)
+
+    def abort(self):
+        """
+        Corta la conexión desde otro hilo; el dueño de la conexión detecta
+        el cierre y libera los recursos.
+        """
+        self.close()
+
+    def close(self):
+        raise NotImplementedError
+
+
+class ClientConnection(BaseConnection):
+    """
+    Envuelve el socket bloqueante de un cliente del lado servidor.
+    Serializa los envíos con un candado para que respuestas y
+    notificaciones no se intercalen.
+    """
+
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self._decoder = RequestDecoder()
+        self._requests = []
+        self._send_lock = threading.Lock()
+
+    @property
+    def framed(self):
+        return self._decoder.framed
+
+    @property
+    def codec(self):
+        return self._decoder.codec
+
+    def fill(self):
+        """
+        Realiza UNA lectura del socket y decodifica las solicitudes completas.
+        Devuelve False si el cliente cerró la conexión.
+        """
+        chunk = self.sock.recv(RECV_SIZE)
+        if not chunk:
+            return False
+        self._requests.extend(self._decoder.feed(chunk))
+        reply = self._decoder.take_handshake_reply()
+        if reply:
+            self.send_bytes(reply)
+        return True
+
+    def has_request(self):
+        """
+        Indica si hay solicitudes completas ya recibidas.
+        """
+        return bool(self._requests)
+
+    def next_request(self):
+        """
+        Devuelve la próxima solicitud ya recibida, decodificada.
+        Lanza ValueError si la solicitud no se puede decodificar.
+        """
+        return self._decoder.decode(self._requests.pop(0))
+
+    def read_request(self):
+        """
+        Bloquea hasta obtener la próxima solicitud completa.
+        Devuelve el objeto decodificado o None si el cliente cerró la conexión.
+        Lanza ValueError si la solicitud no se puede decodificar.
+        """
+        while not self._requests:
+            if not self.fill():
+                return None
+        return self.next_request()
+
+    def send_bytes(self, data):
+        """
+        Envía bytes ya serializados de forma thread-safe.
+        """
+        with self._send_lock:
+            self.sock.sendall(data)
+
+    def send_nowait(self, data):
+        """
+        Envía sin bloquear (ej. desde el hilo del monitor, que no puede
+        esperar a un cliente). Devuelve False si otro hilo está enviando o
+        el socket no aceptó todos los bytes: un envío parcial deja la
+        conexión inservible y el llamador debe cerrarla.
+        """
+        if not self._send_lock.acquire(blocking=False):
+            return False
+        timeout = self.sock.gettimeout()
+        try:
+            self.sock.settimeout(0)
+            return self.sock.send(data) == len(data)
+        except OSError:  # Incluye BlockingIOError (buffer de envío lleno)
+            return False
+        finally:
+            try:
+                self.sock.settimeout(timeout)
+            except OSError:
+                pass
+            self._send_lock.release()
+
+    def send_within(self, data, timeout):
+        """
+        Envía con un timeout propio, sin cambiar el de los demás envíos.
+        Si vence, parte de los bytes pudo salir: se corta la conexión.
+        """
+        with self._send_lock:
+            previous = self.sock.gettimeout()
+            try:
+                self.sock.settimeout(timeout)
+                self.sock.sendall(data)
+            except socket.timeout:
+                self.abort()
+                raise
+            finally:
+                try:
+                    self.sock.settimeout(previous)
+                except OSError:
+                    pass
+
+    def set_send_timeout(self, timeout):
+        # Las lecturas solo se hacen con datos disponibles, por lo que el
+        # timeout en la práctica solo acota los envíos.
+        self.sock.settimeout(timeout)
+
+    def abort(self):
+        # Sin close(): el monitor ve el fin de la conexión y la cierra
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class FramedClient:
+    """
+    Cliente del modo enmarcado. Mantiene una conexión persistente y
+    permite enviar varias solicitudes seguidas (pipelining); cada
+    respuesta vuelve etiquetada con el REQID de su solicitud.
+    codecs (opcional) es la lista de codificaciones aceptadas, en orden de
+    preferencia; la elegida por el servidor queda en self.codec.
+    """
+
+    def __init__(self, host, port, timeout=None, codecs=None):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.sendall(make_preamble(codecs))
+        self._decoder = FrameDecoder()
+        self._inbox = []
+        self._next_id = 0
+        self.codec = JSON_CODEC
+        if codecs:
+            self._read_handshake()
+
+    def _read_handshake(self):
+        """
+        Lee la respuesta al preámbulo con la codificación elegida.
+        """
+        head = b""
+        while b"\n" not in head:
+            chunk = self.sock.recv(RECV_SIZE)
+            if not chunk:
+                raise ConnectionError(
+                    "El servidor cerró la conexión durante el saludo.")
+            head += chunk
+            if len(head) > MAX_PREAMBLE_SIZE and b"\n" not in head:
+                raise ProtocolError("Respuesta de saludo inválida.")
+        line, rest = head.split(b"\n", 1)
+        prefix = PREAMBLE[:-1] + b" codec="
+        if not line.startswith(prefix):
+            raise ProtocolError("Respuesta de saludo inválida.")
+        name = line[len(prefix):].decode('ascii', 'replace')
+        if name not in CODECS:
+            raise ProtocolError(f"Codificación desconocida: {name}")
+        self.codec = CODECS[name]
+        if rest:
+            self._inbox.extend(self.codec.decode(payload)
+                               for payload in self._decoder.feed(rest))
+
+    def send(self, request):
+        """
+        Envía una solicitud sin esperar la respuesta. Devuelve su REQID.
+        """
+        if "REQID" not in request:
+            self._next_id += 1
+            request = dict(request, REQID=self._next_id)
+        self.sock.sendall(encode_frame(self.codec.encode(request)))
+        return request["REQID"]
+
+    def receive(self):
+        """
+        Bloquea hasta recibir el próximo mensaje (respuesta o evento).
+        Devuelve None si el servidor cerró la conexión.
+        """
+        while not self._inbox:
+            chunk = self.sock.recv(RECV_SIZE)
+            if not chunk:
+                return None
+            self._inbox.extend(
+                self.codec.decode(payload)
+                for payload in self._decoder.feed(chunk))
+        return self._inbox.pop(0)
+
+    def pipeline(self, requests):
+        """
+        Envía todas las solicitudes y luego recolecta sus respuestas.
+        Devuelve un dict REQID -> sobre de respuesta.
+        """
+        pending = {self.send(request) for request in requests}
+        responses = {}
+        while pending:
+            message = self.receive()
+            if message is None:
+                raise ConnectionError(
+                    "El servidor cerró la conexión con solicitudes pendientes.")
+            request_id = message.get("REQID")
+            if request_id in pending and not message.get("MORE"):
+                pending.discard(request_id)
+                responses[request_id] = message
+        return responses
+
+    def request(self, request):
+        """
+        Envía una solicitud y espera su respuesta.
+        """
+        request_id = self.send(request)
+        while True:
+            message = self.receive()
+            if message is None:
+                raise ConnectionError("El servidor cerró la conexión.")
+            if message.get("REQID") == request_id and "EVENT" not in message:
+                return message
+
+    def stream(self, request):
+        """
+        Envía una solicitud con respuesta transmitida en partes y entrega
+        cada sobre (parciales y final) a medida que llegan.
+        """
+        request_id = self.send(dict(request, STREAM=True))
+        while True:
+            message = self.receive()
+            if message is None:
+                raise ConnectionError("El servidor cerró la conexión.")
+            if message.get("REQID") == request_id and "EVENT" not in message:
+                yield message
+                if not message.get("MORE"):
+                    return
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
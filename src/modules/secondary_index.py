@@ -0,0 +1,138 @@
+# src/modules/secondary_index.py
+
+import bisect
+import threading
+
+from modules.logger import get_logger
+from modules.storage import QUERY_EQ, normalize
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * secondary_index.py
+# * Índice secundario en memoria para la acción 'query': por cada atributo
+# * indexado, valor -> ids de los ítems con ese valor. Se arma con un
+# * recorrido de la tabla al iniciar y se mantiene con cada escritura.
+# *----------------------------------------------------------------------------
+
+log = get_logger("secondary_index")
+
+
+def _indexable(value):
+    return value is not None and not isinstance(value, (dict, list))
+
+
+class SecondaryIndex:
+    """
+    Índice de los atributos indicados. lookup() devuelve los ids
+    candidatos de una consulta (o None si ninguna condición usa un
+    atributo indexado); el índice puede tener entradas de más, por eso el
+    llamador verifica cada ítem con las condiciones.
+    Hasta que termina la carga inicial (ready) no responde consultas.
+    """
+
+    def __init__(self, attributes):
+        self.attributes = tuple(attributes)
+        self._lock = threading.Lock()
+        self._ids = {attribute: {} for attribute in self.attributes}     # valor -> set(ids)
+        self._values = {attribute: [] for attribute in self.attributes}  # valores de texto ordenados
+        self._entries = {}  # id -> {atributo: valor} indexado, para quitarlo al cambiar
+        self._building = set()  # ids escritos durante la carga inicial
+        self.ready = False
+
+    def _remove(self, item_id):
+        for attribute, value in self._entries.pop(item_id, {}).items():
+            ids = self._ids[attribute].get(value)
+            if ids is None:
+                continue
+            ids.discard(item_id)
+            if not ids:
+                del self._ids[attribute][value]
+                if isinstance(value, str):
+                    values = self._values[attribute]
+                    values.pop(bisect.bisect_left(values, value))
+
+    def _add(self, item):
+        entry = {}
+        for attribute in self.attributes:
+            value = item.get(attribute)
+            if not _indexable(value):
+                continue
+            ids = self._ids[attribute].get(value)
+            if ids is None:
+                ids = self._ids[attribute][value] = set()
+                if isinstance(value, str):
+                    bisect.insort(self._values[attribute], value)
+            ids.add(item['id'])
+            entry[attribute] = value
+        if entry:
+            self._entries[item['id']] = entry
+
+    def update(self, items):
+        """
+        Refleja ítems escritos (completos) en el índice.
+        """
+        items = [normalize(item) for item in items]
+        with self._lock:
+            for item in items:
+                self._remove(item['id'])
+                self._add(item)
+                if not self.ready:
+                    self._building.add(item['id'])
+
+    def load(self, pages):
+        """
+        Carga inicial desde las páginas de un recorrido de la tabla. Los
+        ítems escritos mientras tanto ya están en el índice con su valor
+        nuevo y no se pisan con el leído.
+        """
+        count = 0
+        for page in pages:
+            with self._lock:
+                for item in page:
+                    if item['id'] not in self._building:
+                        self._remove(item['id'])
+                        self._add(item)
+                        count += 1
+        with self._lock:
+            self._building.clear()
+            self.ready = True
+        log.info("Índice secundario cargado: %d ítems (%s).", count, ", ".join(self.attributes))
+
+    def lookup(self, conditions):
+        """
+        Ids candidatos (intersección de las condiciones sobre atributos
+        indexados) o None si el índice no sirve para la consulta.
+        """
+        with self._lock:
+            if not self.ready:
+                return None
+            candidates = None
+            for attribute, operator, value in conditions:
+                if attribute not in self._ids:
+                    continue
+                if operator == QUERY_EQ:
+                    if not _indexable(value):
+                        continue
+                    ids = set(self._ids[attribute].get(value, ()))
+                else:
+                    values = self._values[attribute]
+                    ids = set()
+                    for position in range(bisect.bisect_left(values, value), len(values)):
+                        if not values[position].startswith(value):
+                            break
+                        ids.update(self._ids[attribute][values[position]])
+                candidates = ids if candidates is None else candidates & ids
+                if not candidates:
+                    break
+            return candidates
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "attributes": list(self.attributes),
+                "items": len(self._entries),
+                "values": {attribute: len(ids) for attribute, ids in self._ids.items()},
+            }
@@ -0,0 +1,279 @@
+# src/modules/storage.py
+
+import time
+import zlib
+from decimal import Decimal
+
+from modules.metrics import REGISTRY
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * storage.py
+# * Interfaz de los motores de almacenamiento que usa el DataProxy:
+# * DynamoDB (storage_dynamodb.py), memoria (storage_memory.py) y SQLite
+# * (storage_sqlite.py). Todos guardan los números como Decimal, igual que
+# * DynamoDB, y paginan con una clave {'id': ...} como LastEvaluatedKey.
+# *----------------------------------------------------------------------------
+
+BACKEND_DYNAMODB = "dynamodb"
+BACKEND_MEMORY = "memory"
+BACKEND_SQLITE = "sqlite"
+BACKENDS = (BACKEND_DYNAMODB, BACKEND_MEMORY, BACKEND_SQLITE)
+
+# Atributo con la versión de cada ítem (control de concurrencia optimista,
+# ver StorageBackend.put_item). Un ítem sin el atributo tiene versión 0.
+VERSION_FIELD = "_version"
+
+# Operadores de las condiciones de 'query': (atributo, operador, valor)
+QUERY_EQ = "eq"
+QUERY_PREFIX = "prefix"
+
+# Ítems por página de scan cuando no se indica límite (los motores locales
+# no tienen el límite de 1 MB de DynamoDB, pero igual entregan por páginas)
+SCAN_PAGE_SIZE = 1000
+
+
+class StorageError(Exception):
+    """
+    Error del motor de almacenamiento (equivalente a un ClientError de
+    DynamoDB). message es el texto que se devuelve al cliente.
+    """
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+
+
+class ConditionFailed(StorageError):
+    """
+    La versión almacenada no es la esperada por una escritura condicional
+    (otro escritor modificó el ítem).
+    """
+
+
+def version_of(item):
+    """
+    Versión de un ítem almacenado (0 si no existe o no tiene versión).
+    """
+    if not item:
+        return 0
+    return int(item.get(VERSION_FIELD, 0))
+
+
+def normalize(obj):
+    """
+    Copia de un ítem con los números como Decimal, tal como los devuelve
+    DynamoDB (también los enteros; bool se conserva). Los motores locales
+    guardan y entregan copias normalizadas, así nadie modifica el ítem
+    almacenado por referencia.
+    """
+    if isinstance(obj, dict):
+        return {key: normalize(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [normalize(value) for value in obj]
+    if isinstance(obj, bool) or obj is None or isinstance(obj, (str, Decimal)):
+        return obj
+    if isinstance(obj, int):
+        return Decimal(obj)
+    if isinstance(obj, float):
+        return Decimal(repr(obj))
+    raise TypeError(
+        f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def segment_of(item_id, total_segments):
+    """
+    Segmento de un id en un escaneo paralelo de los motores locales.
+    """
+    return zlib.crc32(item_id.encode('utf-8')) % total_segments
+
+
+def matches_conditions(item, conditions):
+    """
+    True si el ítem cumple todas las condiciones (igualdad con valores ya
+    normalizados o prefijo de un texto).
+    """
+    for attribute, operator, value in conditions:
+        current = item.get(attribute)
+        if operator == QUERY_PREFIX:
+            if not isinstance(current, str) or not current.startswith(value):
+                return False
+        elif current != value or isinstance(current, bool) != isinstance(value, bool):
+            return False
+    return True
+
+
+def project(item, fields):
+    """
+    Solo los campos pedidos del ítem (siempre con su 'id'). Sin fields,
+    el ítem completo.
+    """
+    if not fields or item is None:
+        return item
+    return {field: item[field] for field in ['id'] + list(fields) if field in item}
+
+
+class StorageBackend:
+    """
+    Operaciones que el DataProxy necesita del almacenamiento. Todas son
+    thread-safe y lanzan StorageError ante un fallo del motor.
+    Los límites de lote (batch_get_limit / batch_write_limit) son los del
+    motor; None significa sin límite.
+    Las lecturas aceptan fields: solo esos atributos (y el 'id') de cada
+    ítem, como un ProjectionExpression de DynamoDB.
+    """
+
+    name = None
+    batch_get_limit = None
+    batch_write_limit = None
+
+    def get_item(self, item_id, fields=None):
+        """
+        Devuelve el ítem con ese id o None si no existe.
+        """
+        raise NotImplementedError
+
+    def put_item(self, item, expected_version=None):
+        """
+        Crea o reemplaza un ítem. Devuelve la versión anterior (o None).
+        Con expected_version la escritura es condicional: solo se aplica
+        si la versión almacenada (version_of) es esa; si no, lanza
+        ConditionFailed sin modificar nada.
+        """
+        raise NotImplementedError
+
+    def scan(self, limit=None, start_key=None, segment=None,
+             total_segments=None, fields=None):
+        """
+        Devuelve una página (items, last_key): hasta limit ítems posteriores
+        a start_key, del segmento indicado si hay escaneo paralelo.
+        last_key es None en la última página.
+        """
+        raise NotImplementedError
+
+    def query(self, conditions, limit=None, start_key=None, fields=None):
+        """
+        Ítems que cumplen todas las condiciones, paginados como scan:
+        (items, last_key). Por defecto recorre la tabla y filtra dentro del
+        motor, así solo los ítems que coinciden llegan al DataProxy.
+        """
+        limit = limit or SCAN_PAGE_SIZE
+        items = []
+        while True:
+            page, start_key = self.scan(start_key=start_key)
+            for item in page:
+                if matches_conditions(item, conditions):
+                    items.append(project(item, fields))
+                    if len(items) == limit:
+                        return items, {'id': item['id']}
+            if not start_key:
+                return items, None
+
+    def batch_get(self, item_ids, fields=None):
+        """
+        Lectura masiva. Devuelve (items encontrados, ids no procesados).
+        """
+        raise NotImplementedError
+
+    def batch_put(self, items):
+        """
+        Escritura masiva. Devuelve la lista de ítems no procesados.
+        """
+        raise NotImplementedError
+
+    def append_log(self, records):
+        """
+        Agrega registros de auditoría (CorporateLog).
+        """
+        raise NotImplementedError
+
+    def stats(self):
+        return {"backend": self.name}
+
+    def close(self):
+        pass
+
+
+STORAGE_SECONDS = REGISTRY.histogram(
+    "storage_seconds", "Duración de las operaciones del almacenamiento",
+    ("backend", "operation"))
+STORAGE_ERRORS = REGISTRY.counter(
+    "storage_errors_total", "Operaciones del almacenamiento que fallaron",
+    ("backend", "operation"))
+
+
+class InstrumentedBackend(StorageBackend):
+    """
+    Proxy de un motor que mide la duración de cada operación y cuenta los
+    errores (ver modules.metrics).
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.name = backend.name
+        self.batch_get_limit = backend.batch_get_limit
+        self.batch_write_limit = backend.batch_write_limit
+        self._timers = {}
+        self._errors = {}
+
+    def _call(self, operation, *args, **kwargs):
+        timer = self._timers.get(operation)
+        if timer is None:
+            timer = self._timers[operation] = STORAGE_SECONDS.labels(self.name, operation)
+            self._errors[operation] = STORAGE_ERRORS.labels(self.name, operation)
+        start = time.perf_counter()
+        try:
+            return getattr(self.backend, operation)(*args, **kwargs)
+        except StorageError:
+            self._errors[operation].inc()
+            raise
+        finally:
+            timer.observe(time.perf_counter() - start)
+
+    def get_item(self, item_id, fields=None):
+        return self._call("get_item", item_id, fields)
+
+    def put_item(self, item, expected_version=None):
+        return self._call("put_item", item, expected_version)
+
+    def scan(self, limit=None, start_key=None, segment=None,
+             total_segments=None, fields=None):
+        return self._call("scan", limit, start_key, segment, total_segments, fields)
+
+    def query(self, conditions, limit=None, start_key=None, fields=None):
+        return self._call("query", conditions, limit, start_key, fields)
+
+    def batch_get(self, item_ids, fields=None):
+        return self._call("batch_get", item_ids, fields)
+
+    def batch_put(self, items):
+        return self._call("batch_put", items)
+
+    def append_log(self, records):
+        return self._call("append_log", records)
+
+    def stats(self):
+        return self.backend.stats()
+
+    def close(self):
+        self.backend.close()
+
+
+def create_backend(name, **options):
+    """
+    Crea el motor de almacenamiento indicado. Cada motor se importa solo
+    si se usa: los locales no requieren boto3 ni credenciales de AWS.
+    """
+    if name == BACKEND_DYNAMODB:
+        from modules.storage_dynamodb import DynamoDBBackend
+        return DynamoDBBackend(**options)
+    if name == BACKEND_MEMORY:
+        from modules.storage_memory import MemoryBackend
+        return MemoryBackend(**options)
+    if name == BACKEND_SQLITE:
+        from modules.storage_sqlite import SQLiteBackend
+        return SQLiteBackend(**options)
+    raise ValueError(f"Motor de almacenamiento desconocido: {name}")
@@ -0,0 +1,216 @@
+# src/modules/storage_dynamodb.py
+
+import threading
+from functools import reduce
+
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+
+from modules.db_singleton import DatabaseSingleton
+from modules.logger import get_logger
+from modules.storage import (StorageBackend, StorageError, ConditionFailed,
+                             BACKEND_DYNAMODB, VERSION_FIELD, SCAN_PAGE_SIZE,
+                             QUERY_EQ, QUERY_PREFIX)
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * storage_dynamodb.py
+# * Motor de almacenamiento sobre las tablas CorporateData y CorporateLog
+# * de DynamoDB, obtenidas del DatabaseSingleton.
+# *----------------------------------------------------------------------------
+
+log = get_logger("storage_dynamodb")
+
+
+def _error(e):
+    code = e.response['Error'].get('Code')
+    error_class = ConditionFailed if code == 'ConditionalCheckFailedException' else StorageError
+    return error_class(e.response['Error']['Message'], code)
+
+
+def _projection(fields, key_attributes=('id',)):
+    """
+    Parámetros de lectura para traer solo fields (y las claves): un
+    ProjectionExpression con marcadores '#p', que admiten palabras
+    reservadas de DynamoDB como nombre de atributo.
+    """
+    if not fields:
+        return {}
+    names = {f'#p{position}': attribute for position, attribute in
+             enumerate(dict.fromkeys([*key_attributes, *fields]))}
+    return {'ProjectionExpression': ', '.join(names),
+            'ExpressionAttributeNames': names}
+
+
+class DynamoDBBackend(StorageBackend):
+    """
+    Traduce las operaciones del DataProxy a llamadas de boto3. Los lotes
+    respetan los límites de BatchGetItem (100) y BatchWriteItem (25).
+    """
+
+    name = BACKEND_DYNAMODB
+    batch_get_limit = 100
+    batch_write_limit = 25
+
+    def __init__(self, db_options=None):
+        self.db = DatabaseSingleton(db_options)
+        self.table_data = self.db.get_corporate_data_table()
+        self.table_log = self.db.get_corporate_log_table()
+        self.dynamodb = self.db.get_resource()
+        self._indexes = None  # GSI utilizables, se consultan en la primera 'query'
+        self._indexes_lock = threading.Lock()
+
+    def get_item(self, item_id, fields=None):
+        try:
+            response = self.table_data.get_item(Key={'id': item_id}, **_projection(fields))
+        except ClientError as e:
+            raise _error(e)
+        return response.get('Item')
+
+    def put_item(self, item, expected_version=None):
+        kwargs = {}
+        if expected_version is not None:
+            # Versión 0: el ítem no existe o se escribió sin versión
+            kwargs['ConditionExpression'] = (
+                'attribute_not_exists(#v)' if expected_version == 0 else '#v = :v')
+            kwargs['ExpressionAttributeNames'] = {'#v': VERSION_FIELD}
+            if expected_version:
+                kwargs['ExpressionAttributeValues'] = {':v': expected_version}
+        try:
+            response = self.table_data.put_item(
+                Item=item,
+                ReturnValues='ALL_OLD',
+                **kwargs
+            )
+        except ClientError as e:
+            raise _error(e)
+        if response['ResponseMetadata']['HTTPStatusCode'] != 200:
+            raise StorageError("La operación put_item no retornó 200")
+        return response.get('Attributes')
+
+    def scan(self, limit=None, start_key=None, segment=None,
+             total_segments=None, fields=None):
+        scan_kwargs = _projection(fields)
+        if limit:
+            scan_kwargs['Limit'] = limit
+        if start_key:
+            scan_kwargs['ExclusiveStartKey'] = start_key
+        if total_segments:
+            scan_kwargs['Segment'] = segment
+            scan_kwargs['TotalSegments'] = total_segments
+        try:
+            response = self.table_data.scan(**scan_kwargs)
+        except ClientError as e:
+            raise _error(e)
+        if 'Items' not in response:
+            raise StorageError("La operación scan no devolvió ítems")
+        return response['Items'], response.get('LastEvaluatedKey')
+
+    def _query_indexes(self):
+        """
+        GSI activos que proyectan el ítem completo: [(nombre, atributo HASH,
+        atributo RANGE o None)]. Si no se pueden consultar, ninguno.
+        """
+        with self._indexes_lock:
+            if self._indexes is None:
+                indexes = []
+                try:
+                    for index in self.table_data.global_secondary_indexes or []:
+                        if index.get('IndexStatus', 'ACTIVE') != 'ACTIVE' or \
+                                index['Projection']['ProjectionType'] != 'ALL':
+                            continue
+                        keys = {key['KeyType']: key['AttributeName'] for key in index['KeySchema']}
+                        indexes.append((index['IndexName'], keys['HASH'], keys.get('RANGE')))
+                except ClientError as e:
+                    log.warning("No se pudieron leer los índices de la tabla: %s", e)
+                self._indexes = indexes
+                log.info("Índices secundarios para 'query': %s",
+                         [name for name, _, _ in indexes] or "ninguno")
+            return self._indexes
+
+    @staticmethod
+    def _condition(attribute, operator, value, builder=Attr):
+        if operator == QUERY_PREFIX:
+            return builder(attribute).begins_with(value)
+        return builder(attribute).eq(value)
+
+    def query(self, conditions, limit=None, start_key=None, fields=None):
+        limit = limit or SCAN_PAGE_SIZE
+        # Un GSI cuya clave HASH tiene una condición de igualdad evita el scan
+        equal = {attribute: value for attribute, operator, value in conditions
+                 if operator == QUERY_EQ}
+        index = next((index for index in self._query_indexes() if index[1] in equal), None)
+        kwargs = {}
+        key_attributes = ['id']
+        remaining = list(conditions)
+        if index is not None:
+            name, hash_key, range_key = index
+            key_condition = Key(hash_key).eq(equal[hash_key])
+            remaining = [c for c in remaining if c[0] != hash_key]
+            range_condition = next((c for c in remaining if c[0] == range_key), None)
+            if range_condition is not None:
+                key_condition &= self._condition(*range_condition, builder=Key)
+                remaining.remove(range_condition)
+            kwargs['IndexName'] = name
+            kwargs['KeyConditionExpression'] = key_condition
+            key_attributes += [attribute for attribute in (hash_key, range_key) if attribute]
+        # Las claves se proyectan siempre: forman el cursor de la página
+        kwargs.update(_projection(fields, key_attributes))
+        if remaining:
+            kwargs['FilterExpression'] = reduce(
+                lambda left, right: left & right,
+                (self._condition(*condition) for condition in remaining))
+        operation = self.table_data.query if index is not None else self.table_data.scan
+
+        # Limit se aplica antes del filtro: se piden páginas hasta juntar limit
+        items = []
+        try:
+            while True:
+                if start_key:
+                    kwargs['ExclusiveStartKey'] = start_key
+                response = operation(**kwargs)
+                for item in response.get('Items', []):
+                    items.append(item)
+                    if len(items) == limit:
+                        return items, {attribute: item[attribute] for attribute in key_attributes}
+                start_key = response.get('LastEvaluatedKey')
+                if not start_key:
+                    return items, None
+        except ClientError as e:
+            raise _error(e)
+
+    def batch_get(self, item_ids, fields=None):
+        table_name = self.table_data.name
+        request = {table_name: dict({'Keys': [{'id': item_id} for item_id in item_ids]},
+                                    **_projection(fields))}
+        try:
+            response = self.dynamodb.batch_get_item(RequestItems=request)
+        except ClientError as e:
+            raise _error(e)
+        items = response.get('Responses', {}).get(table_name, [])
+        unprocessed = response.get('UnprocessedKeys') or {}
+        return items, [key['id'] for key in unprocessed.get(table_name, {}).get('Keys', [])]
+
+    def batch_put(self, items):
+        table_name = self.table_data.name
+        request = {table_name: [{'PutRequest': {'Item': item}} for item in items]}
+        try:
+            response = self.dynamodb.batch_write_item(RequestItems=request)
+        except ClientError as e:
+            raise _error(e)
+        unprocessed = response.get('UnprocessedItems') or {}
+        return [entry['PutRequest']['Item'] for entry in unprocessed.get(table_name, [])]
+
+    def append_log(self, records):
+        # batch_writer agrupa de a 25 y reintenta los no procesados
+        try:
+            with self.table_log.batch_writer() as writer:
+                for record in records:
+                    writer.put_item(Item=record)
+        except ClientError as e:
+            raise _error(e)
+
+    def stats(self):
+        return dict(self.db.stats(), backend=self.name)
@@ -0,0 +1,136 @@
+# src/modules/storage_memory.py
+
+import bisect
+import collections
+import threading
+
+from modules.storage import (StorageBackend, ConditionFailed, BACKEND_MEMORY,
+                             SCAN_PAGE_SIZE, normalize, project, segment_of,
+                             version_of)
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * storage_memory.py
+# * Motor de almacenamiento en memoria, sin dependencias externas: para
+# * pruebas de carga del servidor y despliegues sin nube (los datos se
+# * pierden al reiniciar).
+# *----------------------------------------------------------------------------
+
+# Claves que se copian por vez del índice ordenado durante un scan
+SCAN_CHUNK = 4096
+
+
+class MemoryBackend(StorageBackend):
+    """
+    Ítems repartidos en stripes (franjas) por hash del id, cada una con su
+    propio candado: escrituras de ids distintos no compiten entre sí.
+    Un índice ordenado de ids (con su candado) permite paginar el scan por
+    id, igual que ExclusiveStartKey; solo se modifica al crear un id nuevo.
+    La auditoría se guarda en un buffer acotado (los más recientes).
+    """
+
+    name = BACKEND_MEMORY
+
+    def __init__(self, stripes=16, log_capacity=100000):
+        self._stripes = [(threading.Lock(), {}) for _ in range(max(stripes, 1))]
+        self._keys = []
+        self._keys_lock = threading.Lock()
+        self._log = collections.deque(maxlen=log_capacity)
+        self._log_lock = threading.Lock()
+        self._log_total = 0
+
+    def _stripe(self, item_id):
+        return self._stripes[hash(item_id) % len(self._stripes)]
+
+    def get_item(self, item_id, fields=None):
+        lock, items = self._stripe(item_id)
+        with lock:
+            item = items.get(item_id)
+        # Con fields se copian solo los atributos pedidos
+        return normalize(project(item, fields)) if item is not None else None
+
+    def put_item(self, item, expected_version=None):
+        item = normalize(item)
+        item_id = item['id']
+        lock, items = self._stripe(item_id)
+        with lock:
+            previous = items.get(item_id)
+            if expected_version is not None and version_of(previous) != expected_version:
+                raise ConditionFailed("La versión del ítem cambió.",
+                                      "ConditionalCheckFailedException")
+            items[item_id] = item
+            if previous is None:
+                with self._keys_lock:
+                    bisect.insort(self._keys, item_id)
+        # El ítem anterior ya no está en el almacén: se entrega sin copiar
+        return previous
+
+    def scan(self, limit=None, start_key=None, segment=None,
+             total_segments=None, fields=None):
+        limit = limit or SCAN_PAGE_SIZE
+        start = start_key['id'] if start_key else None
+        ids = []
+        # Se toma una página más uno para saber si quedan ítems
+        while len(ids) <= limit:
+            with self._keys_lock:
+                index = 0 if start is None else bisect.bisect_right(self._keys, start)
+                chunk = self._keys[index:index + SCAN_CHUNK]
+            if not chunk:
+                break
+            start = chunk[-1]
+            if total_segments:
+                chunk = [item_id for item_id in chunk
+                         if segment_of(item_id, total_segments) == segment]
+            ids.extend(chunk)
+
+        page_ids = ids[:limit]
+        items = []
+        for item_id in page_ids:
+            item = self.get_item(item_id, fields)
+            if item is not None:
+                items.append(item)
+        last_key = {'id': page_ids[-1]} if len(ids) > limit else None
+        return items, last_key
+
+    def batch_get(self, item_ids, fields=None):
+        items = []
+        for item_id in item_ids:
+            item = self.get_item(item_id, fields)
+            if item is not None:
+                items.append(item)
+        return items, []
+
+    def batch_put(self, items):
+        for item in items:
+            self.put_item(item)
+        return []
+
+    def append_log(self, records):
+        records = [normalize(record) for record in records]
+        with self._log_lock:
+            self._log.extend(records)
+            self._log_total += len(records)
+
+    def log_records(self):
+        """
+        Copia de los registros de auditoría retenidos, del más antiguo al
+        más reciente.
+        """
+        with self._log_lock:
+            return list(self._log)
+
+    def stats(self):
+        with self._keys_lock:
+            count = len(self._keys)
+        with self._log_lock:
+            retained = len(self._log)
+            total = self._log_total
+        return {
+            "backend": self.name,
+            "items": count,
+            "stripes": len(self._stripes),
+            "log_records": total,
+            "log_retained": retained,
+        }
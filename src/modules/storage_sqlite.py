@@ -0,0 +1,197 @@
+# src/modules/storage_sqlite.py
+
+import sqlite3
+import threading
+
+from modules import codec
+from modules.storage import (StorageBackend, StorageError, ConditionFailed,
+                             BACKEND_SQLITE, SCAN_PAGE_SIZE, normalize, project,
+                             segment_of, version_of)
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * storage_sqlite.py
+# * Motor de almacenamiento en un archivo SQLite local (modo WAL), para
+# * despliegues sin nube. Los ítems se guardan codificados con modules.codec,
+# * que conserva los Decimal sin pasar por float.
+# *----------------------------------------------------------------------------
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS corporate_data ("
+    " id TEXT PRIMARY KEY, segment_hash INTEGER NOT NULL, item BLOB NOT NULL"
+    ") WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS corporate_log ("
+    " id TEXT PRIMARY KEY, timestamp TEXT, item BLOB NOT NULL"
+    ") WITHOUT ROWID",
+)
+
+# Parámetros por sentencia en lecturas masivas (SQLite antiguos admiten 999)
+MAX_VARIABLES = 500
+
+
+def _segment_hash(item_id):
+    """
+    Hash guardado con el ítem: segment_hash % n == segment_of(id, n) para
+    cualquier n, así el scan paralelo filtra el segmento en SQL.
+    """
+    return segment_of(item_id, 1 << 32)
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Una conexión por hilo (SQLite no comparte conexiones entre hilos).
+    Con journal_mode=WAL las lecturas no bloquean a la escritura ni
+    viceversa; las escrituras se serializan en el archivo y esperan hasta
+    busy_timeout si está ocupado. Las escrituras masivas van en una sola
+    transacción.
+    """
+
+    name = BACKEND_SQLITE
+
+    def __init__(self, path="corporate.db", busy_timeout=5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        try:
+            connection = self._connection()
+            for statement in SCHEMA:
+                connection.execute(statement)
+        except sqlite3.Error as e:
+            raise StorageError(f"No se pudo abrir {path}: {e}")
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # isolation_level=None: las transacciones se abren explícitamente
+            connection = sqlite3.connect(
+                self.path, timeout=self.busy_timeout, isolation_level=None,
+                check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def _execute(self, operation):
+        """
+        Ejecuta operation(conexión) traduciendo los errores de SQLite.
+        """
+        try:
+            return operation(self._connection())
+        except sqlite3.Error as e:
+            raise StorageError(str(e), type(e).__name__)
+
+    @staticmethod
+    def _transaction(connection, operation):
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = operation(connection)
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return result
+
+    def get_item(self, item_id, fields=None):
+        row = self._execute(lambda c: c.execute(
+            "SELECT item FROM corporate_data WHERE id = ?", (item_id,)).fetchone())
+        return project(codec.unpack(row[0]), fields) if row else None
+
+    def put_item(self, item, expected_version=None):
+        item = normalize(item)
+        payload = codec.pack(item)
+
+        def put(connection):
+            row = connection.execute(
+                "SELECT item FROM corporate_data WHERE id = ?",
+                (item['id'],)).fetchone()
+            if expected_version is not None and \
+                    version_of(codec.unpack(row[0]) if row else None) != expected_version:
+                raise ConditionFailed("La versión del ítem cambió.",
+                                      "ConditionalCheckFailedException")
+            connection.execute(
+                "INSERT OR REPLACE INTO corporate_data (id, segment_hash, item) "
+                "VALUES (?, ?, ?)", (item['id'], _segment_hash(item['id']), payload))
+            return row
+
+        row = self._execute(lambda c: self._transaction(c, put))
+        return codec.unpack(row[0]) if row else None
+
+    def scan(self, limit=None, start_key=None, segment=None,
+             total_segments=None, fields=None):
+        limit = limit or SCAN_PAGE_SIZE
+        query = "SELECT id, item FROM corporate_data WHERE id > ?"
+        params = [start_key['id'] if start_key else ""]
+        if total_segments:
+            query += " AND segment_hash % ? = ?"
+            params += [total_segments, segment]
+        # Una fila más que la página para saber si quedan ítems
+        query += " ORDER BY id LIMIT ?"
+        params.append(limit + 1)
+        rows = self._execute(lambda c: c.execute(query, params).fetchall())
+        items = [project(codec.unpack(item), fields) for _, item in rows[:limit]]
+        last_key = {'id': rows[limit - 1][0]} if len(rows) > limit else None
+        return items, last_key
+
+    def batch_get(self, item_ids, fields=None):
+        items = []
+        for start in range(0, len(item_ids), MAX_VARIABLES):
+            chunk = item_ids[start:start + MAX_VARIABLES]
+            query = ("SELECT item FROM corporate_data WHERE id IN (%s)"
+                     % ",".join("?" * len(chunk)))
+            rows = self._execute(lambda c: c.execute(query, chunk).fetchall())
+            items.extend(project(codec.unpack(item), fields) for (item,) in rows)
+        return items, []
+
+    def batch_put(self, items):
+        rows = []
+        for item in items:
+            item = normalize(item)
+            rows.append((item['id'], _segment_hash(item['id']), codec.pack(item)))
+        self._execute(lambda c: self._transaction(c, lambda t: t.executemany(
+            "INSERT OR REPLACE INTO corporate_data (id, segment_hash, item) "
+            "VALUES (?, ?, ?)", rows)))
+        return []
+
+    def append_log(self, records):
+        rows = [(record['id'], record.get('timestamp'), codec.pack(normalize(record)))
+                for record in records]
+        self._execute(lambda c: self._transaction(c, lambda t: t.executemany(
+            "INSERT OR REPLACE INTO corporate_log (id, timestamp, item) "
+            "VALUES (?, ?, ?)", rows)))
+
+    def log_records(self):
+        """
+        Registros de auditoría grabados, ordenados por fecha.
+        """
+        rows = self._execute(lambda c: c.execute(
+            "SELECT item FROM corporate_log ORDER BY timestamp").fetchall())
+        return [codec.unpack(item) for (item,) in rows]
+
+    def stats(self):
+        items, log_records = self._execute(lambda c: c.execute(
+            "SELECT (SELECT COUNT(*) FROM corporate_data), "
+            "(SELECT COUNT(*) FROM corporate_log)").fetchone())
+        with self._connections_lock:
+            connections = len(self._connections)
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "items": items,
+            "log_records": log_records,
+            "connections": connections,
+        }
+
+    def close(self):
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            try:
+                connection.close()
+            except sqlite3.Error:
+                pass
@@ -0,0 +1,94 @@
+# src/modules/worker_pool.py
+
+import queue
+import threading
+
+from modules.logger import get_logger
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * worker_pool.py
+# * Módulo que implementa un pool de hilos de tamaño fijo con una cola de
+# * tareas acotada (control de admisión).
+# *----------------------------------------------------------------------------
+
+log = get_logger("worker_pool")
+
+
+class WorkerPool:
+    """
+    Pool de hilos de tamaño fijo. Las tareas esperan en una cola acotada;
+    si la cola está llena, submit() rechaza la tarea inmediatamente en
+    lugar de crear más hilos.
+    """
+
+    def __init__(self, size, queue_size, name="worker"):
+        self.size = size
+        self.queue_size = queue_size
+        self._tasks = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._threads = []
+        for i in range(size):
+            thread = threading.Thread(
+                target=self._run, name=f"{name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, fn, *args):
+        """
+        Encola una tarea. Devuelve False si la cola está llena.
+        """
+        try:
+            self._tasks.put_nowait((fn, args))
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            return False
+        with self._lock:
+            self._submitted += 1
+        return True
+
+    def _run(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+            fn, args = task
+            with self._lock:
+                self._active += 1
+            try:
+                fn(*args)
+            except Exception as e:
+                log.exception("Error inesperado en el pool: %s", e)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+
+    def shutdown(self):
+        """
+        Detiene los hilos luego de que terminen las tareas ya encoladas.
+        """
+        for _ in self._threads:
+            self._tasks.put(None)
+
+    def stats(self):
+        """
+        Devuelve una instantánea de la ocupación del pool.
+        """
+        with self._lock:
+            return {
+                "workers": self.size,
+                "active": self._active,
+                "queue_depth": self._tasks.qsize(),
+                "queue_capacity": self.queue_size,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
@@ -7,6 +7,11 @@ import json
 import uuid
 import time
 import os
+import random
+import threading
+
+from modules.protocol import (CODECS, RECV_SIZE, DecimalEncoder, FramedClient,
+                              JsonStreamDecoder, ProtocolError)
 
 # *----------------------------------------------------------------------------
 # * UADER-FCyT
@@ -17,7 +22,8 @@ import os
 # * notificaciones de actualización.
 # *----------------------------------------------------------------------------
 
-VERSION = "1.0"
+VERSION = "1.1"
+RECV_TIMEOUT = 10.0  # Segundos de espera para un 'snapshot'
 
 
 def get_cpu_id():
@@ -25,101 +31,376 @@ def get_cpu_id():
     return str(uuid.getnode())
 
 
-def connect_and_listen(host, port, client_uuid, output_file, verbose):
+def build_subscription_filter(ids, prefixes, filters):
+    """
+    Arma los campos opcionales de filtro de la solicitud 'subscribe'
+    a partir de las opciones de línea de comandos.
+    filters es una lista de 'atributo=valor'; repetir un atributo acepta
+    cualquiera de sus valores.
+    """
+    subscription_filter = {}
+    if ids:
+        subscription_filter["IDS"] = [i.strip() for i in ids.split(',') if i.strip()]
+    if prefixes:
+        subscription_filter["PREFIXES"] = prefixes
+    if filters:
+        attributes = {}
+        for entry in filters:
+            attr, separator, value = entry.partition('=')
+            if not separator or not attr:
+                raise ValueError(
+                    f"Filtro inválido '{entry}'. Use el formato atributo=valor.")
+            attributes.setdefault(attr.strip(), []).append(value.strip())
+        subscription_filter["FILTER"] = attributes
+    return subscription_filter
+
+
+class NotificationSink:
+    """
+    Destino de las notificaciones: consola y/o archivo. El archivo queda
+    abierto con buffer y se vuelca cada flush_interval segundos (y al
+    cerrar) en lugar de reabrirse en cada evento.
+    fmt 'jsonl' escribe un JSON compacto por línea; 'pretty' el formato
+    indentado separado por '---'.
+    Recuerda la última secuencia recibida (last_seq) y su id (stream)
+    para pedir al reconectarse solo los eventos perdidos. Con delta
+    (DeltaState) reconstruye los ítems y agrega un evento 'snapshot'
+    cuando tuvo que resincronizar uno.
+    """
+
+    def __init__(self, output_file=None, fmt="pretty", flush_interval=1.0,
+                 quiet=False):
+        self.output_file = output_file
+        self.fmt = fmt
+        self.flush_interval = flush_interval
+        self.quiet = quiet
+        self.count = 0
+        self.last_seq = None
+        self.stream = None
+        self.delta = None
+        self._file = open(output_file, 'a', buffering=1 << 20) \
+            if output_file else None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        if self._file:
+            threading.Thread(target=self._run, name="sink-flush",
+                             daemon=True).start()
+
+    def write(self, notification):
+        if notification.get("SEQ") is not None:
+            self.last_seq = notification["SEQ"]
+        self._emit(notification)
+        if self.delta is not None:
+            snapshot = self.delta.apply(notification)
+            if snapshot is not None:
+                self._emit(snapshot)
+
+    def _emit(self, notification):
+        self.count += 1
+        if not self.quiet:
+            print("\n--- NOTIFICACIÓN RECIBIDA ---")
+            print(json.dumps(notification, indent=4, cls=DecimalEncoder))
+            print("-----------------------------")
+            print("...escuchando por más notificaciones...")
+
+        if self._file:
+            if self.fmt == "jsonl":
+                line = json.dumps(notification, cls=DecimalEncoder,
+                                  separators=(',', ':')) + "\n"
+            else:
+                line = json.dumps(notification, indent=4,
+                                  cls=DecimalEncoder) + "\n---\n"
+            with self._lock:
+                try:
+                    self._file.write(line)
+                except IOError as e:
+                    print(
+                        f"Error al escribir en {self.output_file}: {e}", file=sys.stderr)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        if not self._file:
+            return
+        with self._lock:
+            try:
+                self._file.flush()
+            except IOError as e:
+                print(
+                    f"Error al escribir en {self.output_file}: {e}", file=sys.stderr)
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+        if self._file:
+            self._file.close()
+            print(
+                f"{self.count} notificación(es) guardada(s) en {self.output_file}")
+
+
+class DeltaState:
+    """
+    Estado de los ítems de un suscriptor 'delta': cada delta se aplica
+    sobre el ítem de la versión anterior (las versiones son las
+    almacenadas, '_version', iguales en todos los workers y nodos). Si falta una versión intermedia
+    (el servidor descartó eventos de un suscriptor lento, o se reconectó
+    a otro worker) o no se conoce el ítem, en lugar de aplicarlo sobre una
+    base incompleta se pide un 'snapshot' con fetch(id), que devuelve
+    {"ID", "VERSION", "DATA"} o None si no se pudo obtener.
+    """
+
+    def __init__(self, fetch):
+        self.fetch = fetch
+        self.items = {}
+        self.versions = {}
+        self.snapshots = 0
+        # id -> versión del último snapshot: los deltas anteriores que aún
+        # estaban en camino ya están incluidos en él
+        self._resynced = {}
+
+    def apply(self, message):
+        """
+        Actualiza el estado con un evento. Devuelve el evento 'snapshot'
+        que lo reemplaza si hubo que resincronizar el ítem, o None.
+        """
+        event = message.get("EVENT")
+        if event == "update":
+            data = message.get("DATA")
+            if isinstance(data, dict):
+                self._store(data.get("id"), data, message.get("VERSION"))
+        elif event == "batch_update":
+            items = message.get("DATA") or []
+            versions = message.get("VERSIONS") or [None] * len(items)
+            for item, version in zip(items, versions):
+                if isinstance(item, dict):
+                    self._store(item.get("id"), item, version)
+        elif event == "delta":
+            item_id = message.get("ID")
+            version = message.get("VERSION")
+            known = self.versions.get(item_id)
+            resynced = self._resynced.pop(item_id, None)
+            if resynced is not None and version is not None and version <= resynced:
+                self._resynced[item_id] = resynced
+                return None
+            if known is None or version != known + 1:
+                return self._resync(item_id, known, version)
+            item = dict(self.items[item_id])
+            item.update(message.get("CHANGED") or {})
+            for field in message.get("REMOVED") or []:
+                item.pop(field, None)
+            self._store(item_id, item, version)
+        return None
+
+    def _store(self, item_id, item, version):
+        if version is None:
+            # Sin versión no se puede validar el próximo delta
+            self.items.pop(item_id, None)
+            self.versions.pop(item_id, None)
+        else:
+            self.items[item_id] = item
+            self.versions[item_id] = version
+
+    def _resync(self, item_id, known, version):
+        print(f"Delta de '{item_id}' con versión {version} (conocida: {known}): "
+              "pidiendo el ítem completo...", file=sys.stderr)
+        self.snapshots += 1
+        try:
+            snapshot = self.fetch(item_id)
+        except (socket.error, ConnectionError, ProtocolError) as e:
+            print(f"No se pudo obtener el ítem '{item_id}': {e}", file=sys.stderr)
+            snapshot = None
+        if snapshot is None:
+            self._store(item_id, None, None)  # Se reintenta con el próximo delta
+            return None
+        self._store(item_id, snapshot.get("DATA"), snapshot.get("VERSION"))
+        if snapshot.get("VERSION") is not None:
+            self._resynced[item_id] = snapshot["VERSION"]
+        return {"EVENT": "snapshot", "ID": item_id, "VERSION": snapshot.get("VERSION"),
+                "DATA": snapshot.get("DATA")}
+
+
+class Backoff:
+    """
+    Espera exponencial con jitter entre reintentos de conexión: cada
+    fallo duplica el tope (hasta maximum) y se espera un tiempo al azar
+    entre 0 y ese tope, para que muchos clientes no reconecten a la vez.
+    """
+
+    def __init__(self, base=0.5, maximum=30.0):
+        self.base = base
+        self.maximum = maximum
+        self.attempt = 0
+
+    def next_delay(self):
+        delay = random.uniform(0, min(self.maximum,
+                                      self.base * (2 ** self.attempt)))
+        self.attempt += 1
+        return delay
+
+    def reset(self):
+        self.attempt = 0
+
+
+def on_subscribed(response, sink, client_uuid):
+    """
+    Procesa la confirmación de suscripción: toma la secuencia actual del
+    servidor y avisa si se perdieron eventos que ya no se pueden repetir.
+    """
+    print(
+        f"Suscripción exitosa (UUID: {client_uuid}). Escuchando por notificaciones...")
+    if response.get("REPLAYED"):
+        print(f"Recuperando {response['REPLAYED']} notificación(es) perdida(s)...")
+    if response.get("RESYNC"):
+        print("Se perdieron notificaciones que el servidor ya no conserva: "
+              "realice un 'list' completo para resincronizar.", file=sys.stderr)
+    if sink.last_seq is None or response.get("RESYNC"):
+        sink.last_seq = response.get("SEQ")
+    if response.get("STREAM") != sink.stream:
+        # Lo necesario para retomar desde aquí en otra ejecución
+        print(f"Secuencia de eventos: {response.get('STREAM')} (SEQ {response.get('SEQ')}). "
+              f"Para retomar: --since <último SEQ> --stream {response.get('STREAM')}")
+    sink.stream = response.get("STREAM")
+
+
+def listen_legacy(host, port, subscribe_request, sink, backoff, verbose):
+    """
+    Suscripción por el protocolo legacy: la respuesta y luego las
+    notificaciones llegan como JSON concatenados, que se separan con un
+    decodificador incremental (un recv puede traer parte de un evento o
+    varios eventos). Devuelve False si el servidor rechazó la suscripción;
+    lanza ConnectionError si se pierde la conexión.
+    """
+    # --- ESTADO: Conectando ---
+    if verbose:
+        print(f"Intentando conectar a {host}:{port}...")
+    with socket.create_connection((host, port)) as sock:
+
+        # --- ESTADO: Suscribiendo ---
+        if verbose:
+            print("¡Conectado! Enviando solicitud de suscripción...")
+        sock.sendall(json.dumps(subscribe_request).encode('utf-8'))
+
+        decoder = JsonStreamDecoder()
+        is_subscribed = False
+        while True:
+            chunk = sock.recv(RECV_SIZE)
+            if not chunk:
+                # Conexión cerrada por el servidor
+                raise ConnectionError("El servidor cerró la conexión.")
+
+            for message in decoder.feed(chunk):
+                if is_subscribed:
+                    # --- Evento recibido ---
+                    sink.write(message)
+                    continue
+
+                # Confirmación de suscripción
+                if verbose:
+                    print(f"Respuesta del servidor: {message}")
+                if message.get("status") != "OK":
+                    print(
+                        f"Error en la suscripción: {message.get('message')}. Reintentando...")
+                    return False
+                on_subscribed(message, sink, subscribe_request['UUID'])
+                is_subscribed = True
+                backoff.reset()
+
+
+def listen_framed(host, port, subscribe_request, codec, sink, backoff, verbose):
+    """
+    Suscripción por el protocolo enmarcado, negociando la codificación
+    (ej. msgpack). Devuelve False si el servidor rechazó la suscripción;
+    lanza ConnectionError si se pierde la conexión.
+    """
+    if verbose:
+        print(f"Intentando conectar a {host}:{port} (modo enmarcado)...")
+    with FramedClient(host, port, codecs=[codec, "json"]) as client:
+        if verbose:
+            print(f"¡Conectado (codificación {client.codec.name})! "
+                  "Enviando solicitud de suscripción...")
+        response = client.request(subscribe_request)
+        if verbose:
+            print(f"Respuesta del servidor: {response}")
+        if response["STATUS"] != 200:
+            print(
+                f"Error en la suscripción: {response['DATA'].get('message')}. Reintentando...")
+            return False
+        on_subscribed(response["DATA"], sink, subscribe_request['UUID'])
+        backoff.reset()
+
+        while True:
+            message = client.receive()
+            if message is None:
+                raise ConnectionError("El servidor cerró la conexión.")
+            if "EVENT" in message:
+                sink.write(message)
+
+
+def fetch_snapshot(host, port, codec, client_uuid, item_id):
+    """
+    Pide por una conexión aparte el estado completo de un ítem con su
+    versión. Devuelve {"ID", "VERSION", "DATA"} o None si no existe.
+    """
+    with FramedClient(host, port, timeout=RECV_TIMEOUT,
+                      codecs=[codec or "json", "json"]) as client:
+        response = client.request({"ACTION": "snapshot", "ID": item_id,
+                                   "UUID": client_uuid})
+    return response["DATA"] if response["STATUS"] == 200 else None
+
+
+def connect_and_listen(host, port, client_uuid, sink, verbose,
+                       subscription_filter=None, mode=None, codec=None,
+                       backoff=None):
     """
     Función principal que maneja la conexión, suscripción y
     lógica de reconexión.
     """
+    backoff = backoff or Backoff()
 
     # Crear el JSON de suscripción
     subscribe_request = {
         "ACTION": "subscribe",
         "UUID": client_uuid
     }
-    request_json = json.dumps(subscribe_request)
+    subscribe_request.update(subscription_filter or {})
+    if mode:
+        subscribe_request["MODE"] = mode
+    if mode == "delta" and sink.delta is None:
+        sink.delta = DeltaState(lambda item_id: fetch_snapshot(
+            host, port, codec, client_uuid, item_id))
 
     while True:  # Bucle principal de reconexión
+        # Al reconectarse se piden solo los eventos posteriores al último
+        if sink.last_seq is not None:
+            subscribe_request["SINCE"] = sink.last_seq
+            if sink.stream is not None:
+                subscribe_request["STREAM"] = sink.stream
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-
-                # --- ESTADO: Conectando ---
-                if verbose:
-                    print(f"Intentando conectar a {host}:{port}...")
-                sock.connect((host, port))
-
-                # --- ESTADO: Suscribiendo ---
-                if verbose:
-                    print("¡Conectado! Enviando solicitud de suscripción...")
-                sock.sendall(request_json.encode('utf-8'))
-
-                # Esperar la confirmación de suscripción
-                response_raw = sock.recv(1024)
-                if not response_raw:
-                    raise ConnectionError(
-                        "El servidor cerró la conexión prematuramente.")
-
-                response = json.loads(response_raw.decode('utf-8'))
-                if verbose:
-                    print(f"Respuesta del servidor: {response}")
-
-                if response.get("status") == "OK":
-                    print(
-                        f"Suscripción exitosa (UUID: {client_uuid}). Escuchando por notificaciones...")
-                else:
-                    print(
-                        f"Error en la suscripción: {response.get('message')}. Reintentando...")
-                    time.sleep(10)  # Espera antes de reintentar
-                    continue
+            if codec:
+                listen_framed(host, port, subscribe_request, codec,
+                              sink, backoff, verbose)
+            else:
+                listen_legacy(host, port, subscribe_request,
+                              sink, backoff, verbose)
+            time.sleep(backoff.next_delay())  # Suscripción rechazada
 
-                # --- ESTADO: Suscripto/Activo ---
-                # Bucle de escucha de notificaciones
-                while True:
-                    notification_raw = sock.recv(4096)
-                    if not notification_raw:
-                        # Conexión cerrada por el servidor
-                        raise ConnectionError("El servidor cerró la conexión.")
-
-                    # --- Evento recibido ---
-                    notification_str = notification_raw.decode('utf-8')
-                    print("\n--- NOTIFICACIÓN RECIBIDA ---")
-
-                    try:
-                        parsed_json = json.loads(notification_str)
-                        print(json.dumps(parsed_json, indent=4))
-
-                        # Guardar en archivo si se especificó
-                        if output_file:
-                            try:
-                                # 'a' (append) para no sobrescribir
-                                with open(output_file, 'a') as f:
-                                    f.write(json.dumps(
-                                        parsed_json, indent=4) + "\n---\n")
-                                print(
-                                    f"Notificación guardada en {output_file}")
-                            except IOError as e:
-                                print(
-                                    f"Error al escribir en {output_file}: {e}", file=sys.stderr)
-
-                    except json.JSONDecodeError:
-                        print(notification_str)  # Imprimir raw si no es JSON
-
-                    print("-----------------------------")
-                    print("...escuchando por más notificaciones...")
-
-        except (socket.error, ConnectionError, ConnectionResetError) as e:
+        except (socket.error, ConnectionError, ConnectionResetError, ProtocolError) as e:
             # --- ESTADO: Reintentando ---
             print(f"\nError de conexión: {e}", file=sys.stderr)
             print(f"Diagrama de Estado: (Socket cerrado/ error E/S) -> 'Reintentando'")
-            retry_delay = 30  # 30 segundos según consigna
+            sink.flush()
+            retry_delay = backoff.next_delay()
             print(
-                f"Se perdió la conexión con el servidor. Reintentando en {retry_delay} segundos...")
+                f"Se perdió la conexión con el servidor. Reintentando en {retry_delay:.1f} segundos...")
             time.sleep(retry_delay)
         except KeyboardInterrupt:
             print("\nCerrando cliente observador...")
             break
         except Exception as e:
             print(f"Error inesperado: {e}", file=sys.stderr)
-            time.sleep(10)  # Espera antes de reintentar
+            time.sleep(backoff.next_delay())
 
 
 def main():
@@ -133,16 +414,71 @@ def main():
         '-o', '--output', help='(Opcional) Archivo para guardar notificaciones.')
     parser.add_argument('-v', '--verbose', action='store_true',
                         help='Activar modo verboso')
+    parser.add_argument('--ids',
+                        help='(Opcional) Solo notificar estos ids, separados por coma.')
+    parser.add_argument('--prefix', action='append', dest='prefixes',
+                        help='(Opcional) Solo notificar ids con este prefijo (se puede repetir).')
+    parser.add_argument('--filter', action='append', dest='filters',
+                        help="(Opcional) Solo notificar ítems con atributo=valor, "
+                        "ej. --filter sede=FCyT-Central (se puede repetir).")
+    parser.add_argument('--delta', action='store_true',
+                        help='(Opcional) Recibir solo los campos modificados de cada ítem.')
+    parser.add_argument('--codec', choices=sorted(CODECS),
+                        help='(Opcional) Usar el protocolo enmarcado negociando esta '
+                        'codificación (msgpack: binaria y más compacta).')
+    parser.add_argument('--since', type=int,
+                        help='(Opcional) Recibir primero los eventos posteriores a esta secuencia '
+                        '(requiere --stream).')
+    parser.add_argument('--stream',
+                        help='(Opcional) Id de la secuencia de --since, informado al suscribirse.')
+    parser.add_argument('--format', choices=['pretty', 'jsonl'], default='pretty',
+                        help='Formato del archivo de salida: indentado o un JSON por línea '
+                        '(default: pretty)')
+    parser.add_argument('--flush-interval', type=float, default=1.0,
+                        help='Segundos entre volcados del archivo de salida (default: 1.0)')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='No mostrar cada notificación en consola (útil con -o)')
+    parser.add_argument('--retry-base', type=float, default=0.5,
+                        help='Espera inicial entre reconexiones, en segundos (default: 0.5)')
+    parser.add_argument('--retry-max', type=float, default=30.0,
+                        help='Espera máxima entre reconexiones, en segundos (default: 30)')
 
     args = parser.parse_args()
+    # Una secuencia solo tiene sentido en su registro: sin STREAM el
+    # servidor no puede repetir los eventos y pide resincronizar
+    if (args.since is None) != (args.stream is None):
+        parser.error("--since y --stream se usan juntos")
+
+    try:
+        subscription_filter = build_subscription_filter(
+            args.ids, args.prefixes, args.filters)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
 
     client_uuid = get_cpu_id()
 
     if args.verbose:
         print(f"Iniciando ObserverClient para UUID: {client_uuid}")
+        if subscription_filter:
+            print(f"Filtro de suscripción: {subscription_filter}")
+
+    try:
+        sink = NotificationSink(args.output, args.format,
+                                args.flush_interval, args.quiet)
+    except IOError as e:
+        print(f"Error al abrir {args.output}: {e}", file=sys.stderr)
+        sys.exit(1)
+    sink.last_seq = args.since
+    sink.stream = args.stream
 
-    connect_and_listen(args.server, args.port, client_uuid,
-                       args.output, args.verbose)
+    try:
+        connect_and_listen(args.server, args.port, client_uuid,
+                           sink, args.verbose, subscription_filter,
+                           "delta" if args.delta else None, args.codec,
+                           Backoff(args.retry_base, args.retry_max))
+    finally:
+        sink.close()
 
 
 if __name__ == "__main__":
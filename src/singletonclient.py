@@ -7,15 +7,22 @@ import json
 import uuid
 import os
 
+from modules.protocol import CODECS, DecimalEncoder, FramedClient
+
 # *----------------------------------------------------------------------------
 # * UADER-FCyT
 # * Ingeniería de Software II
 # *
 # * singletonclient.py
 # * Cliente para el servidor. Envía solicitudes 'get', 'set' o 'list'.
+# * Soporta el modo legacy (una solicitud por conexión) y el modo
+# * enmarcado (varias solicitudes por una conexión persistente).
 # *----------------------------------------------------------------------------
 
-VERSION = "1.0"
+VERSION = "1.1"
+
+# Acciones de lectura que aceptan 'FIELDS' (proyección de atributos)
+READ_ACTIONS = ("get", "mget", "list", "query")
 
 
 def get_cpu_id():
@@ -23,6 +30,121 @@ def get_cpu_id():
     return str(uuid.getnode())
 
 
+def send_legacy(host, port, request, verbose):
+    """
+    Modo legacy: abre una conexión, envía UNA solicitud y lee la
+    respuesta hasta que el servidor cierra el socket.
+    """
+    request_json = json.dumps(request)
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        if verbose:
+            print("Intentando conectar...")
+
+        sock.connect((host, port))
+
+        if verbose:
+            print(f"¡Conectado! Enviando: {request_json}")
+
+        sock.sendall(request_json.encode('utf-8'))
+
+        if verbose:
+            print("Esperando respuesta...")
+
+        buffer = b""
+        while True:
+            data_chunk = sock.recv(1024)
+            if not data_chunk:
+                break
+            buffer += data_chunk
+
+    return buffer.decode('utf-8')
+
+
+def send_framed(host, port, requests, verbose, codecs=None):
+    """
+    Modo enmarcado: envía todas las solicitudes por una única conexión
+    persistente (pipelining) y devuelve las respuestas como texto JSON.
+    Con una sola solicitud devuelve solo sus datos, igual que el modo legacy.
+    codecs (opcional) son las codificaciones a negociar con el servidor.
+    """
+    if verbose:
+        print("Intentando conectar (modo enmarcado)...")
+
+    with FramedClient(host, port, codecs=codecs) as client:
+        if verbose:
+            print(f"¡Conectado (codificación {client.codec.name})! "
+                  f"Enviando {len(requests)} solicitud(es)...")
+        responses = client.pipeline(requests)
+
+    ordered = [responses[key] for key in sorted(responses)]
+    if verbose:
+        for response in ordered:
+            print(
+                f"Respuesta REQID {response['REQID']} (Status: {response['STATUS']})")
+
+    if len(ordered) == 1:
+        return json.dumps(ordered[0]["DATA"], cls=DecimalEncoder)
+    return json.dumps(ordered, cls=DecimalEncoder)
+
+
+def list_all_pages(host, port, request, page_size, framed, verbose,
+                   codecs=None):
+    """
+    Recorre todas las páginas de una solicitud 'list' o 'query' siguiendo el cursor
+    devuelto por el servidor y devuelve la lista completa como texto JSON.
+    En modo enmarcado todas las páginas usan la misma conexión.
+    """
+    request = dict(request)
+    request.setdefault("LIMIT", page_size)
+    items = []
+    client = FramedClient(host, port, codecs=codecs) if framed else None
+    try:
+        while True:
+            if client:
+                page = client.request(request)["DATA"]
+            else:
+                page = json.loads(send_legacy(host, port, request, verbose))
+
+            if not isinstance(page, dict) or "ITEMS" not in page:
+                # Error del servidor: se devuelve tal cual
+                return json.dumps(page, cls=DecimalEncoder)
+
+            items.extend(page["ITEMS"])
+            if verbose:
+                print(
+                    f"Página recibida: {len(page['ITEMS'])} ítem(s), total {len(items)}")
+
+            cursor = page.get("NEXT_CURSOR")
+            if not cursor:
+                return json.dumps(items, cls=DecimalEncoder)
+            request["CURSOR"] = cursor
+    finally:
+        if client:
+            client.close()
+
+
+def list_streamed(host, port, request, segments, verbose, codecs=None):
+    """
+    Listado completo transmitido en partes por una conexión enmarcada
+    (con escaneo paralelo si segments > 1). Une las páginas a medida que
+    llegan y devuelve la lista completa como texto JSON.
+    """
+    request = dict(request)
+    if segments:
+        request["SEGMENTS"] = segments
+    items = []
+    with FramedClient(host, port, codecs=codecs) as client:
+        for response in client.stream(request):
+            data = response["DATA"]
+            if response["STATUS"] not in (200, 206):
+                return json.dumps(data, cls=DecimalEncoder)
+            items.extend(data.get("ITEMS", []))
+            if verbose and response.get("MORE"):
+                print(
+                    f"Parte recibida: {len(data['ITEMS'])} ítem(s), total {len(items)}")
+    return json.dumps(items, cls=DecimalEncoder)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description=f"SingletonClient (versión {VERSION})")
@@ -36,8 +158,31 @@ def main():
                         help='Puerto TCP del servidor (default: 8080)')
     parser.add_argument('-v', '--verbose', action='store_true',
                         help='Activar modo verboso')
+    parser.add_argument('-f', '--framed', action='store_true',
+                        help='Usar el protocolo enmarcado con conexión persistente '
+                        '(permite enviar una lista de solicitudes en el archivo)')
+    parser.add_argument('-a', '--all-pages', action='store_true',
+                        help="En solicitudes 'list' y 'query', seguir el cursor hasta obtener todas las páginas")
+    parser.add_argument('--page-size', type=int, default=100,
+                        help="Ítems por página con --all-pages (default: 100)")
+    parser.add_argument('--stream', action='store_true',
+                        help="En solicitudes 'list', recibir el listado completo en partes "
+                        "a medida que se escanea (usa el protocolo enmarcado)")
+    parser.add_argument('--segments', type=int,
+                        help="Segmentos del escaneo paralelo para 'list' completo")
+    parser.add_argument('--fields',
+                        help="Atributos a devolver en lecturas (get, mget, list, query), "
+                        "separados por comas; el 'id' se incluye siempre")
+    parser.add_argument('--codec', choices=sorted(CODECS),
+                        help="Codificación a negociar en el protocolo enmarcado "
+                        "(msgpack: binaria, con Decimal nativo; si el servidor no la "
+                        "soporta se usa JSON). Implica --framed.")
 
     args = parser.parse_args()
+    # El escaneo paralelo recorre la tabla completa: el servidor no lo pagina
+    if args.segments and args.all_pages and not args.stream:
+        parser.error("--segments no se puede combinar con --all-pages (use --stream "
+                     "para recibir el listado paralelo en partes)")
 
     if args.verbose:
         print(f"Modo verboso activado. Conectando a {args.server}:{args.port}")
@@ -56,39 +201,47 @@ def main():
         sys.exit(1)
 
     # --- 3. Asegurar el UUID del cliente ---
-    if "UUID" not in request_data:
-        client_uuid = get_cpu_id()
-        request_data["UUID"] = client_uuid
-        if args.verbose:
-            print(f"Agregando UUID de esta CPU: {client_uuid}")
-
-    request_json = json.dumps(request_data)
-
-    # --- 4. Conectar al servidor y enviar datos ---
-    response_data = ""
-    try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+    # El archivo puede contener una solicitud o una lista de solicitudes
+    requests = request_data if isinstance(
+        request_data, list) else [request_data]
+    client_uuid = get_cpu_id()
+    fields = [field.strip() for field in args.fields.split(',') if field.strip()] \
+        if args.fields else None
+    for request in requests:
+        if "UUID" not in request:
+            request["UUID"] = client_uuid
             if args.verbose:
-                print(f"Intentando conectar...")
+                print(f"Agregando UUID de esta CPU: {client_uuid}")
+        if fields and request.get("ACTION") in READ_ACTIONS:
+            request.setdefault("FIELDS", fields)
 
-            sock.connect((args.server, args.port))
-
-            if args.verbose:
-                print(f"¡Conectado! Enviando: {request_json}")
-
-            sock.sendall(request_json.encode('utf-8'))
-
-            if args.verbose:
-                print("Esperando respuesta...")
-
-            buffer = b""
-            while True:
-                data_chunk = sock.recv(1024)
-                if not data_chunk:
-                    break
-                buffer += data_chunk
+    # --- 4. Conectar al servidor y enviar datos ---
+    codecs = [args.codec, "json"] if args.codec else None
+    if codecs:
+        args.framed = True
+    is_list = len(requests) == 1 and requests[0].get("ACTION") == "list"
+    if args.segments and is_list and not args.stream:
+        requests[0]["SEGMENTS"] = args.segments
 
-            response_data = buffer.decode('utf-8')
+    try:
+        if args.stream and is_list:
+            response_data = list_streamed(
+                args.server, args.port, requests[0], args.segments, args.verbose, codecs)
+        elif args.all_pages and len(requests) == 1 and \
+                requests[0].get("ACTION") in ("list", "query"):
+            response_data = list_all_pages(
+                args.server, args.port, requests[0], args.page_size, args.framed, args.verbose,
+                codecs)
+        elif args.framed:
+            response_data = send_framed(
+                args.server, args.port, requests, args.verbose, codecs)
+        else:
+            responses = [send_legacy(args.server, args.port, request, args.verbose)
+                         for request in requests]
+            if len(responses) == 1:
+                response_data = responses[0]
+            else:
+                response_data = "[" + ",".join(responses) + "]"
 
     except socket.error as e:
         print(
@@ -1,17 +1,32 @@
 # src/singletonproxyobserver.py
 
+import os
+import signal
 import socket
 import sys
 import argparse
-import json
+import queue
 import uuid
-from decimal import Decimal
-import threading  # Para manejar múltiples clientes
+import threading
+import time
+from concurrent.futures import wait as wait_futures
 
 # Importamos nuestros módulos
-from modules.db_singleton import DatabaseSingleton
-from modules.data_proxy import DataProxy
-from modules.observer import Subject
+from modules.storage import (StorageError, create_backend, BACKENDS, BACKEND_DYNAMODB,
+                             VERSION_FIELD, version_of)
+from modules.data_proxy import DataProxy, DEFAULT_CACHE_TTL, parse_fields
+from modules.observer import Subject, SubscriptionFilter, MODE_FULL, NOTIFICATION_MODES
+from modules.async_server import AsyncServer
+from modules.protocol import (ClientConnection, DecimalEncoder, DEFERRED, ProtocolError,
+                              SERVER_BUSY)
+from modules.worker_pool import WorkerPool
+from modules.connection_monitor import ConnectionMonitor
+from modules.metrics import REGISTRY, MetricsHTTPServer
+from modules.ipc_bus import BusClient
+from modules.prefork import Supervisor, per_worker_path
+from modules.federation import PeerRelay, parse_peers
+from modules import logger
+from modules.logger import get_logger, payload
 
 # *----------------------------------------------------------------------------
 # * UADER-FCyT
@@ -21,16 +36,22 @@ from modules.observer import Subject
 # * Servidor principal que implementa los patrones Singleton, Proxy y Observer.
 # *----------------------------------------------------------------------------
 
-VERSION = "1.0 (Final)"
+VERSION = "1.1"
 
-# Clase auxiliar para convertir Decimal a string en JSON
+# Acciones con métricas propias (las demás se cuentan como "other")
+ACTIONS = ("get", "set", "snapshot", "mget", "mset", "list", "query", "subscribe", "stats")
 
+# Hilos que envían las respuestas de los 'set' combinados, y tiempo máximo
+# que esperan a un cliente que no lee antes de cortar su conexión
+REPLY_WRITERS = 4
+REPLY_SEND_TIMEOUT = 5.0
 
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return str(obj)
-        return super(DecimalEncoder, self).default(obj)
+log = get_logger("server")
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "request_seconds", "Duración de la ejecución de una solicitud", ("action",))
+REQUESTS = REGISTRY.counter(
+    "requests_total", "Solicitudes atendidas por acción y estado", ("action", "status"))
 
 
 class Server:
@@ -39,167 +60,577 @@ class Server:
     Gestiona las conexiones TCP y orquesta los componentes.
     """
 
-    def __init__(self, host, port):
+    def __init__(self, host, port, workers=32, backlog=128, queue_size=256,
+                 stats_interval=0, cache_size=1024, cache_ttl=DEFAULT_CACHE_TTL,
+                 write_state_size=100000, write_coalesce=0, query_index=None, scan_segments=1, scan_workers=8, audit_options=None,
+                 mset_notify="item", subject_options=None, db_options=None,
+                 storage=BACKEND_DYNAMODB, storage_options=None, metrics_port=None,
+                 reuse_port=False, bus_path=None, worker_id=None, peer_options=None):
         self.host = host
         self.port = port
+        self.workers = workers
+        self.backlog = backlog
+        self.queue_size = queue_size
+        self.stats_interval = stats_interval
+        self.mset_notify = mset_notify
+        self.reuse_port = reuse_port
+        self.worker_id = worker_id
+        self.bus = None
+        self.peers = None
+        # Conexión -> Futures de sus 'set' combinados sin confirmar
+        self._deferred = {}
+        self._deferred_lock = threading.Lock()
+        # (conexión, respuesta) de los 'set' combinados, para los escritores
+        self._replies = queue.Queue()
         self.server_socket = None
-
-        print("Inicializando componentes del servidor...")
-        self.db_singleton = DatabaseSingleton()
-        self.data_proxy = DataProxy()
-        self.subject = Subject()  # Inicializa el Sujeto (Observer)
-        print("--- Servidor listo para escuchar ---")
-
-    def handle_client_connection(self, conn, addr):
+        self.pool = None
+        self.engine = None  # AsyncServer, en el motor asyncio
+        self.monitor = None
+        self.metrics_server = None
+
+        log.info("Inicializando componentes del servidor...")
+        storage_options = dict(storage_options or {})
+        if storage == BACKEND_DYNAMODB:
+            storage_options["db_options"] = db_options
+        try:
+            backend = create_backend(storage, **storage_options)
+        except StorageError as e:
+            log.error("Error al inicializar el almacenamiento '%s': %s", storage, e.message)
+            logger.shutdown()
+            sys.exit(1)
+        log.info("Almacenamiento: %s", storage)
+        self.data_proxy = DataProxy(cache_size=cache_size, cache_ttl=cache_ttl,
+                                    scan_segments=scan_segments, scan_workers=scan_workers,
+                                    storage=backend, write_state_size=write_state_size,
+                                    write_coalesce=write_coalesce, query_index=query_index, **(audit_options or {}))
+        if write_coalesce > 0:
+            for i in range(REPLY_WRITERS):
+                threading.Thread(target=self._reply_loop, name=f"reply-writer-{i}",
+                                 daemon=True).start()
+        # Inicializa el Sujeto (Observer)
+        self.subject = Subject(**(subject_options or {}))
+        if bus_path:
+            # Modo multiproceso: las escrituras de los demás workers llegan por el bus
+            self.bus = BusClient(bus_path, self._on_bus_message, self._on_bus_closed)
+        if peer_options:
+            # Federación: los eventos de otros nodos llegan por el puerto de pares
+            self.peers = PeerRelay(host=host, on_event=self._on_peer_event,
+                                   reuse_port=reuse_port, **peer_options)
+            self.peers.start()
+        # Los stats() de los componentes se exportan como gauges
+        REGISTRY.add_source("server", self.stats)
+        if metrics_port is not None:
+            self.metrics_server = MetricsHTTPServer(host, metrics_port)
+            self.metrics_server.start()
+        log.info("--- Servidor listo para escuchar ---")
+
+    def process_request(self, data, connection):
         """
-        Maneja CADA conexión de cliente en su propio hilo.
-        Implementa el diagrama de flujo principal y el de estados.
+        Ejecuta UNA solicitud ya decodificada y devuelve
+        (response_data, status_code, is_subscribe).
+        Es independiente del transporte: la usan el modo legacy y el enmarcado.
+        Registra la duración y el estado de la solicitud por acción.
+        Si response_data es DEFERRED la respuesta se envía más tarde por la
+        conexión (ver _defer_set) y el llamador no debe responder.
         """
-        print(
-            f"Manejando nueva conexión de {addr} en el hilo {threading.current_thread().name}")
-        request_data = b""
-        client_uuid = "UUID_DESCONOCIDO"
-        is_subscriber = False  # Bandera para este hilo
+        start = time.perf_counter()
+        result = self._execute_action(data, connection)
+        if result[0] is DEFERRED:
+            return result  # Se mide al completarse
+        action = data.get("ACTION") if isinstance(data, dict) else None
+        if action not in ACTIONS:
+            action = "other"
+        REQUEST_SECONDS.labels(action).observe(time.perf_counter() - start)
+        REQUESTS.labels(action, str(result[1])).inc()
+        return result
+
+    def _execute_action(self, data, connection):
+        if not isinstance(data, dict):
+            return {"error": "Invalid JSON",
+                    "message": "La solicitud debe ser un objeto JSON."}, 400, False
+
+        # Bifurcación basada en ACTION
+        action = data.get("ACTION")
+        client_uuid = data.get("UUID", "UUID_DESCONOCIDO")
+        session_id = str(uuid.uuid4())
+        if action != "set" or VERSION_FIELD in data:
+            # Lo que sigue a un 'set' combinado de la conexión ve su
+            # escritura; un 'set' con versión no se combina y se ordena
+            # detrás de los combinados pendientes
+            self._wait_deferred(connection)
+
+        response_data = {}
+        status_code = 200
+        is_subscribe = False
+
+        if action == "get":
+            item_id = data.get("ID")
+            if item_id:
+                response_data, status_code = self.data_proxy.get_item(
+                    item_id, client_uuid, session_id, fields=data.get("FIELDS"))
+            else:
+                response_data, status_code = {
+                    "error": "Missing ID", "message": "La acción 'get' requiere un 'ID'."}, 400
+
+        elif action == "set":
+            if "id" in data:
+                # Los campos de control del protocolo no forman parte del ítem
+                item_data = {key: value for key, value in data.items()
+                             if key != "REQID"}
+                future = self.data_proxy.submit_set_item(item_data, client_uuid, session_id)
+                if connection.framed and not future.done():
+                    # Escritura combinada: se responde al confirmarse y el
+                    # hilo sigue con las demás solicitudes de la conexión
+                    self._defer_set(connection, future, data.get("REQID"))
+                    return DEFERRED, None, False
+                response_data, status_code = self._after_set(*future.result())
+            else:
+                response_data, status_code = {
+                    "error": "Missing ID", "message": "La acción 'set' requiere un 'id' en el objeto."}, 400
 
-        try:
-            # 1. Recibir la solicitud inicial
-            while True:
-                chunk = conn.recv(1024)
-                if not chunk:
-                    break
-                request_data += chunk
-                # Suponemos que un JSON de solicitud no será fragmentado
-                # (Para robustez, se necesitaría un protocolo de fin de mensaje)
-                break
-
-            if not request_data:
-                print(f"Cliente {addr} desconectado sin enviar datos.")
-                return
+        elif action == "snapshot":
+            # Estado completo de un ítem con su versión (para resincronizar
+            # a un suscriptor 'delta')
+            item_id = data.get("ID")
+            if item_id and not isinstance(item_id, str):
+                response_data, status_code = {
+                    "error": "Invalid ID", "message": "'ID' debe ser un texto no vacío."}, 400
+            elif item_id:
+                item, status_code = self.data_proxy.get_item(
+                    item_id, client_uuid, session_id)
+                response_data = {"ID": item_id, "VERSION": version_of(item),
+                                 "DATA": item} if status_code == 200 else item
+            else:
+                response_data, status_code = {
+                    "error": "Missing ID", "message": "La acción 'snapshot' requiere un 'ID'."}, 400
+
+        elif action == "mget":
+            response_data, status_code = self.data_proxy.get_items(
+                data.get("IDS"), client_uuid, session_id, fields=data.get("FIELDS"))
+
+        elif action == "mset":
+            response_data, status_code = self.data_proxy.set_items(
+                data.get("ITEMS"), client_uuid, session_id)
+            # --- LÓGICA OBSERVER ---
+            written = response_data.get("ITEMS") if status_code in (200, 207) else None
+            if written:
+                log.debug("Acción 'mset' exitosa (%d ítems). Notificando a suscriptores...",
+                          len(written))
+                self._notify_mset(written)
+                self._publish("mset", written)
+
+        elif action == "list":
+            if data.get("STREAM") and connection.framed and "LIMIT" not in data and "CURSOR" not in data:
+                response_data, status_code = self.stream_list(
+                    data, connection, client_uuid, session_id)
+            else:
+                response_data, status_code = self.data_proxy.list_items(
+                    client_uuid, session_id, limit=data.get("LIMIT"), cursor=data.get("CURSOR"),
+                    segments=data.get("SEGMENTS"), fields=data.get("FIELDS"))
 
-            print(f"Datos recibidos de {addr}: {request_data.decode('utf-8')}")
+        elif action == "query":
+            response_data, status_code = self.data_proxy.query_items(
+                data.get("WHERE"), client_uuid, session_id, fields=data.get("FIELDS"),
+                limit=data.get("LIMIT"), cursor=data.get("CURSOR"))
 
-            # 2. Validar y Decodificar (Parsear JSON)
+        elif action == "subscribe":
+            # --- LÓGICA OBSERVER ---
             try:
-                data = json.loads(request_data.decode('utf-8'))
-            except json.JSONDecodeError:
-                response = {"error": "Invalid JSON",
-                            "message": "La solicitud no es un JSON válido."}
-                conn.sendall(json.dumps(response).encode('utf-8'))
-                return
+                subscription_filter = SubscriptionFilter.from_request(data)
+            except ValueError as e:
+                return {"error": "Invalid Filter", "message": str(e)}, 400, False
+            mode = data.get("MODE", MODE_FULL)
+            if mode not in NOTIFICATION_MODES:
+                return {"error": "Invalid Mode",
+                        "message": f"'MODE' debe ser uno de {list(NOTIFICATION_MODES)}."}, 400, False
+            since = data.get("SINCE")
+            if since is not None and (not isinstance(since, int) or isinstance(since, bool) or since < 0):
+                return {"error": "Invalid SINCE",
+                        "message": "'SINCE' debe ser un número de secuencia entero no negativo."}, 400, False
+            stream = data.get("STREAM")
+            if stream is not None and not isinstance(stream, str):
+                return {"error": "Invalid STREAM",
+                        "message": "'STREAM' debe ser el id de secuencia recibido al suscribirse."}, 400, False
+            self.data_proxy._log_action(
+                client_uuid, session_id, "subscribe")
+            replay = self.subject.subscribe(
+                connection, client_uuid, subscription_filter, mode, since, stream)
+            is_subscribe = True
+            # SEQ: última secuencia publicada y STREAM su id (el cliente los
+            # devuelve como SINCE/STREAM al reconectarse); REPLAYED: eventos
+            # repetidos a continuación; RESYNC: los eventos perdidos ya no
+            # están en el buffer, o la secuencia es la de otro worker o nodo,
+            # y el cliente debe hacer un 'list' completo.
+            response_data = {"status": "OK",
+                             "message": f"Cliente {client_uuid} suscripto.",
+                             "SEQ": replay["SEQ"],
+                             "STREAM": replay["STREAM"],
+                             "REPLAYED": replay["REPLAYED"],
+                             "RESYNC": replay["RESYNC"]}
+            status_code = 200
 
-            # 3. Bifurcación basada en ACTION
-            action = data.get("ACTION")
-            client_uuid = data.get("UUID", client_uuid)
-            session_id = str(uuid.uuid4())
+        elif action == "stats":
+            # Métricas del servidor: contadores, latencias y estado de los componentes
+            response_data = REGISTRY.snapshot()
 
-            response_data = {}
-            status_code = 200
+        else:
+            response_data, status_code = {
+                "error": "Unknown Action", "message": f"Acción '{action}' no reconocida."}, 400
 
-            if action == "get":
-                item_id = data.get("ID")
-                if item_id:
-                    response_data, status_code = self.data_proxy.get_item(
-                        item_id, client_uuid, session_id)
-                else:
-                    response_data, status_code = {
-                        "error": "Missing ID", "message": "La acción 'get' requiere un 'ID'."}, 400
-
-            elif action == "set":
-                if "id" in data:
-                    response_data, status_code = self.data_proxy.set_item(
-                        data, client_uuid, session_id)
-                    # --- LÓGICA OBSERVER ---
-                    if status_code == 200:
-                        print("Acción 'set' exitosa. Notificando a suscriptores...")
-                        self.subject.notify(response_data, DecimalEncoder)
-                else:
-                    response_data, status_code = {
-                        "error": "Missing ID", "message": "La acción 'set' requiere un 'id' en el objeto."}, 400
-
-            elif action == "list":
-                response_data, status_code = self.data_proxy.list_items(
-                    client_uuid, session_id)
-
-            elif action == "subscribe":
-                # --- LÓGICA OBSERVER ---
-                self.data_proxy._log_action(
-                    client_uuid, session_id, "subscribe")
-                self.subject.subscribe(conn, client_uuid)
-                is_subscriber = True
-                response_data = {"status": "OK",
-                                 "message": f"Cliente {client_uuid} suscripto."}
-                status_code = 200
+        return response_data, status_code, is_subscribe
 
-            else:
-                response_data, status_code = {
-                    "error": "Unknown Action", "message": f"Acción '{action}' no reconocida."}, 400
-
-            # 4. Enviar respuesta al cliente
-            response_json = json.dumps(
-                response_data, cls=DecimalEncoder, indent=4)
-            print(f"Enviando respuesta a {addr} (Status: {status_code})")
-            conn.sendall(response_json.encode('utf-8'))
-
-            # 5. Lógica de conexión
-            if is_subscriber:
-                # Si es suscriptor, mantenemos la conexión abierta
-                print(
-                    f"Cliente {addr} (UUID: {client_uuid}) ahora es un suscriptor. Hilo en espera.")
-                # Entramos en un bucle para detectar desconexión
-                while True:
-                    data = conn.recv(1024)
-                    if not data:
-                        # El cliente cerró la conexión
-                        print(
-                            f"Suscriptor {addr} (UUID: {client_uuid}) se ha desconectado.")
-                        break
+    def stream_list(self, data, connection, client_uuid, session_id):
+        """
+        Listado completo transmitido en partes (solo modo enmarcado): cada
+        página del escaneo (paralelo si se pide 'SEGMENTS') se envía apenas
+        llega como respuesta parcial (206, "MORE"). Devuelve la respuesta
+        final con el total de ítems enviados.
+        """
+        request_id = data.get("REQID")
+        try:
+            fields = parse_fields(data.get("FIELDS"))
+        except ValueError:
+            return {"error": "Invalid Fields", "message": "'FIELDS' debe ser una lista de atributos."}, 400
+        total = 0
+        try:
+            for page in self.data_proxy.iter_items(client_uuid, session_id, data.get("SEGMENTS"),
+                                                   fields):
+                if page:
+                    connection.send_response(
+                        {"ITEMS": page}, 206, request_id, more=True)
+                    total += len(page)
+                    # No leer la próxima página hasta que el cliente reciba esta
+                    connection.drain()
+        except ValueError as e:
+            return {"error": "Invalid Segments", "message": str(e)}, 400
+        except StorageError as e:
+            return {"error": "DB Error", "message": e.message}, 500
+        return {"ITEMS": [], "COUNT": total}, 200
+
+    def _after_set(self, response_data, status_code, previous, changed):
+        # --- LÓGICA OBSERVER ---
+        # Una escritura que no cambia el ítem no se notifica
+        if status_code == 200 and changed:
+            log.debug("Acción 'set' exitosa. Notificando a suscriptores...")
+            self._notify_set(response_data, previous)
+            self._publish("set", response_data, previous)
+        return response_data, status_code
+
+    def _defer_set(self, connection, future, request_id):
+        """
+        Responde un 'set' combinado cuando se confirma su escritura, con el
+        REQID de la solicitud. El hilo del combinador solo arma la respuesta:
+        la envían los escritores de respuestas (_reply_loop), para que un
+        cliente que no lee no detenga las escrituras.
+        """
+        start = time.perf_counter()
+        with self._deferred_lock:
+            self._deferred.setdefault(connection, set()).add(future)
+
+        def done(future):
+            response_data, status_code = self._after_set(*future.result())
+            with self._deferred_lock:
+                pending = self._deferred.get(connection)
+                if pending is not None:
+                    pending.discard(future)
+                    if not pending:
+                        del self._deferred[connection]
+            REQUEST_SECONDS.labels("set").observe(time.perf_counter() - start)
+            REQUESTS.labels("set", str(status_code)).inc()
+            self._replies.put((connection, connection.encode_response(
+                response_data, status_code, request_id)))
+
+        future.add_done_callback(done)
+
+    def _reply_loop(self):
+        """
+        Hilo escritor de las respuestas de los 'set' combinados.
+        """
+        while True:
+            connection, data = self._replies.get()
+            try:
+                connection.send_within(data, REPLY_SEND_TIMEOUT)
+            except (OSError, ConnectionError) as e:
+                log.info("No se pudo responder un 'set' combinado a %s: %s", connection.addr, e)
+
+    def _wait_deferred(self, connection):
+        with self._deferred_lock:
+            pending = list(self._deferred.get(connection, ()))
+        if pending:
+            wait_futures(pending)
+
+    def _notify_set(self, item, previous):
+        self.subject.notify(item, DecimalEncoder, previous=previous)
+
+    def _notify_mset(self, items):
+        if self.mset_notify == "batch":
+            self.subject.notify_batch(items)
+        else:
+            for item in items:
+                self.subject.notify(item, DecimalEncoder)
+
+    def _publish(self, event, data, previous=None):
+        """
+        Difunde una escritura atendida por este proceso a los demás workers
+        (modo multiproceso) y a los nodos pares (federación).
+        """
+        if self.bus:
+            self.bus.publish({"EVENT": event, "DATA": data, "PREVIOUS": previous})
+        if self.peers:
+            self.peers.publish(event, data, previous)
+
+    def _on_peer_event(self, message):
+        """
+        Escritura de otro nodo: se aplica como las de otro worker y, en modo
+        multiproceso, se pasa a los demás workers de este nodo.
+        """
+        self._on_bus_message(message)
+        if self.bus:
+            self.bus.publish({"EVENT": message.get("EVENT"), "DATA": message.get("DATA"),
+                              "PREVIOUS": message.get("PREVIOUS")})
+
+    def _on_bus_message(self, message):
+        """
+        Escritura atendida por otro worker (u otro nodo): se descarta lo
+        cacheado de esos ítems y se notifica a los suscriptores conectados
+        a este proceso.
+        """
+        event = message.get("EVENT")
+        if event == "set":
+            item = message["DATA"]
+            self.data_proxy.apply_remote_writes([item])
+            self._notify_set(item, message.get("PREVIOUS"))
+        elif event == "mset":
+            items = message["DATA"]
+            self.data_proxy.apply_remote_writes(items)
+            self._notify_mset(items)
+        else:
+            log.warning("Mensaje desconocido en el bus: %s", event)
+
+    def _on_bus_closed(self):
+        # Sin el maestro no hay fan-out entre procesos ni reinicios: el worker
+        # se detiene como si el maestro lo terminara
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    def handle_client_connection(self, connection):
+        """
+        Atiende una conexión que tiene datos para leer (en un hilo del pool).
+        Implementa el diagrama de flujo principal y el de estados.
+
+        En modo legacy se atiende una única solicitud (salvo 'subscribe').
+        En modo enmarcado la conexión es persistente y cada respuesta lleva
+        el REQID de su solicitud. Cuando no quedan solicitudes completas la
+        conexión vuelve al monitor, liberando el hilo.
+        """
+        addr = connection.addr
+        keep_open = True
+
+        try:
+            # 1. Recibir los datos disponibles
+            if not connection.fill():
+                if connection.is_subscriber:
+                    log.info("Suscriptor %s se ha desconectado.", addr)
+                elif connection.framed is None:
+                    log.debug("Cliente %s desconectado sin enviar datos.", addr)
+                keep_open = False
+
+            while keep_open and connection.has_request():
+                # 2. Decodificar la próxima solicitud
+                try:
+                    data = connection.next_request()
+                except ValueError:
+                    connection.send_response(connection.invalid_request(), 400)
+                    keep_open = connection.framed
+                    continue
+
+                if not connection.framed and connection.is_subscriber:
+                    # Un suscriptor legacy solo mantiene la conexión abierta:
+                    # cualquier dato adicional se ignora.
+                    continue
+
+                log.debug("Datos recibidos de %s: %s", addr, payload(data))
+                request_id = data.get("REQID") if isinstance(
+                    data, dict) else None
+
+                # 3. Ejecutar la acción
+                response_data, status_code, is_subscribe = self.process_request(
+                    data, connection)
+                if response_data is DEFERRED:
+                    continue  # La respuesta se envía al completarse
+                if is_subscribe:
+                    connection.is_subscriber = True
+
+                # 4. Enviar respuesta al cliente
+                log.debug("Enviando respuesta a %s (Status: %s)", addr, status_code)
+                connection.send_response(
+                    response_data, status_code, request_id)
+                if is_subscribe:
+                    # Recién ahora pueden salir las notificaciones
+                    self.subject.release(connection)
+
+                # 5. Lógica de conexión
+                if not connection.framed and not connection.is_subscriber:
+                    # Cliente legacy: una solicitud por conexión
+                    keep_open = False
+                elif is_subscribe and not connection.framed:
+                    log.info("Cliente %s ahora es un suscriptor.", addr)
 
         except (socket.error, ConnectionResetError) as e:
-            print(f"Error de Socket con el cliente {addr}: {e}")
+            log.info("Error de Socket con el cliente %s: %s", addr, e)
+            keep_open = False
+        except ProtocolError as e:
+            log.warning("Error de protocolo con el cliente %s: %s", addr, e)
+            keep_open = False
         except Exception as e:
-            print(
-                f"Error inesperado procesando la solicitud de {addr}: {e}", file=sys.stderr)
+            log.exception("Error inesperado procesando la solicitud de %s: %s", addr, e)
+            keep_open = False
         finally:
-            # 6. Cerrar/Limpiar conexión
-            if is_subscriber:
-                self.subject.unsubscribe(conn)
-            print(f"Cerrando conexión y finalizando hilo para {addr}.")
-            conn.close()
+            if keep_open:
+                # Esperar la próxima solicitud sin ocupar un hilo del pool
+                self.monitor.park(connection)
+            else:
+                # 6. Cerrar/Limpiar conexión
+                self.close_connection(connection)
+
+    def close_connection(self, connection):
+        if connection.is_subscriber:
+            self.subject.unsubscribe(connection)
+        log.debug("Cerrando conexión con %s.", connection.addr)
+        connection.close()
+
+    def dispatch(self, connection):
+        """
+        Entrega al pool una conexión con datos. Devuelve False si la cola
+        de solicitudes pendientes está llena.
+        """
+        return self.pool.submit(self.handle_client_connection, connection)
+
+    def reject_busy(self, connection):
+        """
+        Control de admisión: con la cola llena se responde "busy" de
+        inmediato (desde el hilo del monitor) en lugar de encolar. El
+        monitor atiende a todas las conexiones en espera, por lo que no
+        puede bloquearse en un cliente que no lee: si la respuesta no entra
+        en el buffer de envío, la conexión se cierra.
+        """
+        try:
+            if not connection.fill():
+                self.close_connection(connection)
+                return
+            rejected = 0
+            while connection.has_request():
+                try:
+                    data = connection.next_request()
+                except ValueError:
+                    data = None
+                request_id = data.get("REQID") if isinstance(
+                    data, dict) else None
+                if not connection.framed and connection.is_subscriber:
+                    continue
+                if not connection.send_nowait(connection.encode_response(
+                        SERVER_BUSY, 503, request_id)):
+                    log.warning("Servidor saturado y el cliente %s no lee sus respuestas. "
+                                "Cerrando la conexión.", connection.addr)
+                    self.close_connection(connection)
+                    return
+                rejected += 1
+            log.warning("Servidor saturado: %d solicitud(es) de %s rechazada(s). Pool: %s",
+                        rejected, connection.addr, self.pool.stats())
+            if connection.framed or connection.is_subscriber or not rejected:
+                self.monitor.park(connection)
+            else:
+                self.close_connection(connection)
+        except (socket.error, ProtocolError):
+            self.close_connection(connection)
+
+    def stats(self):
+        """
+        Métricas del servidor: caché de lectura, auditoría, fan-out a
+        suscriptores, uso del almacenamiento (conexión a DynamoDB, ítems de
+        los motores locales) y la ocupación del motor de red: en el de
+        hilos el pool, la profundidad de la cola de pendientes, rechazos y
+        conexiones en espera; en asyncio las solicitudes en curso y rechazos.
+        """
+        stats = {"cache": self.data_proxy.cache_stats(),
+                 "write_state": self.data_proxy.write_stats(),
+                 "query_index": self.data_proxy.index_stats(),
+                 "audit": self.data_proxy.audit_stats(),
+                 "observers": self.subject.stats(),
+                 "storage": self.data_proxy.storage_stats()}
+        if self.pool is not None:
+            stats.update(self.pool.stats())
+            stats["parked_connections"] = self.monitor.parked_count()
+        if self.engine is not None:
+            stats.update(self.engine.stats())
+        if self.bus is not None:
+            stats["process"] = {"worker_id": self.worker_id, "pid": os.getpid()}
+            stats["bus"] = self.bus.stats()
+        if self.peers is not None:
+            stats["federation"] = self.peers.stats()
+        return stats
+
+    def _report_stats(self, interval):
+        while True:
+            time.sleep(interval)
+            log.info("ESTADÍSTICAS: %s", self.stats())
 
     def start(self):
         """
         Inicia el bucle principal del servidor para escuchar conexiones.
-        Lanza un nuevo hilo por cada cliente.
+        Cada conexión queda a cargo del monitor y sus solicitudes se atienden
+        en un pool de hilos de tamaño fijo con una cola acotada.
         """
+        self.pool = WorkerPool(self.workers, self.queue_size)
+        self.monitor = ConnectionMonitor(self.dispatch, self.reject_busy)
+        if self.stats_interval:
+            threading.Thread(target=self._report_stats, args=(
+                self.stats_interval,), daemon=True).start()
+
         try:
             self.server_socket = socket.socket(
                 socket.AF_INET, socket.SOCK_STREAM)
             self.server_socket.setsockopt(
                 socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self.reuse_port:
+                # Varios procesos escuchan en el mismo puerto y el kernel
+                # reparte las conexiones entrantes
+                self.server_socket.setsockopt(
+                    socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
             self.server_socket.bind((self.host, self.port))
-            self.server_socket.listen(5)
-            print(
-                f"Servidor versión {VERSION} escuchando en {self.host}:{self.port}")
+            self.server_socket.listen(self.backlog)
+            log.info("Servidor versión %s escuchando en %s:%s (workers: %d, cola: %d, backlog: %d)",
+                     VERSION, self.host, self.port, self.workers, self.queue_size, self.backlog)
 
             while True:
                 conn, addr = self.server_socket.accept()
-
-                # Lanzar un nuevo hilo para manejar este cliente
-                client_thread = threading.Thread(
-                    target=self.handle_client_connection,
-                    args=(conn, addr)
-                )
-                client_thread.daemon = True  # Permite cerrar el servidor con Ctrl+C
-                client_thread.start()
+                log.debug("Nueva conexión de %s", addr)
+                # La conexión espera sus datos en el monitor, sin ocupar un hilo
+                self.monitor.park(ClientConnection(conn, addr))
 
         except socket.error as e:
-            print(f"Error de Socket: {e}", file=sys.stderr)
+            log.error("Error de Socket: %s", e)
         except KeyboardInterrupt:
-            print("\nCerrando el servidor... (Ctrl+C presionado)")
+            log.info("Cerrando el servidor... (Ctrl+C presionado)")
         finally:
             if self.server_socket:
                 self.server_socket.close()
-            print("Servidor detenido.")
+            self.pool.shutdown()
+            self.shutdown()
+            log.info("Servidor detenido.")
+
+    def shutdown(self):
+        """
+        Libera los componentes compartidos por ambos motores de red
+        (graba la auditoría pendiente y cierra el registro de eventos).
+        """
+        if self.bus:
+            self.bus.close()
+        if self.peers:
+            self.peers.close()
+        self.data_proxy.close()
+        self.subject.close()
+        if self.metrics_server:
+            self.metrics_server.close()
 
 
 # --- Punto de entrada del programa ---
@@ -208,10 +639,201 @@ if __name__ == "__main__":
         description="Servidor SingletonProxyObserver TPFI")
     parser.add_argument('-p', '--port', type=int, default=8080,
                         help='Puerto TCP (default: 8080)')
+    parser.add_argument('-e', '--engine', choices=['threads', 'asyncio'], default='threads',
+                        help='Motor de red: un hilo por conexión o event loop asyncio (default: threads)')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='Procesos del servidor que comparten el puerto (SO_REUSEPORT); '
+                        'un proceso maestro los reinicia si terminan y reparte los eventos '
+                        'entre ellos. Con --metrics-port, el worker N usa ese puerto + N (default: 1)')
+    parser.add_argument('--peers', type=parse_peers, default=[],
+                        help='(Opcional) Nodos pares "host:puerto_pares,..." a los que se '
+                        'reenvían las escrituras para sus suscriptores. Cada nodo lista a '
+                        'todos los demás')
+    parser.add_argument('--peer-port', type=int,
+                        help='Puerto donde se reciben los eventos de los pares (activa la '
+                        'federación; default: puerto + 1000 si se indicó --peers)')
+    parser.add_argument('--node-id',
+                        help='Nombre del nodo en la federación y en el id de la secuencia de eventos (default: host:puerto)')
+    parser.add_argument('--peer-queue', type=int, default=10000,
+                        help='Eventos pendientes por par mientras está desconectado (default: 10000)')
+    parser.add_argument('--worker-id', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--ipc-bus', help=argparse.SUPPRESS)
+    parser.add_argument('-w', '--workers', type=int, default=32,
+                        help='Hilos de trabajo (pool en modo threads, executor en modo asyncio) (default: 32)')
+    parser.add_argument('-b', '--backlog', type=int,
+                        help='Backlog de listen() para conexiones pendientes de aceptar '
+                        '(default: 128 en modo threads, 4096 en modo asyncio)')
+    parser.add_argument('-q', '--queue-size', type=int, default=256,
+                        help='Máximo de conexiones (threads) o solicitudes (asyncio) esperando '
+                        'un hilo; al superarlo se responde "busy" (default: 256)')
+    parser.add_argument('--stats-interval', type=float, default=0,
+                        help='Segundos entre reportes de estadísticas (0 = desactivado)')
+    parser.add_argument('--cache-size', type=int, default=1024,
+                        help='Ítems en la caché de lectura de CorporateData (0 = sin caché) (default: 1024)')
+    parser.add_argument('--cache-ttl', type=float, default=DEFAULT_CACHE_TTL,
+                        help='Segundos de validez de un ítem cacheado (0 = sin vencimiento) '
+                        '(default: %(default)g)')
+    parser.add_argument('--write-state-size', type=int, default=100000,
+                        help='Ids cuyo resumen de contenido y versión se recuerdan para no '
+                        'reescribir ítems sin cambios (default: 100000)')
+    parser.add_argument('--write-coalesce', type=float, default=0,
+                        help="Segundos durante los que se combinan los 'set' de un mismo id en "
+                        "una sola escritura y notificación; la respuesta llega al confirmarse "
+                        "(0 = desactivado) (default: 0)")
+    parser.add_argument('--query-index', type=lambda text: [a for a in text.split(',') if a],
+                        help="(Opcional) Atributos del índice secundario en memoria de 'query', "
+                        "ej. CUIT,provincia,localidad,sede. Se carga recorriendo la tabla al "
+                        "iniciar (default: sin índice; se usa un GSI o un scan filtrado)")
+    parser.add_argument('--mset-notify', choices=['item', 'batch'], default='item',
+                        help="Notificación de 'mset': un evento 'update' por ítem o un "
+                        "único evento 'batch_update' (default: item)")
+    parser.add_argument('--subscriber-queue', type=int, default=1000,
+                        help='Notificaciones pendientes por suscriptor (default: 1000)')
+    parser.add_argument('--slow-consumer', choices=['drop_oldest', 'disconnect', 'coalesce'],
+                        default='drop_oldest',
+                        help='Qué hacer cuando la cola de un suscriptor se llena (default: drop_oldest)')
+    parser.add_argument('--fanout-workers', type=int, default=4,
+                        help='Hilos que envían las notificaciones a los suscriptores (default: 4)')
+    parser.add_argument('--subscriber-send-timeout', type=float, default=5.0,
+                        help='Segundos máximos de un envío a un suscriptor antes de desconectarlo (default: 5)')
+    parser.add_argument('--storage', choices=BACKENDS, default=BACKEND_DYNAMODB,
+                        help='Motor de almacenamiento: DynamoDB, memoria (sin persistencia) '
+                        'o archivo SQLite local (default: dynamodb)')
+    parser.add_argument('--sqlite-path', default='corporate.db',
+                        help='Archivo de la base SQLite con --storage sqlite (default: corporate.db)')
+    parser.add_argument('--memory-stripes', type=int, default=16,
+                        help='Franjas con candado propio del motor en memoria (default: 16)')
+    parser.add_argument('--metrics-port', type=int,
+                        help='(Opcional) Puerto HTTP donde exponer las métricas en formato '
+                        'Prometheus (GET /metrics)')
+    parser.add_argument('--db-clients', choices=['thread', 'shared'], default='thread',
+                        help='Clientes de DynamoDB: uno por hilo o uno compartido (default: thread)')
+    parser.add_argument('--db-max-pool', type=int, default=50,
+                        help='Conexiones HTTP máximas por cliente de DynamoDB (default: 50)')
+    parser.add_argument('--db-connect-timeout', type=float, default=2.0,
+                        help='Timeout de conexión a DynamoDB, en segundos (default: 2)')
+    parser.add_argument('--db-read-timeout', type=float, default=10.0,
+                        help='Timeout de lectura de DynamoDB, en segundos (default: 10)')
+    parser.add_argument('--db-max-attempts', type=int, default=5,
+                        help='Intentos por llamada a DynamoDB, con reintentos adaptativos (default: 5)')
+    parser.add_argument('--replay-buffer', type=int, default=10000,
+                        help="Eventos recientes conservados para repetir a observadores que "
+                        "se reconectan con 'SINCE' (default: 10000)")
+    parser.add_argument('--replay-file',
+                        help='(Opcional) Archivo local donde se agregan los eventos, para '
+                        'conservar la secuencia y la repetición entre reinicios')
+    parser.add_argument('--audit-queue-size', type=int, default=10000,
+                        help='Registros de auditoría en espera de ser escritos (default: 10000)')
+    parser.add_argument('--audit-flush-interval', type=float, default=1.0,
+                        help='Segundos máximos antes de escribir un lote de auditoría (default: 1.0)')
+    parser.add_argument('--audit-overflow', choices=['block', 'drop', 'spill'], default='block',
+                        help='Qué hacer con la cola de auditoría llena: esperar, descartar '
+                        'o volcar a archivo (default: block)')
+    parser.add_argument('--audit-spill-file', default='audit_spill.jsonl',
+                        help='Archivo local para la política spill y los lotes fallidos '
+                        '(default: audit_spill.jsonl)')
+    parser.add_argument('--scan-segments', type=int, default=1,
+                        help="Segmentos del escaneo paralelo para 'list' completo (default: 1 = secuencial)")
+    parser.add_argument('--scan-workers', type=int, default=8,
+                        help='Hilos para recorrer segmentos en paralelo (default: 8)')
+    parser.add_argument('--log-level', choices=logger.LEVELS, default='INFO',
+                        help='Nivel mínimo de los registros; DEBUG agrega líneas por '
+                        'solicitud (default: INFO)')
+    parser.add_argument('--log-format', choices=logger.FORMATS, default='text',
+                        help='Formato de los registros: texto o una línea JSON por registro (default: text)')
+    parser.add_argument('--log-file',
+                        help='(Opcional) Archivo de registros en lugar de stdout')
+    parser.add_argument('--log-sample', type=float, default=1.0,
+                        help='Fracción de las líneas DEBUG que se escriben (default: 1.0)')
+    parser.add_argument('--log-payloads', action='store_true',
+                        help='Incluir el contenido de solicitudes e ítems en los registros '
+                        'y en el detalle de la auditoría')
     args = parser.parse_args()
+    if args.processes > 1 and args.worker_id is None:
+        if not hasattr(socket, "SO_REUSEPORT") or not hasattr(socket, "AF_UNIX"):
+            parser.error("--processes requiere SO_REUSEPORT y sockets Unix (Linux/BSD).")
+        if args.storage == "memory":
+            parser.error("El motor en memoria no se comparte entre procesos: "
+                         "use --storage sqlite o dynamodb con --processes.")
+
+    logger.configure(level=args.log_level, fmt=args.log_format, path=args.log_file,
+                     debug_sample=args.log_sample, payloads=args.log_payloads)
 
     HOST = '0.0.0.0'  # Escucha en todas las interfaces
     PORT = args.port
 
-    server = Server(HOST, PORT)
-    server.start()
+    if args.processes > 1 and args.worker_id is None:
+        # Proceso maestro: cada worker es este mismo programa con su id
+        def worker_command(worker_id, bus_path):
+            return [sys.executable, os.path.abspath(__file__)] + sys.argv[1:] + \
+                ['--worker-id', str(worker_id), '--ipc-bus', bus_path]
+        Supervisor(worker_command, args.processes).run()
+        logger.shutdown()
+        sys.exit(0)
+
+    if args.worker_id is not None:
+        # El maestro detiene a los workers con SIGTERM
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        if args.metrics_port is not None:
+            args.metrics_port += args.worker_id
+        args.replay_file = per_worker_path(args.replay_file, args.worker_id)
+        args.audit_spill_file = per_worker_path(args.audit_spill_file, args.worker_id)
+
+    # Id del nodo (y worker): origen de la federación y prefijo de la
+    # secuencia de eventos ('STREAM') que reciben los suscriptores
+    node_id = args.node_id or f"{socket.gethostname()}:{PORT}"
+    if args.worker_id is not None:
+        node_id = f"{node_id}#{args.worker_id}"
+    peer_options = None
+    if args.peers or args.peer_port is not None:
+        peer_options = {
+            "node_id": node_id,
+            "peers": args.peers,
+            "port": args.peer_port if args.peer_port is not None else PORT + 1000,
+            "max_pending": args.peer_queue,
+        }
+
+    server = Server(HOST, PORT, workers=args.workers, backlog=args.backlog or 128,
+                    queue_size=args.queue_size, stats_interval=args.stats_interval,
+                    cache_size=args.cache_size, cache_ttl=args.cache_ttl,
+                    write_state_size=args.write_state_size,
+                    write_coalesce=args.write_coalesce,
+                    query_index=args.query_index,
+                    scan_segments=args.scan_segments, scan_workers=args.scan_workers,
+                    audit_options={
+                        "audit_queue_size": args.audit_queue_size,
+                        "audit_flush_interval": args.audit_flush_interval,
+                        "audit_overflow": args.audit_overflow,
+                        "audit_spill_path": args.audit_spill_file,
+                    },
+                    mset_notify=args.mset_notify,
+                    subject_options={
+                        "max_queue": args.subscriber_queue,
+                        "policy": args.slow_consumer,
+                        "send_timeout": args.subscriber_send_timeout,
+                        "fanout_workers": args.fanout_workers,
+                        "replay_capacity": args.replay_buffer,
+                        "replay_path": args.replay_file,
+                        "replay_name": node_id,
+                    },
+                    db_options={
+                        "clients": args.db_clients,
+                        "max_pool_connections": args.db_max_pool,
+                        "connect_timeout": args.db_connect_timeout,
+                        "read_timeout": args.db_read_timeout,
+                        "max_attempts": args.db_max_attempts,
+                    },
+                    storage=args.storage,
+                    storage_options={
+                        "sqlite": {"path": args.sqlite_path},
+                        "memory": {"stripes": args.memory_stripes},
+                    }.get(args.storage),
+                    metrics_port=args.metrics_port,
+                    reuse_port=args.worker_id is not None,
+                    bus_path=args.ipc_bus, worker_id=args.worker_id,
+                    peer_options=peer_options)
+    if args.engine == 'asyncio':
+        AsyncServer(server, max_workers=args.workers,
+                    backlog=args.backlog or 4096, queue_size=args.queue_size).start()
+    else:
+        server.start()
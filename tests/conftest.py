@@ -0,0 +1,90 @@
+# tests/conftest.py
+
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * conftest.py
+# * Fixtures compartidas por las pruebas: un DataProxy y un servidor
+# * completo sobre el motor en memoria (sin AWS).
+# *----------------------------------------------------------------------------
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+from modules.data_proxy import DataProxy  # noqa: E402
+from modules.storage import BACKEND_MEMORY, create_backend  # noqa: E402
+from modules.async_server import AsyncServer  # noqa: E402
+from singletonproxyobserver import Server  # noqa: E402
+
+
+@pytest.fixture
+def proxy(tmp_path):
+    """
+    DataProxy sobre un MemoryBackend vacío.
+    """
+    data_proxy = DataProxy(storage=create_backend(BACKEND_MEMORY),
+                           audit_spill_path=str(tmp_path / "audit_spill.jsonl"))
+    yield data_proxy
+    data_proxy.close()
+
+
+@pytest.fixture
+def start_server(tmp_path):
+    """
+    Arranca servidores en un puerto libre con storage en memoria y los
+    detiene al terminar la prueba. engine elige el motor de red ('threads'
+    o 'asyncio', con engine_options para AsyncServer). Devuelve
+    (server, puerto).
+    """
+    stoppers = []
+
+    def start(engine="threads", engine_options=None, **options):
+        options.setdefault("audit_options",
+                           {"audit_spill_path": str(tmp_path / "audit_spill.jsonl")})
+        server = Server("127.0.0.1", 0, storage=BACKEND_MEMORY, **options)
+        if engine == "asyncio":
+            async_server = AsyncServer(server, **(engine_options or {}))
+            threading.Thread(target=async_server.start, daemon=True).start()
+            port = wait_for(lambda: async_server.port)
+            stoppers.append(async_server.stop)
+            return server, port
+        threading.Thread(target=server.start, daemon=True).start()
+        port = wait_for(lambda: server.server_socket is not None
+                        and server.server_socket.getsockname()[1])
+        stoppers.append(lambda: stop_threads(server))
+        return server, port
+
+    yield start
+    for stop in stoppers:
+        stop()
+
+
+def stop_threads(server):
+    try:
+        # Despierta al accept() para que start() libere los componentes
+        server.server_socket.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+def wait_for(condition, timeout=5):
+    """
+    Espera a que condition() devuelva un valor verdadero y lo devuelve.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        value = condition()
+        if value:
+            return value
+        time.sleep(0.01)
+    raise AssertionError("La condición no se cumplió a tiempo.")
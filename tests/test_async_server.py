@@ -0,0 +1,105 @@
+# tests/test_async_server.py
+
+import json
+import socket
+import threading
+import time
+
+from modules.protocol import FrameDecoder, FramedClient, PREAMBLE, encode_json_frame
+from tests.conftest import wait_for
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_async_server.py
+# * Pruebas del motor asyncio: solicitudes legacy y enmarcadas, control
+# * de admisión del executor y contrapresión del listado transmitido.
+# *----------------------------------------------------------------------------
+
+
+def test_framed_and_legacy_requests(start_server):
+    _, port = start_server(engine="asyncio")
+    with FramedClient("127.0.0.1", port) as client:
+        responses = client.pipeline([{"ACTION": "set", "id": "A", "n": 1},
+                                     {"ACTION": "get", "ID": "A"}])
+        assert [responses[k]["STATUS"] for k in sorted(responses)] == [200, 200]
+
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(json.dumps({"ACTION": "get", "ID": "A"}).encode())
+        buffer = b""
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            buffer += chunk
+    assert json.loads(buffer)["n"] == 1
+
+
+def test_full_executor_answers_busy(start_server):
+    server, port = start_server(engine="asyncio",
+                                engine_options={"max_workers": 1, "queue_size": 0})
+    release = threading.Event()
+    get_item = server.data_proxy.get_item
+
+    def slow_get(*args, **kwargs):
+        release.wait(5)
+        return get_item(*args, **kwargs)
+
+    server.data_proxy.get_item = slow_get
+    with FramedClient("127.0.0.1", port) as blocked, \
+            FramedClient("127.0.0.1", port) as other:
+        blocked.send({"ACTION": "get", "ID": "X"})
+        wait_for(lambda: server.engine.stats()["inflight"] == 1)
+
+        busy = other.request({"ACTION": "get", "ID": "X"})
+        assert busy["STATUS"] == 503
+        assert busy["DATA"]["error"] == "Server Busy"
+
+        release.set()
+        assert blocked.receive()["STATUS"] == 404
+        assert other.request({"ACTION": "get", "ID": "X"})["STATUS"] == 404
+    stats = server.stats()
+    assert stats["rejected"] == 1 and stats["inflight"] == 0
+
+
+def test_streamed_list_waits_for_a_slow_reader(start_server):
+    server, port = start_server(engine="asyncio")
+    total = 20000
+    for i in range(total):
+        server.data_proxy.storage.put_item({"id": f"I{i:05d}", "pad": "x" * 1000})
+
+    pages = []
+    iter_items = server.data_proxy.iter_items
+
+    def counting_iter(*args, **kwargs):
+        for page in iter_items(*args, **kwargs):
+            pages.append(len(page))
+            yield page
+
+    server.data_proxy.iter_items = counting_iter
+
+    # Socket con buffer de recepción chico para que el cliente se retrase
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        sock.settimeout(10)
+        sock.connect(("127.0.0.1", port))
+        sock.sendall(PREAMBLE + encode_json_frame(
+            {"ACTION": "list", "STREAM": True, "REQID": 1}))
+
+        time.sleep(1)  # El cliente todavía no lee
+        assert len(pages) < total // 1000 // 2
+
+        decoder = FrameDecoder()
+        received, final = 0, None
+        while final is None:
+            chunk = sock.recv(65536)
+            assert chunk, "El servidor cerró la conexión."
+            for payload in decoder.feed(chunk):
+                message = json.loads(payload)
+                if message.get("MORE"):
+                    received += len(message["DATA"]["ITEMS"])
+                else:
+                    final = message
+    assert received == total
+    assert final["DATA"]["COUNT"] == total
@@ -0,0 +1,126 @@
+# tests/test_audit.py
+
+import json
+import threading
+
+from modules.audit import AuditLogWriter, OVERFLOW_BLOCK, OVERFLOW_DROP, OVERFLOW_SPILL
+from modules.data_proxy import DataProxy
+from modules.storage import BACKEND_MEMORY, StorageError, create_backend
+from tests.conftest import wait_for
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_audit.py
+# * Pruebas del escritor asíncrono de auditoría (lotes y políticas de
+# * desborde) y de la auditoría de las escrituras combinadas.
+# *----------------------------------------------------------------------------
+
+
+class FakeLogStorage:
+    """
+    Almacenamiento de auditoría que registra los lotes; con hold, cada
+    escritura espera hasta que se active release.
+    """
+
+    def __init__(self, hold=False, fail=False):
+        self.batches = []
+        self.hold = hold
+        self.fail = fail
+        self.release = threading.Event()
+        self.writing = threading.Event()
+
+    def append_log(self, batch):
+        self.writing.set()
+        if self.hold:
+            self.release.wait(5)
+        if self.fail:
+            raise StorageError("tabla no disponible")
+        self.batches.append(list(batch))
+
+
+def spilled(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def stalled_writer(tmp_path, overflow):
+    """
+    Escritor con cola de 1 lugar y el hilo trabado en la primera escritura.
+    """
+    storage = FakeLogStorage(hold=True)
+    writer = AuditLogWriter(storage, queue_size=1, flush_interval=0.01, overflow=overflow,
+                            spill_path=str(tmp_path / "spill.jsonl"))
+    writer.record({"n": 0})
+    assert storage.writing.wait(5)
+    writer.record({"n": 1})  # Ocupa el único lugar de la cola
+    return storage, writer
+
+
+def test_records_are_written_in_batches(tmp_path):
+    storage = FakeLogStorage()
+    writer = AuditLogWriter(storage, flush_interval=0.2,
+                            spill_path=str(tmp_path / "spill.jsonl"))
+    for n in range(30):
+        writer.record({"n": n})
+    writer.flush()
+    assert [len(batch) for batch in storage.batches] == [25, 5]
+    assert [r["n"] for batch in storage.batches for r in batch] == list(range(30))
+    writer.close()
+    assert writer.stats()["written"] == 30
+
+
+def test_full_queue_drops_records(tmp_path):
+    storage, writer = stalled_writer(tmp_path, OVERFLOW_DROP)
+    writer.record({"n": 2})
+    assert writer.stats()["dropped"] == 1
+    storage.release.set()
+    writer.close()
+    assert [r["n"] for batch in storage.batches for r in batch] == [0, 1]
+
+
+def test_full_queue_spills_records(tmp_path):
+    storage, writer = stalled_writer(tmp_path, OVERFLOW_SPILL)
+    writer.record({"n": 2})
+    assert spilled(writer.spill_path) == [{"n": 2}]
+    storage.release.set()
+    writer.close()
+    assert writer.stats()["spilled"] == 1
+
+
+def test_full_queue_blocks_until_there_is_room(tmp_path):
+    storage, writer = stalled_writer(tmp_path, OVERFLOW_BLOCK)
+    blocked = threading.Thread(target=writer.record, args=({"n": 2},))
+    blocked.start()
+    blocked.join(0.2)
+    assert blocked.is_alive()
+    storage.release.set()
+    blocked.join(5)
+    writer.close()
+    assert [r["n"] for batch in storage.batches for r in batch] == [0, 1, 2]
+
+
+def test_failed_batches_and_late_records_are_spilled(tmp_path):
+    writer = AuditLogWriter(FakeLogStorage(fail=True), flush_interval=0.01,
+                            spill_path=str(tmp_path / "spill.jsonl"))
+    writer.record({"n": 0})
+    wait_for(lambda: writer.stats()["failed"] == 1)
+    writer.close()
+    writer.record({"n": 1})  # Después del cierre
+    assert spilled(writer.spill_path) == [{"n": 0}, {"n": 1}]
+
+
+def test_every_coalesced_request_is_audited(tmp_path):
+    backend = create_backend(BACKEND_MEMORY)
+    proxy = DataProxy(storage=backend, write_coalesce=0.1, audit_flush_interval=0.01,
+                      audit_spill_path=str(tmp_path / "spill.jsonl"))
+    futures = [proxy.submit_set_item({"id": "A", "n": n}, f"CPU-{n}", f"S-{n}")
+               for n in range(3)]
+    assert [future.result(5)[1] for future in futures] == [200] * 3
+    proxy.close()
+
+    records = [r for r in backend.log_records() if r["action"] == "set"]
+    assert [(r["CPUid"], r["sessionid"]) for r in records] == \
+        [("CPU-0", "S-0"), ("CPU-1", "S-1"), ("CPU-2", "S-2")]
+    assert "3 solicitudes combinadas" in records[-1]["details"]
@@ -0,0 +1,133 @@
+# tests/test_bulk.py
+
+import pytest
+
+from modules import data_proxy as data_proxy_module
+from modules.data_proxy import DataProxy
+from modules.protocol import FramedClient
+from modules.storage_memory import MemoryBackend
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_bulk.py
+# * Pruebas de las acciones masivas 'mget' y 'mset': bloques del tamaño del
+# * motor, reintento de lo no procesado y notificación a los suscriptores.
+# *----------------------------------------------------------------------------
+
+
+class ThrottledBackend(MemoryBackend):
+    """
+    Motor con lotes de 2 ítems que deja sin procesar el último de cada
+    lote las primeras veces indicadas (como UnprocessedKeys/Items).
+    """
+
+    batch_get_limit = 2
+    batch_write_limit = 2
+
+    def __init__(self, throttled_gets=0, throttled_puts=0):
+        super().__init__()
+        self.throttled_gets = throttled_gets
+        self.throttled_puts = throttled_puts
+        self.get_batches = []
+        self.put_batches = []
+
+    def batch_get(self, item_ids, fields=None):
+        self.get_batches.append(list(item_ids))
+        if self.throttled_gets:
+            self.throttled_gets -= 1
+            items, _ = super().batch_get(item_ids[:-1], fields)
+            return items, item_ids[-1:]
+        return super().batch_get(item_ids, fields)
+
+    def batch_put(self, items):
+        self.put_batches.append([item["id"] for item in items])
+        if self.throttled_puts:
+            self.throttled_puts -= 1
+            super().batch_put(items[:-1])
+            return items[-1:]
+        return super().batch_put(items)
+
+
+@pytest.fixture
+def throttled(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_proxy_module, "BATCH_BACKOFF_BASE", 0)
+    created = []
+
+    def make(**options):
+        backend = ThrottledBackend(**options)
+        proxy = DataProxy(storage=backend, audit_spill_path=str(tmp_path / "spill.jsonl"))
+        created.append(proxy)
+        return backend, proxy
+
+    yield make
+    for proxy in created:
+        proxy.close()
+
+
+def test_mset_and_mget(proxy):
+    response, status = proxy.set_items([{"id": "B", "n": 1}, {"id": "C", "n": 2}], "u", "s")
+    assert status == 200
+    assert [item["_version"] for item in response["ITEMS"]] == [1, 1]
+
+    response, status = proxy.get_items(["C", "B", "Z", "C"], "u", "s")
+    assert status == 200
+    assert [item["id"] for item in response["ITEMS"]] == ["C", "B"]
+    assert response["MISSING"] == ["Z"]
+
+    # mset de un ítem existente avanza su versión; uno repetido gana el último
+    response, _ = proxy.set_items([{"id": "B", "n": 4}, {"id": "B", "n": 5}], "u", "s")
+    assert [(item["n"], item["_version"]) for item in response["ITEMS"]] == [(5, 2)]
+
+
+def test_invalid_bulk_requests_are_rejected(proxy):
+    for items in (None, [], [{"n": 1}], [{"id": ["A"]}], "A"):
+        assert proxy.set_items(items, "u", "s")[1] == 400
+    for ids in (None, [], [""], "A"):
+        assert proxy.get_items(ids, "u", "s")[1] == 400
+
+
+def test_bulk_calls_are_chunked_and_unprocessed_are_retried(throttled):
+    backend, proxy = throttled(throttled_puts=1)
+    ids = [f"I{i}" for i in range(5)]
+    response, status = proxy.set_items([{"id": i, "n": 1} for i in ids], "u", "s")
+    assert status == 200
+    assert [item["id"] for item in response["ITEMS"]] == ids
+    # Lotes de a 2; el ítem no procesado del primero se reintenta solo
+    assert backend.put_batches == [["I0", "I1"], ["I1"], ["I2", "I3"], ["I4"]]
+
+    backend.throttled_gets = 1
+    proxy.cache.clear()
+    response, status = proxy.get_items(ids, "u", "s")
+    assert status == 200
+    assert [item["id"] for item in response["ITEMS"]] == ids
+    assert backend.get_batches[-4:] == [["I0", "I1"], ["I1"], ["I2", "I3"], ["I4"]]
+
+
+def test_items_still_unprocessed_are_reported(throttled, monkeypatch):
+    monkeypatch.setattr(data_proxy_module, "BATCH_MAX_RETRIES", 1)
+    backend, proxy = throttled(throttled_puts=10)
+    response, status = proxy.set_items([{"id": "A", "n": 1}, {"id": "B", "n": 1}], "u", "s")
+    assert status == 207
+    assert [item["id"] for item in response["ITEMS"]] == ["A"]
+    assert response["UNPROCESSED"] == ["B"]
+    assert backend.get_item("B") is None
+
+
+@pytest.mark.parametrize("mode", ["item", "batch"])
+def test_mset_notifies_subscribers(start_server, mode):
+    _, port = start_server(mset_notify=mode)
+    with FramedClient("127.0.0.1", port) as subscriber, \
+            FramedClient("127.0.0.1", port) as writer:
+        assert subscriber.request({"ACTION": "subscribe", "UUID": "U"})["STATUS"] == 200
+        response = writer.request({"ACTION": "mset", "ITEMS": [{"id": "A", "n": 1},
+                                                               {"id": "B", "n": 2}]})
+        assert response["STATUS"] == 200
+        if mode == "batch":
+            event = subscriber.receive()
+            assert event["EVENT"] == "batch_update"
+            assert [item["id"] for item in event["DATA"]] == ["A", "B"]
+        else:
+            assert [subscriber.receive()["DATA"]["id"] for _ in range(2)] == ["A", "B"]
+        assert writer.request({"ACTION": "mget", "IDS": ["B", "A"]})["DATA"]["ITEMS"][0]["n"] == 2
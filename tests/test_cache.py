@@ -0,0 +1,68 @@
+# tests/test_cache.py
+
+import time
+
+import pytest
+
+from modules.cache import LRUCache
+from modules.protocol import FramedClient
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_cache.py
+# * Pruebas de la caché de lectura: vencimiento, copias de los ítems,
+# * lecturas viejas que no se guardan e IDs inválidos.
+# *----------------------------------------------------------------------------
+
+
+def test_entries_expire_after_ttl():
+    cache = LRUCache(max_size=10, ttl=0.05)
+    cache.put("A", 1)
+    assert cache.get("A") == 1
+    time.sleep(0.1)
+    assert cache.get("A") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_stale_fill_is_not_stored():
+    cache = LRUCache(max_size=10)
+    token = cache.reserve("A")
+    cache.put("A", "nuevo")  # Una escritura mientras se leía el origen
+    assert not cache.fill("A", "viejo", token)
+    assert cache.get("A") == "nuevo"
+
+
+def test_proxy_defaults_to_a_finite_ttl(proxy):
+    assert proxy.cache.ttl and proxy.cache.ttl > 0
+
+
+def test_cached_items_are_copies(proxy):
+    proxy.set_item_with_previous({"id": "A", "tags": ["x"]}, "U", "S")
+    first, status = proxy.get_item("A", "U", "S")
+    assert status == 200
+    first["tags"].append("y")
+    first["n"] = 1
+
+    second, _ = proxy.get_item("A", "U", "S")
+    assert second["tags"] == ["x"] and "n" not in second
+    assert proxy.cache.stats()["hits"] >= 1
+
+
+@pytest.mark.parametrize("item_id", [["x"], {"a": 1}, 7, ""])
+def test_invalid_ids_are_rejected_before_the_cache(proxy, item_id):
+    assert proxy.get_item(item_id, "U", "S")[1] == 400
+    assert proxy.set_item_with_previous({"id": item_id}, "U", "S")[1] == 400
+    assert proxy.set_items([{"id": item_id}], "U", "S")[1] == 400
+
+
+@pytest.mark.parametrize("engine", ["threads", "asyncio"])
+def test_connection_survives_a_list_id(start_server, engine):
+    _, port = start_server(engine=engine)
+    with FramedClient("127.0.0.1", port) as client:
+        for action in ("get", "snapshot"):
+            response = client.request({"ACTION": action, "ID": ["x"]})
+            assert response["STATUS"] == 400
+        assert client.request({"ACTION": "set", "id": ["x"]})["STATUS"] == 400
+        assert client.request({"ACTION": "get", "ID": "X"})["STATUS"] == 404
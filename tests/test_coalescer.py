@@ -0,0 +1,88 @@
+# tests/test_coalescer.py
+
+import socket
+import threading
+import time
+
+from modules.coalescer import WriteCoalescer
+from modules.protocol import FramedClient, PREAMBLE, encode_json_frame
+from tests.conftest import wait_for
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_coalescer.py
+# * Pruebas de la combinación de escrituras y de las respuestas diferidas
+# * de los 'set' combinados.
+# *----------------------------------------------------------------------------
+
+
+def recording_writer(delay=0):
+    writes = []
+
+    def write(item, client_uuid, session_id, absorbed):
+        writes.append(("start", item, len(absorbed) + 1))
+        time.sleep(delay)
+        writes.append(("end", item, len(absorbed) + 1))
+        return item, 200, "anterior", True
+
+    return writes, write
+
+
+def test_updates_in_a_window_are_merged():
+    writes, write = recording_writer()
+    coalescer = WriteCoalescer(write, window=0.05)
+    futures = [coalescer.submit("A", {"id": "A", "n": n}, "U", "S") for n in range(3)]
+    results = [future.result(5) for future in futures]
+    coalescer.close()
+
+    assert writes == [("start", {"id": "A", "n": 2}, 3), ("end", {"id": "A", "n": 2}, 3)]
+    # Solo la primera solicitud notifica la escritura
+    assert results[0] == ({"id": "A", "n": 2}, 200, "anterior", True)
+    assert results[1:] == [({"id": "A", "n": 2}, 200, None, False)] * 2
+    assert coalescer.stats()["merged_requests"] == 2
+
+
+def test_writes_of_an_id_keep_arrival_order():
+    writes, write = recording_writer(delay=0.1)
+    coalescer = WriteCoalescer(write, window=0.01)
+    first = coalescer.submit("A", {"n": 1}, "U", "S")
+    wait_for(lambda: writes)  # La primera ya salió de la ventana
+    second = coalescer.submit("A", {"n": 2}, "U", "S")
+    first.result(5), second.result(5)
+    coalescer.close()
+    assert [(event, item["n"]) for event, item, _ in writes] == \
+        [("start", 1), ("end", 1), ("start", 2), ("end", 2)]
+
+
+def test_versioned_set_waits_for_coalesced_set(start_server):
+    _, port = start_server(write_coalesce=0.2)
+    with FramedClient("127.0.0.1", port) as client:
+        responses = client.pipeline([{"ACTION": "set", "id": "A", "n": 1},
+                                     {"ACTION": "set", "id": "A", "n": 2, "_version": 1}])
+        first, second = (responses[key] for key in sorted(responses))
+        assert first["STATUS"] == 200
+        assert second["STATUS"] == 200 and second["DATA"]["_version"] == 2
+
+
+def test_client_that_does_not_read_does_not_stall_writes(start_server):
+    server, port = start_server(write_coalesce=0.01)
+    pad = "x" * (6 * 1024 * 1024)
+
+    # Un cliente escribe ítems grandes y nunca lee las respuestas (el eco del ítem)
+    stalled = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    stalled.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    stalled.connect(("127.0.0.1", port))
+    burst = PREAMBLE + b"".join(
+        encode_json_frame({"ACTION": "set", "id": f"G{i}", "pad": pad, "REQID": i})
+        for i in range(8))
+    threading.Thread(target=stalled.sendall, args=(burst,), daemon=True).start()
+    wait_for(lambda: server.data_proxy.storage.get_item("G7") is not None, timeout=10)
+
+    with FramedClient("127.0.0.1", port, timeout=15) as other:
+        other.send({"ACTION": "set", "id": "Z", "n": 1})
+        # La escritura se confirma aunque los escritores de respuestas esperen
+        wait_for(lambda: server.data_proxy.storage.get_item("Z") is not None, timeout=3)
+        stalled.close()
+        assert other.receive()["STATUS"] == 200
@@ -0,0 +1,61 @@
+# tests/test_codec.py
+
+from decimal import Decimal
+
+import pytest
+
+from modules import codec
+from modules.protocol import CODECS, FramedClient
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_codec.py
+# * Pruebas del codec binario (Decimal sin pasar por float, implementación
+# * en Python igual a la de msgpack) y de su negociación en el protocolo.
+# *----------------------------------------------------------------------------
+
+MESSAGE = {"ACTION": "set", "id": "Ñandú", "n": Decimal("0.1"), "big": 2 ** 70,
+           "neg": -129, "ok": True, "none": None, "x": 1.5,
+           "tags": ["a", Decimal(3)], "sub": {"s" * 40: "t" * 300}}
+
+
+def python_pack(message):
+    out = bytearray()
+    codec._pack(message, out)
+    return bytes(out)
+
+
+def python_unpack(payload):
+    return codec._Reader(payload).read()
+
+
+def test_round_trip_keeps_decimals():
+    unpacked = codec.unpack(codec.pack(MESSAGE))
+    assert unpacked == dict(MESSAGE, big=Decimal(2 ** 70))
+    assert isinstance(unpacked["n"], Decimal)
+    assert python_unpack(python_pack(MESSAGE)) == unpacked
+
+
+def test_python_implementation_matches_msgpack():
+    pytest.importorskip("msgpack")
+    assert python_pack(MESSAGE) == codec.pack(MESSAGE)
+
+
+def test_invalid_payloads_are_rejected():
+    payload = codec.pack(MESSAGE)
+    for bad in (payload[:-1], payload + b"\x00", b"\xc1"):
+        with pytest.raises(codec.CodecError):
+            codec.unpack(bad)
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_negotiated_codec_round_trip(start_server, name):
+    _, port = start_server()
+    with FramedClient("127.0.0.1", port, codecs=[name]) as client:
+        assert client.codec.name == name
+        assert client.request({"ACTION": "set", "id": "A", "n": 7, "x": 0.1})["STATUS"] == 200
+        item = client.request({"ACTION": "get", "ID": "A"})["DATA"]
+        assert (item["id"], item["_version"]) == ("A", 1)
+        assert str(item["x"]) == "0.1"
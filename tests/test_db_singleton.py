@@ -0,0 +1,118 @@
+# tests/test_db_singleton.py
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from botocore.exceptions import ClientError
+
+from modules.db_singleton import CLIENTS_SHARED, DatabaseSingleton, PerThread
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_db_singleton.py
+# * Pruebas de los clientes de DynamoDB por hilo contra un endpoint HTTP
+# * local que imita a DynamoDB (sin credenciales reales).
+# *----------------------------------------------------------------------------
+
+
+class FakeDynamoDB(BaseHTTPRequestHandler):
+    """
+    Responde DescribeTable y GetItem; un GetItem del id 'INVALIDO' falla
+    con ValidationException.
+    """
+
+    def do_POST(self):
+        operation = self.headers["X-Amz-Target"].split(".")[-1]
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        status = 200
+        if operation == "DescribeTable":
+            response = {"Table": {"TableName": body["TableName"], "TableStatus": "ACTIVE",
+                                  "KeySchema": [{"AttributeName": "id", "KeyType": "HASH"}]}}
+        elif body["Key"]["id"]["S"] == "INVALIDO":
+            status = 400
+            response = {"__type": "com.amazon.coral.validate#ValidationException",
+                        "message": "Clave inválida"}
+        else:
+            response = {"Item": {"id": body["Key"]["id"], "n": {"N": "1"}}}
+        payload = json.dumps(response).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/x-amz-json-1.0")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def dynamodb(monkeypatch):
+    """
+    Endpoint local de DynamoDB; crea un DatabaseSingleton nuevo con las
+    opciones indicadas y lo descarta al terminar.
+    """
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeDynamoDB)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    monkeypatch.setenv("AWS_ENDPOINT_URL", f"http://127.0.0.1:{httpd.server_address[1]}")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "prueba")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "prueba")
+    monkeypatch.setattr(DatabaseSingleton, "_instance", None)
+
+    def connect(**options):
+        DatabaseSingleton._instance = None
+        return DatabaseSingleton(dict(options, max_attempts=1))
+
+    yield connect
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_per_thread_wrapper_creates_one_object_per_thread():
+    created = []
+    wrapper = PerThread(lambda: created.append(object()) or created[-1])
+    assert wrapper.current() is wrapper.current()
+    other = []
+    thread = threading.Thread(target=lambda: other.append(wrapper.current()))
+    thread.start()
+    thread.join()
+    assert len(created) == 2 and other[0] is not wrapper.current()
+
+
+def test_each_thread_uses_its_own_client(dynamodb):
+    db = dynamodb()
+    assert DatabaseSingleton() is db
+    table = db.get_corporate_data_table()
+    results = []
+
+    def read():
+        results.append(table.get_item(Key={"id": "A"})["Item"]["id"])
+
+    threads = [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["A"] * 3
+    stats = db.stats()
+    # Las 2 cargas de tablas y las 3 lecturas; los clientes de los hilos
+    # ya terminados se liberan con ellos
+    assert stats["clients"] >= 1 and stats["clients_mode"] == "thread"
+    assert stats["calls"] == 5 and stats["in_flight"] == 0 and stats["errors"] == 0
+
+
+def test_shared_client_and_failed_calls(dynamodb):
+    db = dynamodb(clients=CLIENTS_SHARED)
+    with pytest.raises(ClientError):
+        db.get_corporate_data_table().get_item(Key={"id": "INVALIDO"})
+    stats = db.stats()
+    assert (stats["clients"], stats["calls"], stats["errors"], stats["in_flight"]) == (1, 3, 1, 0)
+
+
+def test_unknown_client_mode_exits(dynamodb):
+    with pytest.raises(SystemExit):
+        dynamodb(clients="otro")
@@ -0,0 +1,153 @@
+# tests/test_event_log.py
+
+import threading
+
+from modules.event_log import EventLog
+from modules.protocol import FramedClient
+from tests.conftest import wait_for
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_event_log.py
+# * Pruebas del registro de eventos: secuencia, repetición con SINCE (también
+# * al suscribirse), persistencia en archivo y compactación.
+# *----------------------------------------------------------------------------
+
+
+class BlockingFile:
+    """
+    Archivo cuyas escrituras esperan hasta que se active release.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.release = threading.Event()
+        self.writing = threading.Event()
+
+    def write(self, data):
+        self.writing.set()
+        self.release.wait(5)
+        return self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def test_since_replays_events_of_the_same_stream():
+    events = EventLog(capacity=3)
+    for n in range(5):
+        events.append({"EVENT": "update", "DATA": {"n": n}})
+    assert events.last_seq == 5
+    assert [e["SEQ"] for e in events.since(3, events.stream)] == [4, 5]
+    assert events.since(5, events.stream) == []
+    # Eventos que ya no están en el buffer, u otra secuencia: resincronizar
+    assert events.since(1, events.stream) is None
+    assert events.since(3, "otra") is None
+    assert events.since(6, events.stream) is None
+
+
+def test_events_survive_a_restart(tmp_path):
+    path = str(tmp_path / "eventos.bin")
+    first = EventLog(capacity=10, path=path, name="nodo-1")
+    for n in range(4):
+        first.append({"EVENT": "update", "DATA": {"n": n}})
+    first.close()
+
+    second = EventLog(capacity=10, path=path, name="nodo-1")
+    assert (second.stream, second.last_seq) == (first.stream, 4)
+    assert [e["DATA"]["n"] for e in second.since(2, first.stream)] == [2, 3]
+    second.close()
+
+    # El archivo de otro nodo empieza una secuencia nueva
+    other = EventLog(capacity=10, path=path, name="nodo-2")
+    assert other.stream != first.stream and other.stream.startswith("nodo-2/")
+    other.close()
+
+
+def test_file_is_compacted_to_the_buffer(tmp_path):
+    path = str(tmp_path / "eventos.bin")
+    events = EventLog(capacity=3, path=path)
+    for n in range(20):
+        events.append({"EVENT": "update", "DATA": {"n": n}})
+    events.close()
+
+    reloaded = EventLog(capacity=100, path=path)
+    assert reloaded.last_seq == 20
+    assert reloaded.stats()["buffered"] <= 2 * 3
+    assert [e["SEQ"] for e in reloaded.since(17, reloaded.stream)] == [18, 19, 20]
+    reloaded.close()
+
+
+def test_incomplete_last_record_is_discarded(tmp_path):
+    path = tmp_path / "eventos.bin"
+    events = EventLog(capacity=10, path=str(path))
+    events.append({"EVENT": "update", "DATA": {"n": 1}})
+    events.append({"EVENT": "update", "DATA": {"n": 2}})
+    events.close()
+    path.write_bytes(path.read_bytes()[:-3])  # Corte durante la escritura
+
+    reloaded = EventLog(capacity=10, path=str(path))
+    assert reloaded.last_seq == 1
+    assert reloaded.append({"EVENT": "update"})["SEQ"] == 2
+    reloaded.close()
+
+
+def test_append_does_not_wait_for_the_disk(tmp_path):
+    path = str(tmp_path / "eventos.bin")
+    events = EventLog(capacity=10, path=path)
+    slow = BlockingFile(events._file)
+    events._file = slow
+
+    events.append({"EVENT": "update", "DATA": {"n": 0}})
+    assert slow.writing.wait(5)
+    # El disco está trabado: append igual asigna el SEQ y vuelve
+    for n in range(1, 4):
+        assert events.append({"EVENT": "update", "DATA": {"n": n}})["SEQ"] == n + 1
+    assert events.stats()["unwritten"] == 3
+
+    slow.release.set()
+    wait_for(lambda: events.stats()["unwritten"] == 0)
+    events.close()
+    reloaded = EventLog(capacity=10, path=path)
+    assert reloaded.last_seq == 4
+    reloaded.close()
+
+
+def subscribe(client, **options):
+    response = client.request(dict({"ACTION": "subscribe", "UUID": "U"}, **options))
+    assert response["STATUS"] == 200
+    return response["DATA"]
+
+
+def test_subscribe_since_replays_or_asks_to_resync(start_server):
+    server, port = start_server(subject_options={"replay_capacity": 3})
+    with FramedClient("127.0.0.1", port) as writer:
+        with FramedClient("127.0.0.1", port) as first:
+            info = subscribe(first)
+            stream, since = info["STREAM"], info["SEQ"]
+            for n in (1, 2):
+                writer.request({"ACTION": "set", "id": "A", "n": n})
+            assert first.receive()["SEQ"] == since + 1
+
+        # Reanudar en la misma secuencia repite lo posterior a SINCE
+        with FramedClient("127.0.0.1", port) as second:
+            info = subscribe(second, SINCE=since, STREAM=stream)
+            assert (info["REPLAYED"], info["RESYNC"]) == (2, False)
+            assert [second.receive()["DATA"]["n"] for _ in range(2)] == [1, 2]
+
+        # Otra secuencia (otro worker o nodo) obliga a resincronizar
+        with FramedClient("127.0.0.1", port) as third:
+            info = subscribe(third, SINCE=since, STREAM="otro-nodo/x")
+            assert (info["REPLAYED"], info["RESYNC"]) == (0, True)
+
+        # Y también los eventos que ya salieron del buffer
+        for n in range(3, 7):
+            writer.request({"ACTION": "set", "id": "A", "n": n})
+        wait_for(lambda: server.subject.last_seq() == since + 6)
+        with FramedClient("127.0.0.1", port) as fourth:
+            assert subscribe(fourth, SINCE=since, STREAM=stream)["RESYNC"] is True
@@ -0,0 +1,110 @@
+# tests/test_fanout.py
+
+import json
+import threading
+
+import pytest
+
+from modules.observer import (POLICY_COALESCE, POLICY_DISCONNECT, POLICY_DROP_OLDEST,
+                              Subject)
+from tests.conftest import wait_for
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_fanout.py
+# * Pruebas del fan-out no bloqueante: colas de salida por suscriptor,
+# * políticas de suscriptor lento y envíos que no demoran al notify.
+# *----------------------------------------------------------------------------
+
+
+class FakeConnection:
+    """
+    Conexión de un suscriptor que junta los eventos enviados; con hold,
+    cada envío espera hasta que se active release.
+    """
+
+    wire_format = "json"
+
+    def __init__(self, hold=False):
+        self.paused = False
+        self.on_resume = None
+        self.aborted = False
+        self.events = []
+        self.hold = hold
+        self.release = threading.Event()
+        self.sending = threading.Event()
+
+    def encode_event(self, message):
+        return json.dumps(message).encode("utf-8") + b"\n"
+
+    def send_bytes(self, data):
+        self.sending.set()
+        if self.hold:
+            self.release.wait(5)
+        self.events.extend(json.loads(line) for line in data.splitlines())
+
+    def set_send_timeout(self, timeout):
+        pass
+
+    def abort(self):
+        self.aborted = True
+
+    def ids(self):
+        return [event["DATA"]["id"] for event in self.events]
+
+
+def subscribe(subject, connection):
+    subject.subscribe(connection, "U")
+    subject.release(connection)
+
+
+def test_slow_subscriber_does_not_delay_the_others():
+    subject = Subject(fanout_workers=2)
+    slow, fast = FakeConnection(hold=True), FakeConnection()
+    for connection in (slow, fast):
+        subscribe(subject, connection)
+
+    subject.notify({"id": "A", "_version": 1})
+    assert slow.sending.wait(5)
+    subject.notify({"id": "B", "_version": 1})  # No espera al envío trabado
+    wait_for(lambda: fast.ids() == ["A", "B"])
+    slow.release.set()
+    wait_for(lambda: slow.ids() == ["A", "B"])
+
+
+def test_events_are_held_until_release():
+    subject = Subject()
+    connection = FakeConnection()
+    subject.subscribe(connection, "U")
+    subject.notify({"id": "A"})
+    assert subject.stats()["queued"] == 1 and connection.events == []
+    subject.release(connection)
+    wait_for(lambda: connection.ids() == ["A"])
+
+
+@pytest.mark.parametrize("policy, expected", [
+    (POLICY_DROP_OLDEST, ["B1", "A2", "C3"]),
+    # La notificación pendiente de un id se reemplaza por la última
+    (POLICY_COALESCE, ["A2", "B1", "C3"]),
+])
+def test_full_queue_policies(policy, expected):
+    subject = Subject(max_queue=3, policy=policy)
+    connection = FakeConnection()
+    subject.subscribe(connection, "U")  # Retenido: la cola se llena
+    for n, item_id in enumerate(("A", "B", "A", "C")):
+        subject.notify({"id": item_id, "n": n})
+    subject.release(connection)
+    wait_for(lambda: [f"{e['DATA']['id']}{e['DATA']['n']}" for e in connection.events] == expected)
+
+
+def test_disconnect_policy_drops_the_slow_subscriber():
+    subject = Subject(max_queue=1, policy=POLICY_DISCONNECT)
+    connection = FakeConnection()
+    subject.subscribe(connection, "U")
+    subject.notify({"id": "A"})
+    subject.notify({"id": "B"})
+    assert connection.aborted
+    assert subject.subscriber_count() == 0
+    assert subject.stats()["disconnected_slow"] == 1
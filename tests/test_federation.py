@@ -0,0 +1,121 @@
+# tests/test_federation.py
+
+import socket
+import time
+
+import pytest
+
+from modules import codec
+from modules.federation import PeerRelay, parse_peers
+from modules.protocol import FramedClient, encode_frame
+from tests.conftest import wait_for
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_federation.py
+# * Pruebas de la federación de nodos: descarte de repetidos por nodo y
+# * eventos que no vuelven a circular entre los pares.
+# *----------------------------------------------------------------------------
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def relays():
+    """
+    Crea nodos en malla completa; cada uno junta los eventos recibidos.
+    """
+    created = []
+
+    def make(count):
+        ports = [free_port() for _ in range(count)]
+        nodes = []
+        for i, port in enumerate(ports):
+            received = []
+            peers = [("127.0.0.1", p) for p in ports if p != port]
+            relay = PeerRelay(f"nodo-{i}", peers, "127.0.0.1", port, received.append)
+            relay.received = received
+            relay.start()
+            nodes.append(relay)
+        created.extend(nodes)
+        return nodes
+
+    yield make
+    for relay in created:
+        relay.close()
+
+
+def send_events(port, messages):
+    """
+    Se conecta como par y envía los mensajes (ya con ORIGIN y SEQ).
+    """
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(encode_frame(codec.pack({"PEER": "prueba"})))
+        for message in messages:
+            sock.sendall(encode_frame(codec.pack(message)))
+        # La confirmación indica que el par procesó el lote
+        assert sock.recv(4096)
+
+
+def test_parse_peers():
+    assert parse_peers("a:1, b:2,") == [("a", 1), ("b", 2)]
+    with pytest.raises(ValueError):
+        parse_peers("sin-puerto")
+
+
+def test_events_reach_every_peer_once(relays):
+    a, b, c = relays(3)
+    wait_for(lambda: all(link.connected for relay in (a, b, c) for link in relay._links))
+    a.publish("set", {"id": "A"})
+    a.publish("set", {"id": "B"})
+    wait_for(lambda: len(b.received) == 2 and len(c.received) == 2)
+    time.sleep(0.2)
+    # Los recibidos no se reenvían: ni vuelven al origen ni se duplican
+    assert a.received == []
+    assert [m["DATA"]["id"] for m in b.received] == ["A", "B"]
+    assert [m["SEQ"] for m in c.received] == [1, 2]
+
+
+def test_repeated_events_are_dropped_per_node(relays):
+    [relay] = relays(1)
+    send_events(relay.port, [{"ORIGIN": "x/arranque-1", "SEQ": seq, "EVENT": "set"}
+                             for seq in (1, 2, 2, 1, 3)])
+    wait_for(lambda: len(relay.received) == 3)
+    assert [m["SEQ"] for m in relay.received] == [1, 2, 3]
+
+    # Cada reinicio del nodo empieza su secuencia de nuevo y no suma entradas
+    for boot in range(2, 6):
+        send_events(relay.port, [{"ORIGIN": f"x/arranque-{boot}", "SEQ": 1, "EVENT": "set"}])
+    wait_for(lambda: len(relay.received) == 7)
+    assert relay.stats()["known_nodes"] == 1
+
+
+def test_servers_do_not_send_peer_events_back(start_server):
+    ports = [free_port(), free_port()]
+    servers = []
+    for i, port in enumerate(ports):
+        peers = [("127.0.0.1", p) for p in ports if p != port]
+        servers.append(start_server(peer_options={"node_id": f"nodo-{i}", "peers": peers,
+                                                  "port": port}))
+    (first, first_port), (second, second_port) = servers
+    wait_for(lambda: first.peers.stats()["inbound_peers"] == 1 and
+             second.peers.stats()["inbound_peers"] == 1)
+
+    with FramedClient("127.0.0.1", first_port) as local, \
+            FramedClient("127.0.0.1", second_port) as remote, \
+            FramedClient("127.0.0.1", first_port) as writer:
+        for subscriber in (local, remote):
+            assert subscriber.request({"ACTION": "subscribe", "UUID": "U"})["STATUS"] == 200
+        writer.request({"ACTION": "set", "id": "A", "n": 1})
+        assert remote.receive()["DATA"]["id"] == "A"
+        assert local.receive()["DATA"]["id"] == "A"
+        time.sleep(0.3)
+    assert first.peers.stats()["published"] == 1
+    assert second.peers.stats()["published"] == 0
+    assert first.subject.last_seq() == 1
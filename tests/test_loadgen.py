@@ -0,0 +1,62 @@
+# tests/test_loadgen.py
+
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from tests.conftest import SRC
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_loadgen.py
+# * Pruebas del generador de carga: mezcla de acciones, percentiles y una
+# * corrida corta contra un servidor con suscriptores.
+# *----------------------------------------------------------------------------
+
+LOADGEN = os.path.join(os.path.dirname(SRC), "benchmarks", "loadgen.py")
+
+spec = importlib.util.spec_from_file_location("loadgen", LOADGEN)
+loadgen = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(loadgen)
+
+
+def test_mix_and_addresses_are_parsed():
+    assert loadgen.parse_mix("get=70, set=20,list") == [("get", 70.0), ("set", 20.0),
+                                                         ("list", 1.0)]
+    for bad in ("delete=1", "get=x", "get=0"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            loadgen.parse_mix(bad)
+    assert loadgen.parse_addresses("a:1,::1:2") == [("a", 1), ("::1", 2)]
+    with pytest.raises(argparse.ArgumentTypeError):
+        loadgen.parse_addresses("sin-puerto")
+
+
+def test_summary_uses_nearest_rank_percentiles():
+    assert loadgen.summarize([]) == {"count": 0}
+    summary = loadgen.summarize([i / 1000 for i in range(1, 101)])
+    assert (summary["count"], summary["p50"], summary["p99"], summary["max"]) == \
+        (100, 50.0, 99.0, 100.0)
+    assert summary["mean"] == 50.5
+    assert loadgen.summarize([i / 1000 for i in range(1, 1001)])["p999"] == 999.0
+
+
+@pytest.mark.parametrize("protocol", ["framed", "legacy"])
+def test_short_run_reports_latency_and_fanout(start_server, protocol):
+    _, port = start_server()
+    result = subprocess.run(
+        [sys.executable, LOADGEN, "-s", "127.0.0.1", "-p", str(port), "-c", "2", "-m", "1",
+         "--protocol", protocol, "--keys", "20", "--mix", "get=1,set=1,list=1",
+         "-d", "0.5", "--warmup", "0.2", "--drain", "0.3", "--json"],
+        capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout)
+    assert report["requests"] > 0 and report["errors"] == 0
+    assert set(report["latency_ms"]) == {"all", "get", "set", "list"}
+    assert report["fanout"]["events_received"] > 0
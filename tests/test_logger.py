@@ -0,0 +1,92 @@
+# tests/test_logger.py
+
+import json
+import logging
+import queue
+import threading
+
+import pytest
+
+from modules import logger
+from modules.logger import DrainingQueueListener, get_logger
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_logger.py
+# * Pruebas del logging en cola: el mensaje se arma al encolar y el cierre
+# * no falla con la cola llena.
+# *----------------------------------------------------------------------------
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    """
+    Configura el logging en formato JSON hacia un archivo y devuelve una
+    función que lo cierra y lee sus líneas.
+    """
+    path = tmp_path / "server.log"
+    logger.configure(level="DEBUG", fmt="json", path=str(path))
+
+    def read():
+        logger.shutdown()
+        return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+    yield read
+    logger.shutdown()
+    root = logging.getLogger(logger.ROOT)
+    root.handlers[:] = []
+    root.propagate = True
+
+
+def test_message_is_formatted_when_enqueued(log_file):
+    item = {"id": "A", "n": 1}
+    get_logger("test").info("Ítem %s", item, extra={"reqid": 7})
+    item["n"] = 2  # Cambia antes de que el hilo escriba el registro
+    [entry] = [e for e in log_file() if e["logger"] == "tpfi.test"]
+    assert entry["message"] == "Ítem {'id': 'A', 'n': 1}"
+    assert entry["reqid"] == 7 and entry["level"] == "INFO"
+
+
+def test_exception_text_is_kept(log_file):
+    try:
+        raise ValueError("falla")
+    except ValueError:
+        get_logger("test").exception("Error en %s", "X")
+    [entry] = [e for e in log_file() if e["logger"] == "tpfi.test"]
+    assert entry["message"] == "Error en X"
+    assert "ValueError: falla" in entry["exception"]
+
+
+class StalledHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.unblock = threading.Event()
+        self.handled = []
+
+    def emit(self, record):
+        self.unblock.wait(5)
+        self.handled.append(record.getMessage())
+
+
+def test_stop_waits_for_room_in_a_full_queue():
+    records = queue.Queue(maxsize=1)
+    target = StalledHandler()
+    listener = DrainingQueueListener(records, target)
+    listener.start()
+    for message in ("uno", "dos"):
+        records.put(logging.makeLogRecord({"msg": message}))
+        if message == "uno":
+            while not records.empty():  # El hilo tomó el primero y quedó trabado
+                pass
+    assert records.full()
+
+    stopper = threading.Thread(target=listener.stop, daemon=True)
+    stopper.start()
+    stopper.join(0.2)
+    assert stopper.is_alive()  # Espera lugar para el aviso de fin, sin fallar
+    target.unblock.set()
+    stopper.join(5)
+    assert not stopper.is_alive()
+    assert target.handled == ["uno", "dos"]
@@ -0,0 +1,89 @@
+# tests/test_metrics.py
+
+import urllib.request
+
+import pytest
+
+from modules.metrics import Histogram, MetricsHTTPServer, Registry
+from modules.protocol import FramedClient
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_metrics.py
+# * Pruebas del registro de métricas: histogramas y cuantiles, fuentes de
+# * gauges, formato de Prometheus y la acción 'stats'.
+# *----------------------------------------------------------------------------
+
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+    assert histogram.snapshot()["p50_ms"] is None
+    for value in [0.005] * 50 + [0.05] * 45 + [0.5] * 4 + [5.0]:
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 100
+    assert snapshot["p50_ms"] == pytest.approx(10.0)
+    assert 10.0 < snapshot["p95_ms"] <= 100.0
+    assert 100.0 < snapshot["p99_ms"] <= 1000.0
+    assert histogram.quantile(1.0) == 1.0  # Por encima del último límite
+
+
+def test_timed_functions_are_observed_even_when_they_fail():
+    family = Registry().histogram("calls_seconds", "Llamadas")
+    histogram = family.labels()
+
+    @histogram.timed
+    def fail():
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        fail()
+    with histogram.time():
+        pass
+    assert histogram.snapshot()["count"] == 2
+
+
+def test_snapshot_and_prometheus_text():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Solicitudes", ("action",))
+    requests.labels("get").inc(2)
+    registry.histogram("latency_seconds", "Latencia", buckets=(0.1,)).labels().observe(0.05)
+    registry.add_source("pool", lambda: {"active": 1, "ok": True, "name": "x",
+                                         "queue": {"depth": 3}})
+    registry.add_source("broken", lambda: 1 / 0)
+
+    snapshot = registry.snapshot()
+    assert snapshot["metrics"]["requests_total"] == {"get": 2}
+    assert snapshot["pool"]["queue"] == {"depth": 3}
+    assert "error" in snapshot["broken"]
+
+    text = registry.render_prometheus()
+    assert 'tpfi_requests_total{action="get"} 2' in text
+    assert 'tpfi_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'tpfi_latency_seconds_bucket{le="+Inf"} 1' in text
+    assert "tpfi_pool_queue_depth 3" in text and "tpfi_pool_ok 1" in text
+    assert "tpfi_pool_name" not in text
+
+
+def test_metrics_http_endpoint():
+    registry = Registry()
+    registry.counter("hits_total", "Visitas").labels().inc()
+    server = MetricsHTTPServer("127.0.0.1", 0, registry)
+    server.start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=5) as response:
+            assert "tpfi_hits_total 1" in response.read().decode("utf-8")
+    finally:
+        server.close()
+
+
+def test_stats_action(start_server):
+    server, port = start_server()
+    with FramedClient("127.0.0.1", port) as client:
+        client.request({"ACTION": "set", "id": "A", "n": 1})
+        stats = client.request({"ACTION": "stats"})
+    assert stats["STATUS"] == 200
+    assert stats["DATA"]["metrics"]["item_writes_total"]["written"] >= 1
+    assert stats["DATA"]["server"]["workers"] == server.workers
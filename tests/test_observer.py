@@ -0,0 +1,101 @@
+# tests/test_observer.py
+
+from observerclient import DeltaState, fetch_snapshot
+from modules.observer import diff_items
+from modules.protocol import FramedClient
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_observer.py
+# * Pruebas de las notificaciones 'delta': codificación, versiones,
+# * detección de huecos y resincronización con 'snapshot'.
+# *----------------------------------------------------------------------------
+
+
+def subscribe(client, **options):
+    response = client.request(dict({"ACTION": "subscribe", "UUID": "U"}, **options))
+    assert response["STATUS"] == 200
+    return response["DATA"]
+
+
+def test_diff_items_reports_changed_and_removed_fields():
+    changed, removed = diff_items({"id": "A", "a": 1, "b": 2, "c": 3},
+                                  {"id": "A", "a": 1, "b": 5, "d": 4})
+    assert changed == {"b": 5, "d": 4}
+    assert removed == ["c"]
+
+
+def test_delta_carries_changed_fields_and_stored_version(start_server):
+    server, port = start_server()
+    with FramedClient("127.0.0.1", port) as subscriber, \
+            FramedClient("127.0.0.1", port) as writer:
+        subscribe(subscriber, MODE="delta")
+        writer.request({"ACTION": "set", "id": "A", "a": 1, "b": 2})
+        writer.request({"ACTION": "set", "id": "A", "a": 1, "b": 3})
+
+        first = subscriber.receive()
+        assert first["EVENT"] == "update" and first["VERSION"] == 1
+        delta = subscriber.receive()
+        assert delta["EVENT"] == "delta" and delta["ID"] == "A"
+        assert delta["CHANGED"] == {"b": 3, "_version": 2}
+        # La versión del evento es la almacenada, no un contador propio
+        assert delta["VERSION"] == server.data_proxy.storage.get_item("A")["_version"]
+    assert not hasattr(server.subject, "_versions")
+
+
+def test_batch_update_carries_stored_versions(start_server):
+    _, port = start_server(mset_notify="batch")
+    with FramedClient("127.0.0.1", port) as subscriber, \
+            FramedClient("127.0.0.1", port) as writer:
+        subscribe(subscriber)
+        writer.request({"ACTION": "set", "id": "A", "n": 1})
+        writer.request({"ACTION": "mset", "ITEMS": [{"id": "A", "n": 2}, {"id": "B", "n": 1}]})
+        subscriber.receive()
+        batch = subscriber.receive()
+        assert batch["EVENT"] == "batch_update"
+        assert batch["VERSIONS"] == [2, 1]
+
+
+def test_delta_state_applies_consecutive_versions():
+    state = DeltaState(fetch=lambda item_id: None)
+    state.apply({"EVENT": "update", "VERSION": 1, "DATA": {"id": "A", "a": 1, "b": 2}})
+    assert state.apply({"EVENT": "delta", "ID": "A", "VERSION": 2,
+                        "CHANGED": {"a": 5}, "REMOVED": ["b"]}) is None
+    assert state.items["A"] == {"id": "A", "a": 5}
+    assert state.snapshots == 0
+
+
+def test_delta_state_resyncs_on_a_version_gap():
+    snapshot = {"ID": "A", "VERSION": 3, "DATA": {"id": "A", "a": 3, "_version": 3}}
+    fetched = []
+
+    def fetch(item_id):
+        fetched.append(item_id)
+        return snapshot
+
+    state = DeltaState(fetch)
+    state.apply({"EVENT": "update", "VERSION": 1, "DATA": {"id": "A", "a": 1}})
+    # Falta la versión 2: no se aplica sobre una base incompleta
+    event = state.apply({"EVENT": "delta", "ID": "A", "VERSION": 3, "CHANGED": {"a": 3}})
+    assert fetched == ["A"]
+    assert event == {"EVENT": "snapshot", "ID": "A", "VERSION": 3, "DATA": snapshot["DATA"]}
+    # Un delta ya incluido en el snapshot se ignora; el siguiente se aplica
+    assert state.apply({"EVENT": "delta", "ID": "A", "VERSION": 3, "CHANGED": {"a": 3}}) is None
+    state.apply({"EVENT": "delta", "ID": "A", "VERSION": 4, "CHANGED": {"a": 4}})
+    assert state.items["A"]["a"] == 4 and state.snapshots == 1
+
+
+def test_snapshot_resyncs_an_unknown_item(start_server):
+    _, port = start_server()
+    with FramedClient("127.0.0.1", port) as writer:
+        writer.request({"ACTION": "set", "id": "A", "n": 1})
+        writer.request({"ACTION": "set", "id": "A", "n": 2})
+        assert writer.request({"ACTION": "snapshot", "ID": "NOPE"})["STATUS"] == 404
+
+    state = DeltaState(lambda item_id: fetch_snapshot("127.0.0.1", port, None, "U", item_id))
+    event = state.apply({"EVENT": "delta", "ID": "A", "VERSION": 2, "CHANGED": {"n": 2}})
+    assert event["EVENT"] == "snapshot" and event["VERSION"] == 2
+    assert event["DATA"]["n"] == 2
+    assert state.versions["A"] == 2
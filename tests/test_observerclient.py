@@ -0,0 +1,106 @@
+# tests/test_observerclient.py
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import observerclient
+from modules.protocol import FramedClient, JsonStreamDecoder, ProtocolError
+from tests.conftest import SRC, wait_for
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_observerclient.py
+# * Pruebas del cliente observador: decodificación de eventos legacy que
+# * llegan partidos, archivo de salida con buffer, reintentos con jitter y
+# * retomar una suscripción con --since/--stream.
+# *----------------------------------------------------------------------------
+
+
+def run_client(*args):
+    return subprocess.run([sys.executable, observerclient.__file__, *args],
+                          cwd=SRC, capture_output=True, text=True, timeout=10)
+
+
+def test_stream_decoder_splits_documents_in_any_chunk():
+    events = [{"event": "update", "data": {"id": "Ñandú", "n": i}} for i in range(3)]
+    data = (json.dumps(events[0]) + json.dumps(events[1]) + "\n " +
+            json.dumps(events[2], ensure_ascii=False)).encode("utf-8")
+    decoder = JsonStreamDecoder()
+    received = []
+    for i in range(0, len(data), 5):  # Parte también los caracteres multibyte
+        received.extend(decoder.feed(data[i:i + 5]))
+    assert received == events
+
+
+def test_stream_decoder_rejects_invalid_or_oversized_documents():
+    with pytest.raises(json.JSONDecodeError):
+        JsonStreamDecoder().feed(b'{"a": 1} nada')
+    with pytest.raises(ProtocolError):
+        JsonStreamDecoder(max_size=16).feed(b'{"a": "' + b"x" * 32)
+
+
+def test_sink_writes_jsonl_and_flushes_on_close(tmp_path):
+    output = tmp_path / "eventos.jsonl"
+    sink = observerclient.NotificationSink(str(output), fmt="jsonl", flush_interval=60,
+                                           quiet=True)
+    for seq in (1, 2):
+        sink.write({"EVENT": "update", "SEQ": seq, "DATA": {"id": "A"}})
+    assert output.read_text() == ""  # Todavía en el buffer
+    sink.close()
+    assert [json.loads(line)["SEQ"] for line in output.read_text().splitlines()] == [1, 2]
+    assert (sink.count, sink.last_seq) == (2, 2)
+
+
+def test_backoff_grows_up_to_the_maximum():
+    backoff = observerclient.Backoff(base=1, maximum=4)
+    delays = [backoff.next_delay() for _ in range(6)]
+    assert all(0 <= delay <= min(4, 2 ** n) for n, delay in enumerate(delays))
+    backoff.reset()
+    assert backoff.next_delay() <= 1
+
+
+def test_subscription_filter_from_options():
+    assert observerclient.build_subscription_filter("A, B,", ["X-"], ["sede=Central",
+                                                                    "sede=Paraná"]) == {
+        "IDS": ["A", "B"], "PREFIXES": ["X-"], "FILTER": {"sede": ["Central", "Paraná"]}}
+    with pytest.raises(ValueError):
+        observerclient.build_subscription_filter(None, None, ["sede"])
+
+
+def test_since_and_stream_go_together():
+    for args in (["--since", "3"], ["--stream", "abc"]):
+        result = run_client(*args)
+        assert result.returncode == 2
+        assert "--since y --stream se usan juntos" in result.stderr
+
+
+def test_resume_with_since_and_stream(start_server, tmp_path):
+    _, port = start_server()
+    with FramedClient("127.0.0.1", port) as client:
+        subscribed = client.request({"ACTION": "subscribe", "UUID": "U"})["DATA"]
+        client.request({"ACTION": "set", "id": "A", "n": 1})
+        client.request({"ACTION": "set", "id": "B", "n": 1})
+    seq, stream = subscribed["SEQ"], subscribed["STREAM"]
+
+    # Retoma después del primer evento: solo se repite el segundo
+    output = tmp_path / "eventos.jsonl"
+    process = subprocess.Popen(
+        [sys.executable, observerclient.__file__, "-p", str(port), "--codec", "json",
+         "--since", str(seq + 1), "--stream", stream, "-q", "-o", str(output),
+         "--format", "jsonl", "--flush-interval", "0.05"],
+        cwd=SRC, stdout=subprocess.PIPE, text=True,
+        env=dict(os.environ, PYTHONUNBUFFERED="1"))
+    try:
+        wait_for(lambda: output.exists() and output.read_text())
+        events = [json.loads(line) for line in output.read_text().splitlines()]
+    finally:
+        process.kill()
+    out = process.communicate()[0]
+    assert [(e["SEQ"], e["DATA"]["id"]) for e in events] == [(seq + 2, "B")]
+    assert "Recuperando 1 notificación(es)" in out
@@ -0,0 +1,84 @@
+# tests/test_pagination.py
+
+from decimal import Decimal
+
+import pytest
+
+from modules.data_proxy import MAX_PAGE_SIZE, decode_cursor, encode_cursor, parse_limit
+from modules.protocol import FramedClient
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_pagination.py
+# * Pruebas del listado paginado: cursor opaco, páginas acotadas por LIMIT
+# * y validación de los parámetros.
+# *----------------------------------------------------------------------------
+
+IDS = [f"I{i:03d}" for i in range(25)]
+
+
+def fill(proxy):
+    assert proxy.set_items([{"id": i, "n": n} for n, i in enumerate(IDS)], "u", "s")[1] == 200
+
+
+def test_cursor_round_trip():
+    key = {"id": "Ñandú", "n": Decimal("1.5")}
+    cursor = encode_cursor(key)
+    assert cursor.isascii()
+    assert decode_cursor(cursor) == key
+    for bad in ("no-es-un-cursor", encode_cursor({"n": 1}), None):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+
+def test_limit_is_validated_and_capped():
+    assert parse_limit("5") == 5
+    assert parse_limit(MAX_PAGE_SIZE * 10) == MAX_PAGE_SIZE
+    for bad in (0, -1, "x", [3]):
+        with pytest.raises(ValueError):
+            parse_limit(bad)
+
+
+def test_list_follows_the_cursor(proxy):
+    fill(proxy)
+    seen, cursor, pages = [], None, 0
+    while True:
+        page, status = proxy.list_items("u", "s", limit=10, cursor=cursor)
+        assert status == 200
+        assert len(page["ITEMS"]) <= 10
+        seen.extend(item["id"] for item in page["ITEMS"])
+        pages += 1
+        cursor = page["NEXT_CURSOR"]
+        if cursor is None:
+            break
+    assert pages == 3
+    assert seen == IDS
+
+
+def test_list_without_limit_returns_everything(proxy):
+    fill(proxy)
+    items, status = proxy.list_items("u", "s")
+    assert status == 200
+    assert sorted(item["id"] for item in items) == IDS
+
+
+def test_invalid_paging_is_rejected(proxy):
+    assert proxy.list_items("u", "s", cursor="no-es-un-cursor")[1] == 400
+    assert proxy.list_items("u", "s", limit=0)[1] == 400
+    assert proxy.list_items("u", "s", limit=5, segments=2)[1] == 400
+
+
+def test_list_pages_over_the_protocol(start_server):
+    server, port = start_server()
+    fill(server.data_proxy)
+    with FramedClient("127.0.0.1", port) as client:
+        first = client.request({"ACTION": "list", "LIMIT": 20})
+        assert first["STATUS"] == 200
+        second = client.request({"ACTION": "list", "LIMIT": 20,
+                                 "CURSOR": first["DATA"]["NEXT_CURSOR"]})
+        assert second["DATA"]["NEXT_CURSOR"] is None
+        ids = [item["id"] for item in first["DATA"]["ITEMS"] + second["DATA"]["ITEMS"]]
+        assert ids == IDS
+        assert client.request({"ACTION": "list", "CURSOR": "x"})["STATUS"] == 400
@@ -0,0 +1,86 @@
+# tests/test_prefork.py
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+
+import singletonproxyobserver
+from modules.ipc_bus import BusClient, BusHub
+from modules.prefork import per_worker_path
+from modules.protocol import FramedClient
+from tests.conftest import wait_for
+from tests.test_federation import free_port
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_prefork.py
+# * Pruebas del modo multiproceso: bus de eventos entre workers y
+# * notificaciones que llegan a suscriptores de cualquier worker.
+# *----------------------------------------------------------------------------
+
+
+def test_per_worker_path():
+    assert per_worker_path("logs/eventos.bin", 2) == "logs/eventos.2.bin"
+    assert per_worker_path("eventos", 0) == "eventos.0"
+    assert per_worker_path(None, 1) is None
+
+
+def test_bus_relays_to_every_other_worker(tmp_path):
+    hub = BusHub(str(tmp_path / "bus.sock"))
+    hub.start()
+    received = [[] for _ in range(3)]
+    closed = threading.Event()
+    clients = [BusClient(hub.path, inbox.append, closed.set) for inbox in received]
+    wait_for(lambda: hub.stats()["peers"] == 3)
+
+    clients[0].publish({"EVENT": "set", "DATA": {"id": "A"}})
+    clients[1].publish({"EVENT": "mset", "DATA": [{"id": "B"}]})
+    wait_for(lambda: len(received[2]) == 2)
+    wait_for(lambda: len(received[0]) == 1 and len(received[1]) == 1)
+    # Nadie recibe sus propios eventos
+    assert received[0] == [{"EVENT": "mset", "DATA": [{"id": "B"}]}]
+    assert received[1] == [{"EVENT": "set", "DATA": {"id": "A"}}]
+    assert hub.stats()["relayed"] == 2
+
+    # Si el maestro cierra el bus, los workers se enteran
+    hub.close()
+    assert closed.wait(5)
+    for client in clients:
+        client.close()
+
+
+def test_subscribers_see_writes_from_every_worker(tmp_path):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, singletonproxyobserver.__file__, "-p", str(port), "--processes", "2",
+         "--storage", "sqlite", "--sqlite-path", "datos.db", "--replay-file", "eventos.bin"],
+        cwd=tmp_path, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True)
+    try:
+        # El kernel reparte las conexiones entre los workers: cada
+        # suscriptor debe recibir la escritura sin importar dónde quedó
+        subscribers = [wait_for(lambda: connect(port), timeout=15) for _ in range(6)]
+        for subscriber in subscribers:
+            assert subscriber.request({"ACTION": "subscribe", "UUID": "U"})["STATUS"] == 200
+        with FramedClient("127.0.0.1", port) as writer:
+            assert writer.request({"ACTION": "set", "id": "A", "n": 1})["STATUS"] == 200
+        for subscriber in subscribers:
+            assert subscriber.receive()["DATA"]["id"] == "A"
+            subscriber.close()
+        # Cada worker usa su propio archivo de eventos
+        assert sorted(path.name for path in tmp_path.glob("eventos.*.bin")) == \
+            ["eventos.0.bin", "eventos.1.bin"]
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(15)
+
+
+def connect(port):
+    try:
+        return FramedClient("127.0.0.1", port, timeout=10)
+    except OSError:
+        return None
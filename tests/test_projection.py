@@ -0,0 +1,74 @@
+# tests/test_projection.py
+
+from decimal import Decimal
+
+import pytest
+
+from modules.protocol import FramedClient
+from modules.storage_dynamodb import _projection
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_projection.py
+# * Pruebas de la proyección de campos ('FIELDS') en get, mget, list y
+# * query, y de su traducción a un ProjectionExpression de DynamoDB.
+# *----------------------------------------------------------------------------
+
+ITEM = {"id": "A", "CUIT": "30-1", "sede": "FCyT", "n": 4}
+
+
+@pytest.fixture
+def stored(proxy):
+    assert proxy.set_item_with_previous(dict(ITEM), "u", "s")[1] == 200
+    proxy.cache.clear()
+    return proxy
+
+
+def test_reads_return_only_the_requested_fields(stored):
+    proxy = stored
+    assert proxy.get_item("A", "u", "s", fields=["CUIT"]) == ({"id": "A", "CUIT": "30-1"}, 200)
+    response, _ = proxy.get_items(["A"], "u", "s", fields=["sede"])
+    assert response["ITEMS"] == [{"id": "A", "sede": "FCyT"}]
+    page, _ = proxy.list_items("u", "s", limit=5, fields=["n"])
+    assert page["ITEMS"] == [{"id": "A", "n": Decimal(4)}]
+    items, _ = proxy.list_items("u", "s", fields=["n"])
+    assert items == [{"id": "A", "n": Decimal(4)}]
+    data, _ = proxy.query_items({"sede": "FCyT"}, "u", "s", fields=["CUIT"])
+    assert data["ITEMS"] == [{"id": "A", "CUIT": "30-1"}]
+
+
+def test_projected_reads_are_not_cached(stored):
+    proxy = stored
+    proxy.get_item("A", "u", "s", fields=["CUIT"])
+    proxy.get_items(["A"], "u", "s", fields=["CUIT"])
+    assert proxy.cache.get("A") is None
+    # Con el ítem completo en caché la proyección se hace sobre él
+    assert proxy.get_item("A", "u", "s")[0]["n"] == 4
+    assert proxy.get_item("A", "u", "s", fields=["n", "inexistente"]) == ({"id": "A", "n": 4}, 200)
+
+
+def test_invalid_fields_are_rejected(stored):
+    for fields in ("CUIT", [""], [1]):
+        assert stored.get_item("A", "u", "s", fields=fields)[1] == 400
+        assert stored.get_items(["A"], "u", "s", fields=fields)[1] == 400
+        assert stored.list_items("u", "s", fields=fields)[1] == 400
+
+
+def test_dynamodb_projection_expression():
+    assert _projection(None) == {}
+    assert _projection(["name", "id", "CUIT"]) == {
+        "ProjectionExpression": "#p0, #p1, #p2",
+        "ExpressionAttributeNames": {"#p0": "id", "#p1": "name", "#p2": "CUIT"}}
+
+
+def test_fields_over_the_protocol(start_server):
+    _, port = start_server()
+    with FramedClient("127.0.0.1", port) as client:
+        client.request(dict(ITEM, ACTION="set"))
+        response = client.request({"ACTION": "get", "ID": "A", "FIELDS": ["sede"]})
+        assert response["DATA"] == {"id": "A", "sede": "FCyT"}
+        response = client.request({"ACTION": "list", "FIELDS": ["CUIT"]})
+        assert response["DATA"] == [{"id": "A", "CUIT": "30-1"}]
+        assert client.request({"ACTION": "get", "ID": "A", "FIELDS": "sede"})["STATUS"] == 400
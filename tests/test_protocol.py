@@ -0,0 +1,91 @@
+# tests/test_protocol.py
+
+import json
+import socket
+
+import pytest
+
+from modules.protocol import (PREAMBLE, FrameDecoder, FramedClient, ProtocolError,
+                              RequestDecoder, encode_frame, encode_json_frame)
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_protocol.py
+# * Pruebas del protocolo enmarcado (frames, detección de modo,
+# * pipelining) y de la compatibilidad con los clientes legacy.
+# *----------------------------------------------------------------------------
+
+
+def test_frames_survive_arbitrary_chunks():
+    messages = [{"ACTION": "set", "id": "A", "n": 1},
+                {"ACTION": "get", "ID": "Ñandú"}]
+    data = b"".join(encode_json_frame(m) for m in messages)
+
+    decoder = FrameDecoder()
+    payloads = []
+    for i in range(0, len(data), 3):
+        payloads.extend(decoder.feed(data[i:i + 3]))
+    assert [json.loads(p) for p in payloads] == messages
+    assert decoder.pending() == 0
+
+
+def test_frame_decoder_rejects_oversized_frames():
+    decoder = FrameDecoder(max_frame_size=10)
+    with pytest.raises(ProtocolError):
+        decoder.feed(encode_frame(b"x" * 11))
+
+
+def test_request_decoder_detects_mode():
+    framed = RequestDecoder()
+    assert framed.feed(PREAMBLE[:3]) == []
+    requests = framed.feed(PREAMBLE[3:] + encode_json_frame({"ACTION": "get"}))
+    assert framed.framed is True
+    assert [framed.decode(r) for r in requests] == [{"ACTION": "get"}]
+
+    legacy = RequestDecoder()
+    assert legacy.feed(b'{"ACTION": "li') == []
+    assert legacy.feed(b'st"}') == [{"ACTION": "list"}]
+    assert legacy.framed is False
+
+
+def test_request_decoder_rejects_bad_preamble():
+    with pytest.raises(ProtocolError):
+        RequestDecoder().feed(PREAMBLE[:1] + b"OTRO/9\n")
+
+
+def test_pipelined_requests_are_answered_by_reqid(start_server):
+    _, port = start_server()
+    with FramedClient("127.0.0.1", port) as client:
+        requests = [{"ACTION": "set", "id": f"P{i}", "n": i} for i in range(5)]
+        requests.append({"ACTION": "get", "ID": "P3"})
+        requests.append({"ACTION": "get", "ID": "NOPE"})
+        responses = client.pipeline(requests)
+        assert len(responses) == 7
+        ordered = [responses[key] for key in sorted(responses)]
+        assert [r["STATUS"] for r in ordered] == [200] * 6 + [404]
+        assert ordered[5]["DATA"]["n"] == 3
+        # La conexión sigue abierta para más solicitudes
+        assert client.request({"ACTION": "get", "ID": "P0"})["STATUS"] == 200
+
+
+def test_framed_connection_survives_invalid_payload(start_server):
+    _, port = start_server()
+    with FramedClient("127.0.0.1", port) as client:
+        client.sock.sendall(encode_frame(b"{no es json"))
+        assert client.receive()["STATUS"] == 400
+        assert client.request({"ACTION": "get", "ID": "X"})["STATUS"] == 404
+
+
+def test_legacy_client_gets_one_response_and_close(start_server):
+    _, port = start_server()
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(json.dumps({"ACTION": "set", "id": "L", "n": 1}).encode())
+        buffer = b""
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            buffer += chunk
+    assert json.loads(buffer)["n"] == 1
@@ -0,0 +1,209 @@
+# tests/test_query.py
+
+import threading
+
+import pytest
+from boto3.dynamodb.conditions import ConditionExpressionBuilder
+
+from modules.data_proxy import DataProxy
+from modules.storage import BACKEND_MEMORY, QUERY_EQ, QUERY_PREFIX, create_backend
+from modules.storage_dynamodb import DynamoDBBackend
+from tests.conftest import wait_for
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_query.py
+# * Pruebas de la acción 'query': índice secundario en memoria (con sus
+# * actualizaciones), scan con filtro del motor y Query sobre un GSI.
+# *----------------------------------------------------------------------------
+
+ITEMS = [
+    {"id": "E1", "sede": "Central", "area": "Ventas", "CUIT": "30-1"},
+    {"id": "E2", "sede": "Central", "area": "Compras", "CUIT": "30-2"},
+    {"id": "E3", "sede": "Oro Verde", "area": "Ventas", "CUIT": "20-3"},
+    {"id": "E4", "sede": "Central", "area": "Ventas", "CUIT": "20-4"},
+]
+
+
+def ids(response):
+    data, status = response
+    assert status == 200, data
+    return [item["id"] for item in data["ITEMS"]]
+
+
+def make_proxy(tmp_path, query_index=None):
+    backend = create_backend(BACKEND_MEMORY)
+    for item in ITEMS:
+        backend.put_item(dict(item))
+    proxy = DataProxy(storage=backend, query_index=query_index,
+                      audit_spill_path=str(tmp_path / "spill.jsonl"))
+    if proxy.index is not None:
+        wait_for(lambda: proxy.index.ready)
+    # Cuenta las consultas que llegan al motor
+    proxy.storage_queries = 0
+    query = proxy.storage.query
+
+    def counting_query(*args, **kwargs):
+        proxy.storage_queries += 1
+        return query(*args, **kwargs)
+
+    proxy.storage.query = counting_query
+    return proxy
+
+
+@pytest.fixture(params=[None, ["sede", "CUIT"]], ids=["scan", "indice"])
+def any_proxy(request, tmp_path):
+    proxy = make_proxy(tmp_path, request.param)
+    yield proxy
+    proxy.close()
+
+
+@pytest.fixture
+def indexed_proxy(tmp_path):
+    proxy = make_proxy(tmp_path, ["sede", "CUIT"])
+    yield proxy
+    proxy.close()
+
+
+def query(proxy, where, **options):
+    return proxy.query_items(where, "U", "S", **options)
+
+
+def test_equality_prefix_and_projection(any_proxy):
+    assert ids(query(any_proxy, {"sede": "Central", "area": "Ventas"})) == ["E1", "E4"]
+    assert ids(query(any_proxy, {"CUIT": {"PREFIX": "30-"}})) == ["E1", "E2"]
+    data, _ = query(any_proxy, {"sede": "Oro Verde"}, fields=["area"])
+    assert data["ITEMS"] == [{"id": "E3", "area": "Ventas"}]
+    # El índice evita el motor; sin índice la consulta es un scan filtrado
+    assert (any_proxy.storage_queries == 0) == (any_proxy.index is not None)
+
+
+def test_pages_follow_the_cursor(any_proxy):
+    first, _ = query(any_proxy, {"sede": "Central"}, limit=2)
+    assert [item["id"] for item in first["ITEMS"]] == ["E1", "E2"]
+    second, _ = query(any_proxy, {"sede": "Central"}, limit=2, cursor=first["NEXT_CURSOR"])
+    assert [item["id"] for item in second["ITEMS"]] == ["E4"]
+    assert second["NEXT_CURSOR"] is None
+
+
+def test_invalid_queries_are_rejected(any_proxy):
+    for where in ({}, {"sede": {"PREFIX": ""}}, "sede"):
+        assert query(any_proxy, where)[1] == 400
+    assert query(any_proxy, {"sede": "Central"}, cursor="no-es-un-cursor")[1] == 400
+
+
+def test_attributes_outside_the_index_use_the_storage(indexed_proxy):
+    assert ids(query(indexed_proxy, {"area": "Compras"})) == ["E2"]
+    assert indexed_proxy.storage_queries == 1
+
+
+def test_index_follows_updates(indexed_proxy):
+    proxy = indexed_proxy
+    proxy.set_item_with_previous({"id": "E1", "sede": "Oro Verde", "CUIT": "30-1"}, "U", "S")
+    assert ids(query(proxy, {"sede": "Central"})) == ["E2", "E4"]
+    assert ids(query(proxy, {"sede": "Oro Verde"})) == ["E1", "E3"]
+
+    # Sin el atributo el ítem sale del índice, y el valor sin ítems también
+    proxy.set_item_with_previous({"id": "E3", "area": "Ventas"}, "U", "S")
+    proxy.set_item_with_previous({"id": "E1", "CUIT": "30-1"}, "U", "S")
+    assert ids(query(proxy, {"sede": "Oro Verde"})) == []
+    assert ids(query(proxy, {"sede": {"PREFIX": "Oro"}})) == []
+    assert "Oro Verde" not in proxy.index._values["sede"]
+
+    proxy.set_items([{"id": "E5", "sede": "Paraná", "CUIT": "30-5"},
+                     {"id": "E2", "sede": "Paraná", "CUIT": "30-2"}], "U", "S")
+    assert ids(query(proxy, {"sede": "Paraná", "CUIT": {"PREFIX": "30-"}})) == ["E2", "E5"]
+    assert proxy.storage_queries == 0
+
+
+def test_stale_index_entries_are_verified(indexed_proxy):
+    # Una escritura que no pasó por el DataProxy deja el índice viejo
+    indexed_proxy.storage.put_item({"id": "E4", "sede": "Paraná", "CUIT": "20-4"})
+    indexed_proxy.cache.invalidate("E4")
+    assert ids(query(indexed_proxy, {"sede": "Central"})) == ["E1", "E2"]
+
+
+class FakeTable:
+    """
+    Tabla de DynamoDB que devuelve las respuestas indicadas y registra las
+    llamadas a query y scan.
+    """
+
+    def __init__(self, responses, indexes=()):
+        self.responses = list(responses)
+        self.global_secondary_indexes = list(indexes)
+        self.calls = []
+
+    def query(self, **kwargs):
+        self.calls.append(("query", dict(kwargs)))
+        return self.responses.pop(0)
+
+    def scan(self, **kwargs):
+        self.calls.append(("scan", dict(kwargs)))
+        return self.responses.pop(0)
+
+
+def dynamodb_backend(table):
+    # Sin conexión a AWS: solo la tabla, que es lo que usa query()
+    backend = DynamoDBBackend.__new__(DynamoDBBackend)
+    backend.table_data = table
+    backend._indexes = None
+    backend._indexes_lock = threading.Lock()
+    return backend
+
+
+def render(condition, key=False):
+    built = ConditionExpressionBuilder().build_expression(condition, is_key_condition=key)
+    names = built.attribute_name_placeholders
+    values = built.attribute_value_placeholders
+    text = built.condition_expression
+    for placeholder, name in names.items():
+        text = text.replace(placeholder, name)
+    for placeholder, value in sorted(values.items(), reverse=True):
+        text = text.replace(placeholder, repr(value))
+    return text
+
+
+GSI_SEDE = {"IndexName": "sede-nombre", "IndexStatus": "ACTIVE",
+            "KeySchema": [{"AttributeName": "sede", "KeyType": "HASH"},
+                          {"AttributeName": "nombre", "KeyType": "RANGE"}],
+            "Projection": {"ProjectionType": "ALL"}}
+GSI_AREA_KEYS = {"IndexName": "area", "IndexStatus": "ACTIVE",
+                 "KeySchema": [{"AttributeName": "area", "KeyType": "HASH"}],
+                 "Projection": {"ProjectionType": "KEYS_ONLY"}}
+
+
+def test_gsi_query_uses_key_condition_and_paginates():
+    items = [{"id": f"E{i}", "sede": "Central", "nombre": f"A{i}", "area": "Ventas"}
+             for i in range(3)]
+    table = FakeTable([{"Items": items[:1], "LastEvaluatedKey": {"id": "E0"}},
+                       {"Items": items[1:]}], indexes=[GSI_AREA_KEYS, GSI_SEDE])
+    backend = dynamodb_backend(table)
+
+    found, next_key = backend.query([("area", QUERY_EQ, "Ventas"),
+                                     ("sede", QUERY_EQ, "Central"),
+                                     ("nombre", QUERY_PREFIX, "A")], limit=2)
+    assert found == items[:2]
+    # El cursor lleva las claves del índice, no solo el id
+    assert next_key == {"id": "E1", "sede": "Central", "nombre": "A1"}
+
+    (operation, first), (_, second) = table.calls
+    assert operation == "query" and first["IndexName"] == "sede-nombre"
+    assert render(first["KeyConditionExpression"], key=True) == \
+        "(sede = 'Central' AND begins_with(nombre, 'A'))"
+    assert render(first["FilterExpression"]) == "area = 'Ventas'"
+    assert second["ExclusiveStartKey"] == {"id": "E0"}
+
+
+def test_without_a_usable_gsi_the_query_is_a_filtered_scan():
+    table = FakeTable([{"Items": [{"id": "E1", "area": "Ventas"}]}], indexes=[GSI_AREA_KEYS])
+    backend = dynamodb_backend(table)
+
+    found, next_key = backend.query([("area", QUERY_EQ, "Ventas")], fields=["area"])
+    assert (found, next_key) == ([{"id": "E1", "area": "Ventas"}], None)
+    [(operation, kwargs)] = table.calls
+    assert operation == "scan" and "IndexName" not in kwargs
+    assert render(kwargs["FilterExpression"]) == "area = 'Ventas'"
+    assert set(kwargs["ExpressionAttributeNames"].values()) == {"id", "area"}
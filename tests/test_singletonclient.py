@@ -0,0 +1,72 @@
+# tests/test_singletonclient.py
+
+import json
+import subprocess
+import sys
+
+import singletonclient
+from tests.conftest import SRC
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_singletonclient.py
+# * Pruebas de las opciones de listado del cliente: escaneo paralelo,
+# * paginación, listado transmitido y proyección de campos.
+# *----------------------------------------------------------------------------
+
+
+def run_client(tmp_path, port, *args):
+    request = tmp_path / "list.json"
+    request.write_text(json.dumps({"ACTION": "list"}))
+    output = tmp_path / "respuesta.json"
+    result = subprocess.run(
+        [sys.executable, singletonclient.__file__, "-p", str(port), "-i", str(request),
+         "-o", str(output), *args],
+        cwd=SRC, capture_output=True, text=True, timeout=20)
+    return result, json.loads(output.read_text()) if output.exists() else None
+
+
+def ids(response):
+    items = response["ITEMS"] if isinstance(response, dict) else response
+    return sorted(item["id"] for item in items)
+
+
+def fill(server, count):
+    for i in range(count):
+        server.data_proxy.storage.put_item({"id": f"I{i:03d}", "n": i})
+
+
+def test_segments_with_all_pages_is_rejected(tmp_path):
+    result, response = run_client(tmp_path, 1, "--segments", "4", "--all-pages")
+    assert result.returncode == 2
+    assert "--segments no se puede combinar con --all-pages" in result.stderr
+    assert response is None
+
+
+def test_parallel_list_with_segments(start_server, tmp_path):
+    server, port = start_server()
+    fill(server, 50)
+    for args in (["--segments", "4"], ["--segments", "4", "--stream"],
+                 ["--segments", "4", "--stream", "--all-pages"]):
+        result, response = run_client(tmp_path, port, *args)
+        assert result.returncode == 0, result.stderr
+        assert ids(response) == [f"I{i:03d}" for i in range(50)]
+
+
+def test_all_pages_follows_the_cursor(start_server, tmp_path):
+    server, port = start_server()
+    fill(server, 25)
+    result, response = run_client(tmp_path, port, "--all-pages", "--page-size", "10")
+    assert result.returncode == 0, result.stderr
+    assert ids(response) == [f"I{i:03d}" for i in range(25)]
+
+
+def test_fields_option_projects_the_listing(start_server, tmp_path):
+    server, port = start_server()
+    fill(server, 3)
+    result, response = run_client(tmp_path, port, "--fields", "n")
+    assert result.returncode == 0, result.stderr
+    # Los números llegan como texto, como en el resto de las respuestas JSON
+    assert response == [{"id": f"I{i:03d}", "n": str(i)} for i in range(3)]
@@ -0,0 +1,95 @@
+# tests/test_storage.py
+
+from decimal import Decimal
+
+import pytest
+
+from modules.storage import (BACKEND_MEMORY, BACKEND_SQLITE, ConditionFailed,
+                             create_backend)
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_storage.py
+# * Pruebas de los motores locales (memoria y SQLite): mismas semánticas de
+# * lectura, escritura condicional, scan paginado, lotes y auditoría.
+# *----------------------------------------------------------------------------
+
+
+@pytest.fixture(params=[BACKEND_MEMORY, BACKEND_SQLITE])
+def backend(request, tmp_path):
+    options = {"path": str(tmp_path / "corporate.db")} if request.param == BACKEND_SQLITE else {}
+    storage = create_backend(request.param, **options)
+    yield storage
+    storage.close()
+
+
+def test_items_are_stored_as_decimal_copies(backend):
+    item = {"id": "A", "n": 1, "x": 1.5, "ok": True, "tags": [1, "b"], "sub": {"m": 2}}
+    assert backend.put_item(item) is None
+    item["n"] = 99  # El almacén no guarda la referencia
+    stored = backend.get_item("A")
+    assert stored == {"id": "A", "n": Decimal(1), "x": Decimal("1.5"), "ok": True,
+                      "tags": [Decimal(1), "b"], "sub": {"m": Decimal(2)}}
+    assert stored["ok"] is True
+    stored["n"] = 7
+    assert backend.get_item("A")["n"] == 1
+    assert backend.get_item("A", fields=["x"]) == {"id": "A", "x": Decimal("1.5")}
+    assert backend.get_item("Z") is None
+
+
+def test_put_returns_previous_and_checks_the_version(backend):
+    backend.put_item({"id": "A", "n": 1, "_version": 1})
+    assert backend.put_item({"id": "A", "n": 2, "_version": 2}, expected_version=1)["n"] == 1
+    with pytest.raises(ConditionFailed):
+        backend.put_item({"id": "A", "n": 3, "_version": 2}, expected_version=1)
+    assert backend.get_item("A")["n"] == 2
+    # Un ítem que no existe tiene versión 0
+    with pytest.raises(ConditionFailed):
+        backend.put_item({"id": "B", "_version": 2}, expected_version=1)
+    backend.put_item({"id": "B", "_version": 1}, expected_version=0)
+    assert backend.get_item("B")["_version"] == 1
+
+
+def test_scan_pages_and_segments(backend):
+    ids = [f"I{i:03d}" for i in range(25)]
+    for item_id in reversed(ids):
+        backend.put_item({"id": item_id, "n": 1})
+
+    seen, start_key = [], None
+    while True:
+        page, start_key = backend.scan(limit=10, start_key=start_key)
+        assert len(page) <= 10
+        seen.extend(item["id"] for item in page)
+        if start_key is None:
+            break
+    assert seen == ids
+
+    segments = [[item["id"] for item in backend.scan(segment=s, total_segments=4)[0]]
+                for s in range(4)]
+    assert sorted(sum(segments, [])) == ids
+    assert all(segments)
+
+
+def test_batches_and_audit_log(backend):
+    assert backend.batch_put([{"id": "A", "n": 1}, {"id": "B", "n": 2}]) == []
+    items, unprocessed = backend.batch_get(["B", "A", "Z"], fields=["n"])
+    assert sorted(items, key=lambda item: item["id"]) == [{"id": "A", "n": Decimal(1)},
+                                                          {"id": "B", "n": Decimal(2)}]
+    assert unprocessed == []
+
+    backend.append_log([{"id": "L1", "timestamp": "t1", "action": "set", "n": 1}])
+    assert backend.log_records() == [{"id": "L1", "timestamp": "t1", "action": "set",
+                                      "n": Decimal(1)}]
+    assert backend.stats()["backend"] == backend.name
+
+
+def test_sqlite_keeps_items_after_reopening(tmp_path):
+    path = str(tmp_path / "corporate.db")
+    first = create_backend(BACKEND_SQLITE, path=path)
+    first.put_item({"id": "A", "n": Decimal("0.1")})
+    first.close()
+    reopened = create_backend(BACKEND_SQLITE, path=path)
+    assert reopened.get_item("A") == {"id": "A", "n": Decimal("0.1")}
+    reopened.close()
@@ -0,0 +1,71 @@
+# tests/test_subscriptions.py
+
+import pytest
+
+from modules.observer import SubscriberIndex, Subscription, SubscriptionFilter
+from modules.protocol import FramedClient
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_subscriptions.py
+# * Pruebas de las suscripciones filtradas por id, prefijo y atributo, y
+# * del registro indexado de suscriptores.
+# *----------------------------------------------------------------------------
+
+
+def subscription(**request):
+    return Subscription(None, "U", 10, "drop_oldest", SubscriptionFilter.from_request(request))
+
+
+def test_filter_matches_ids_prefixes_and_attributes():
+    criteria = SubscriptionFilter.from_request(
+        {"IDS": ["A1"], "PREFIXES": ["B-"], "FILTER": {"sede": ["Central", "Paraná"], "n": 3}})
+    assert criteria.matches({"id": "A1", "sede": "Central", "n": 3})
+    assert criteria.matches({"id": "B-7", "sede": "Paraná", "n": 3})
+    assert not criteria.matches({"id": "C1", "sede": "Central", "n": 3})
+    assert not criteria.matches({"id": "A1", "sede": "Oro Verde", "n": 3})
+    assert not criteria.matches({"id": "A1", "sede": "Central"})
+    assert SubscriptionFilter().matches({"id": "X"})
+
+
+@pytest.mark.parametrize("request_data", [
+    {"IDS": "A"}, {"IDS": [""]}, {"PREFIXES": [""]}, {"FILTER": ["sede"]},
+    {"FILTER": {"sede": []}}, {"FILTER": {"sede": {"a": 1}}},
+])
+def test_invalid_filters_are_rejected(request_data):
+    with pytest.raises(ValueError):
+        SubscriptionFilter.from_request(request_data)
+
+
+def test_index_returns_only_possible_subscribers():
+    index = SubscriberIndex()
+    by_id = subscription(IDS=["A1"])
+    by_prefix = subscription(PREFIXES=["B-", "B-9"])
+    by_attribute = subscription(FILTER={"sede": "Central"})
+    everything = subscription()
+    for s in (by_id, by_prefix, by_attribute, everything):
+        index.add(s)
+
+    assert index.candidates({"id": "A1"}) == {by_id, everything}
+    assert index.candidates({"id": "B-90"}) == {by_prefix, everything}
+    assert index.candidates({"id": "Z", "sede": "Central"}) == {by_attribute, everything}
+
+    for s in (by_id, by_prefix, by_attribute):
+        index.remove(s)
+    assert index.candidates({"id": "B-90", "sede": "Central"}) == {everything}
+    assert not (index._by_prefix or index._prefix_lengths or index._attribute_names)
+
+
+def test_subscribers_receive_only_matching_items(start_server):
+    _, port = start_server()
+    with FramedClient("127.0.0.1", port) as central, \
+            FramedClient("127.0.0.1", port) as writer:
+        response = central.request({"ACTION": "subscribe", "UUID": "U",
+                                    "FILTER": {"sede": "Central"}})
+        assert response["STATUS"] == 200
+        writer.request({"ACTION": "set", "id": "A", "sede": "Oro Verde"})
+        writer.request({"ACTION": "set", "id": "B", "sede": "Central"})
+        assert central.receive()["DATA"]["id"] == "B"
+        assert writer.request({"ACTION": "subscribe", "PREFIXES": [""]})["STATUS"] == 400
@@ -0,0 +1,112 @@
+# tests/test_threaded_server.py
+
+import socket
+import threading
+import time
+
+from modules.protocol import FramedClient, PREAMBLE, encode_json_frame
+from modules.worker_pool import WorkerPool
+from tests.conftest import wait_for
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_threaded_server.py
+# * Pruebas del motor de hilos: pool acotado y control de admisión.
+# *----------------------------------------------------------------------------
+
+
+def block_gets(server):
+    """
+    Hace que cada 'get' espere hasta que se active el evento devuelto.
+    """
+    release = threading.Event()
+    get_item = server.data_proxy.get_item
+
+    def slow_get(*args, **kwargs):
+        release.wait(10)
+        return get_item(*args, **kwargs)
+
+    server.data_proxy.get_item = slow_get
+    return release
+
+
+def test_worker_pool_rejects_when_queue_is_full():
+    pool = WorkerPool(1, 1)
+    release = threading.Event()
+    assert pool.submit(release.wait, 5)
+    wait_for(lambda: pool.stats()["active"] == 1)
+    assert pool.submit(release.wait, 5)
+    assert not pool.submit(release.wait, 5)
+    release.set()
+    wait_for(lambda: pool.stats()["completed"] == 2)
+    stats = pool.stats()
+    assert (stats["submitted"], stats["rejected"]) == (2, 1)
+    pool.shutdown()
+
+
+def test_saturated_pool_answers_busy(start_server):
+    server, port = start_server(workers=1, queue_size=1)
+    with FramedClient("127.0.0.1", port) as running, \
+            FramedClient("127.0.0.1", port) as queued, \
+            FramedClient("127.0.0.1", port) as rejected:
+        # El saludo de cada conexión también pasa por el pool (y con un solo
+        # lugar en la cola puede rechazarse): se completa antes de trabar
+        # los 'get' para que no ocupe ese lugar
+        for client in (running, queued, rejected):
+            wait_for(lambda c=client: c.request({"ACTION": "get", "ID": "X"})["STATUS"] == 404)
+        wait_for(lambda: server.pool.stats()["completed"] == server.pool.stats()["submitted"])
+        release = block_gets(server)
+        running.send({"ACTION": "get", "ID": "X"})
+        wait_for(lambda: server.pool.stats()["active"] == 1)
+        queued.send({"ACTION": "get", "ID": "X"})
+        wait_for(lambda: server.pool.stats()["queue_depth"] == 1)
+
+        busy = rejected.request({"ACTION": "get", "ID": "X"})
+        assert busy["STATUS"] == 503
+        assert busy["DATA"]["error"] == "Server Busy"
+
+        release.set()
+        assert running.receive()["STATUS"] == 404
+        assert queued.receive()["STATUS"] == 404
+        # La conexión rechazada sigue abierta y se atiende al liberarse el pool
+        assert rejected.request({"ACTION": "get", "ID": "X"})["STATUS"] == 404
+
+
+def test_client_that_does_not_read_does_not_stall_the_monitor(start_server):
+    server, port = start_server(workers=1, queue_size=1)
+    release = block_gets(server)
+    with FramedClient("127.0.0.1", port) as running, \
+            FramedClient("127.0.0.1", port) as queued:
+        running.send({"ACTION": "get", "ID": "X"})
+        wait_for(lambda: server.pool.stats()["active"] == 1)
+        queued.send({"ACTION": "get", "ID": "X"})
+        wait_for(lambda: server.pool.stats()["queue_depth"] == 1)
+
+        # Un cliente envía miles de solicitudes y nunca lee los 503
+        flood = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        flood.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        flood.connect(("127.0.0.1", port))
+        burst = PREAMBLE + b"".join(
+            encode_json_frame({"ACTION": "get", "ID": "X", "REQID": i})
+            for i in range(50000))
+
+        def send_burst():
+            try:
+                flood.sendall(burst)
+            except OSError:
+                pass  # El servidor cerró la conexión
+
+        sender = threading.Thread(target=send_burst, daemon=True)
+        sender.start()
+        sender.join(10)
+        assert not sender.is_alive(), "El servidor dejó de leer al cliente"
+
+        time.sleep(1)  # Los 503 sin leer llenan los buffers del socket
+        # El monitor sigue atendiendo a los demás clientes
+        with FramedClient("127.0.0.1", port, timeout=5) as other:
+            assert other.request({"ACTION": "get", "ID": "X"})["STATUS"] == 503
+        release.set()
+        assert running.receive()["STATUS"] == 404
+        flood.close()
@@ -0,0 +1,91 @@
+# tests/test_versions.py
+
+from decimal import Decimal
+
+from modules.data_proxy import content_hash
+from modules.protocol import FramedClient
+
+# *----------------------------------------------------------------------------
+# * UADER-FCyT
+# * Ingeniería de Software II
+# *
+# * test_versions.py
+# * Pruebas de las escrituras versionadas: conflictos con '_version' (409),
+# * escrituras sin cambios que no graban ni notifican y escritores externos.
+# *----------------------------------------------------------------------------
+
+
+def count_puts(proxy):
+    """
+    Cuenta las escrituras que llegan al motor.
+    """
+    proxy.puts = 0
+    put_item = proxy.storage.put_item
+
+    def counting_put(*args, **kwargs):
+        proxy.puts += 1
+        return put_item(*args, **kwargs)
+
+    proxy.storage.put_item = counting_put
+
+
+def test_content_hash_ignores_order_number_format_and_control_fields():
+    assert content_hash({"id": "A", "n": 1, "x": "y"}) == \
+        content_hash({"x": "y", "n": Decimal("1.0"), "id": "A", "ACTION": "set", "_version": 4})
+    assert content_hash({"id": "A", "n": 1}) != content_hash({"id": "A", "n": "1"})
+
+
+def test_version_increments_and_conflict(proxy):
+    item, status, previous, changed = proxy.set_item_with_previous({"id": "A", "n": 1}, "u", "s")
+    assert (status, item["_version"], previous, changed) == (200, 1, None, True)
+
+    item, status, previous, _ = proxy.set_item_with_previous({"id": "A", "n": 2}, "u", "s")
+    assert (status, item["_version"], previous["n"]) == (200, 2, 1)
+
+    # Un escritor con una versión vieja no pisa la escritura
+    conflict, status, _, changed = proxy.set_item_with_previous(
+        {"id": "A", "n": 99, "_version": 1}, "u", "s")
+    assert (status, changed, conflict["_version"]) == (409, False, 2)
+    assert proxy.get_item("A", "u", "s")[0]["n"] == 2
+
+    item, status, _, _ = proxy.set_item_with_previous({"id": "A", "n": 3, "_version": 2}, "u", "s")
+    assert (status, item["_version"]) == (200, 3)
+
+    for bad in (-1, 1.5, "2", True):
+        assert proxy.set_item_with_previous({"id": "A", "_version": bad}, "u", "s")[1] == 400
+
+
+def test_unchanged_write_is_not_stored(proxy):
+    count_puts(proxy)
+    proxy.set_item_with_previous({"id": "A", "n": 1}, "u", "s")
+    item, status, _, changed = proxy.set_item_with_previous({"n": 1.0, "id": "A"}, "u", "s")
+    assert (status, changed, item["_version"]) == (200, False, 1)
+    assert proxy.puts == 1
+
+
+def test_writes_by_another_process_are_not_overwritten(proxy):
+    proxy.set_item_with_previous({"id": "A", "n": 1}, "u", "s")
+    # Otro proceso escribe directamente en la tabla (versión 2)
+    proxy.storage.put_item({"id": "A", "n": 2, "_version": 2})
+
+    assert proxy.set_item_with_previous({"id": "A", "n": 3, "_version": 1}, "u", "s")[1] == 409
+    # Sin '_version' se relee la versión y la escritura se aplica sobre ella
+    item, status, previous, _ = proxy.set_item_with_previous({"id": "A", "n": 3}, "u", "s")
+    assert (status, item["_version"], previous["n"]) == (200, 3, 2)
+    # La escritura condicional detecta el cambio externo; si el contenido
+    # es igual al que dejó el otro proceso, no se graba
+    proxy.storage.put_item({"id": "A", "n": 4, "_version": 4})
+    item, status, _, changed = proxy.set_item_with_previous({"id": "A", "n": 4}, "u", "s")
+    assert (status, changed, item["_version"]) == (200, False, 4)
+    assert proxy.storage.get_item("A")["_version"] == 4
+
+
+def test_unchanged_write_is_not_notified(start_server):
+    _, port = start_server()
+    with FramedClient("127.0.0.1", port) as subscriber, \
+            FramedClient("127.0.0.1", port) as writer:
+        assert subscriber.request({"ACTION": "subscribe", "UUID": "U"})["STATUS"] == 200
+        for n in (1, 1, 2):
+            assert writer.request({"ACTION": "set", "id": "A", "n": n})["STATUS"] == 200
+        assert [subscriber.receive()["VERSION"] for _ in range(2)] == [1, 2]
+        assert writer.request({"ACTION": "set", "id": "A", "n": 1, "_version": 1})["STATUS"] == 409